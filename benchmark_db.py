@@ -0,0 +1,77 @@
+"""
+Benchmark snapshot insert/query throughput: engine-per-call (old get_session) vs the pooled engine.
+
+    python benchmark_db.py [--evaluations 200] [--queries 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import logging
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine
+import src.database as db
+
+logging.disable(logging.INFO)
+
+def fake_result(i):
+    details = {}
+    for idx, param in enumerate(db.FUNDAMENTAL_PARAMS + db.TECHNICAL_PARAMS + db.NEWS_PARAMS):
+        details[param] = {'value': f"{(i * 7 + idx) % 100:.2f}%", 'score': (i + idx) % 3 / 2, 'status': 'Neutral'}
+    return {
+        'fundamental_score': 15 + i % 9, 'technical_score': i % 5, 'news_score': 4,
+        'total_score': 19 + i % 18, 'health_label': 'Moderate', 'cmp': 100 + i,
+        'swing_verdict': 'WAIT', 'long_term_verdict': 'HOLD', 'details': details,
+        'news_items': [{'title': f'Headline {i}', 'source': 'Bench', 'sentiment': 'Neutral'}]
+    }
+
+def run(label, n_evals, n_queries):
+    symbols = [f"SYM{i:04d}" for i in range(n_evals)]
+
+    # One save per request, as the bot and web app do
+    start = time.perf_counter()
+    for i, symbol in enumerate(symbols):
+        db.save_evaluations([(symbol, fake_result(i))])
+    single = time.perf_counter() - start
+
+    # One batch (digest / scan)
+    start = time.perf_counter()
+    db.save_evaluations([(symbol, fake_result(i)) for i, symbol in enumerate(symbols)])
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n_queries):
+        db.load_latest_evaluation(symbols[i % n_evals])
+    query = time.perf_counter() - start
+
+    print(f"{label:<18} {n_evals / single:>12.1f} {n_evals / batch:>12.1f} {n_queries / query:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Database throughput benchmark")
+    parser.add_argument("--evaluations", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'mode':<18} {'saves/s':>12} {'batched/s':>12} {'loads/s':>12}")
+    pooled_get_engine = db.get_engine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: a new engine (and pool) on every session, default SQLite pragmas
+        db.DB_PATH = os.path.join(tmp, 'before.db')
+        db._schema_ready = False
+        db.get_engine = lambda: create_engine(f'sqlite:///{db.DB_PATH}')
+        run("engine per call", args.evaluations, args.queries)
+
+        # After: process-wide pooled engine with WAL / synchronous=NORMAL / mmap / cache pragmas
+        db.DB_PATH = os.path.join(tmp, 'after.db')
+        db._schema_ready = False
+        db._engine = None
+        db.get_engine = pooled_get_engine
+        run("pooled engine", args.evaluations, args.queries)
+        db.get_engine().dispose()
+
+if __name__ == "__main__":
+    main()
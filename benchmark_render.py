@@ -0,0 +1,219 @@
+"""
+Benchmark infographic rendering:
+  - static template layer rebuilt on every report vs cached per process
+  - score badge + donut arcs drawn as per-degree line loops vs one native arc each
+  - encode time / size / PSNR per output encoding
+  - medium / thumb renditions derived from one render vs drawing the full report
+  - SVG output (same layout, no rasterising) vs raster draw + encode
+  - render_encoded() with the content-addressed render cache cold vs warm
+  - InfographicGenerator() construction: six font file loads per instance vs the shared font registry
+
+    python benchmark_render.py [--reports 20] [--news 6]
+"""
+import argparse
+import gzip
+import io
+import math
+import os
+import sys
+import tempfile
+import time
+import logging
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from src.analysis.engine import ALL_PARAMS
+from src.renderer import cache as render_cache
+from src.renderer import generator
+from src.renderer.generator import InfographicGenerator
+from src.renderer.encoders import ENCODINGS, encode_image, psnr
+from PIL import Image, ImageDraw, ImageFont
+
+logging.disable(logging.INFO)
+
+_WORDS = ("healthy return ratios low leverage steady order book margin pressure from input costs "
+          "promoter stake unchanged price consolidating near the 50 DMA with rising volumes").split()
+
+def _sentence(i, words):
+    """Deterministic filler text of a given length, so reports wrap to different heights like real data."""
+    return " ".join(_WORDS[(i + n) % len(_WORDS)] for n in range(words)).capitalize() + "."
+
+def sample_result(i, news_count=6):
+    details = {}
+    for idx, param in enumerate(ALL_PARAMS):
+        details[param] = {'value': f"{(i * 7 + idx) % 100:.2f}", 'score': (i + idx) % 3 / 2, 'status': 'Neutral'}
+    return {
+        'cmp': 1000 + i, 'total_score': 10 + i % 27, 'health_label': '🟡 Moderate',
+        'fundamental_score': 8 + i % 16, 'technical_score': i % 5, 'news_score': i % 8,
+        'fundamental_summary': '🟢 Bullish: ' + _sentence(i, 6 + i * 7 % 31),
+        'technical_summary': _sentence(i + 3, 5 + i * 5 % 23),
+        'news_summary': _sentence(i + 5, 4 + i * 3 % 17),
+        'swing_verdict': 'WAIT', 'long_term_verdict': '✅ BUY',
+        'swing_reason': _sentence(i + 1, 4 + i * 11 % 29), 'swing_action': f'Entry above {1050 + i}',
+        'long_term_reason': _sentence(i + 2, 3 + i * 13 % 37),
+        'final_action': 'Accumulate on dips.', 'retail_conclusion': _sentence(i + 4, i * 17 % 53),
+        'details': details,
+        'news_items': [{'title': f'Headline {n} for stock {i}', 'source': 'Bench', 'category': 'Results',
+                        'sentiment': ['Positive', 'Negative', 'Neutral'][n % 3]}
+                       for n in range(max(0, news_count - i % 3))]
+    }
+
+def run(label, gen, results, cold):
+    draw_time = encode_time = 0
+    size = 0
+    for i, result in enumerate(results):
+        if cold:
+            generator.clear_template_cache()
+        start = time.perf_counter()
+        img = gen.render_image(f"SYM{i:03d}", result)
+        draw_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        buf = io.BytesIO()
+        img.save(buf, format='PNG')  # plain truecolour PNG, as generate_report() writes
+        encode_time += time.perf_counter() - start
+        size += buf.tell()
+    n = len(results)
+    print(f"{label:<18} {draw_time / n * 1000:>10.1f} {encode_time / n * 1000:>10.1f} "
+          f"{(draw_time + encode_time) / n * 1000:>10.1f} {size / n / 1024:>10.0f}")
+
+def line_loop_arc(draw, center_x, center_y, radius, thickness, percentage, color, step, width):
+    """The arc drawing used before draw_ring(): one radial line every `step` degrees."""
+    for angle in range(0, int(360 * percentage / 100), step):
+        rad = math.radians(angle - 90)
+        x1 = center_x + (radius - thickness) * math.cos(rad)
+        y1 = center_y + (radius - thickness) * math.sin(rad)
+        x2 = center_x + radius * math.cos(rad)
+        y2 = center_y + radius * math.sin(rad)
+        draw.line([(x1, y1), (x2, y2)], fill=color, width=width)
+
+def run_arcs(gen, results):
+    """Badge (r=45, 5 degree steps) + four donuts (r=120, 2 degree steps) per report."""
+    img = Image.new('RGB', (1400, 400), gen.bg_color)
+    draw = ImageDraw.Draw(img)
+    pcts = [[r['total_score'] / 37 * 100, 71.8, r['fundamental_score'] / 24 * 100, 35, r['technical_score'] / 5 * 100]
+            for r in results]
+
+    start = time.perf_counter()
+    for p in pcts:
+        line_loop_arc(draw, 590, 110, 45, 5, p[0], gen.green, 5, 2)
+        for i in range(4):
+            line_loop_arc(draw, 200 + 320 * i, 260, 120, 8, p[i + 1], gen.blue, 2, 3)
+    loops = (time.perf_counter() - start) / len(pcts)
+
+    start = time.perf_counter()
+    for p in pcts:
+        gen.draw_ring(draw, 590, 110, 45, 5, p[0], gen.green)
+        for i in range(4):
+            gen.draw_ring(draw, 200 + 320 * i, 260, 120, 8, p[i + 1], gen.blue)
+    rings = (time.perf_counter() - start) / len(pcts)
+
+    print(f"\narcs per report: line loops {loops * 1000:.2f} ms, native arcs {rings * 1000:.2f} ms")
+
+def run_encodings(gen, results):
+    images = [gen.render_image(f"SYM{i:03d}", r) for i, r in enumerate(results[:5])]
+    print(f"\n{'encoding':<16} {'picked':<14} {'encode ms':>10} {'KiB':>8} {'PSNR dB':>8}")
+    for fmt in list(ENCODINGS) + ['auto']:
+        elapsed = size = quality = 0
+        for img in images:
+            start = time.perf_counter()
+            encoded = encode_image(img, fmt)
+            elapsed += time.perf_counter() - start
+            size += len(encoded.data)
+            quality += min(psnr(img, encoded.data), 99)
+        n = len(images)
+        print(f"{fmt:<16} {encoded.format:<14} {elapsed / n * 1000:>10.1f} {size / n / 1024:>8.0f} {quality / n:>8.1f}")
+
+def run_sizes(gen, results):
+    images = [gen.render_image(f"SYM{i:03d}", r) for i, r in enumerate(results[:5])]
+    start = time.perf_counter()
+    for i, r in enumerate(results[:5]):
+        gen.render_image(f"SYM{i:03d}", r)
+    draw = (time.perf_counter() - start) / len(images)
+
+    print(f"\n{'size':<8} {'derive ms':>10} {'encode ms':>10} {'KiB':>8}  (full draw {draw * 1000:.1f} ms)")
+    for size in generator.RENDITIONS:
+        derive_time = encode_time = nbytes = 0
+        for img in images:
+            start = time.perf_counter()
+            derived = gen.derive_sizes(img, [size])[size]
+            derive_time += time.perf_counter() - start
+            start = time.perf_counter()
+            nbytes += len(encode_image(derived, 'png-palette').data)
+            encode_time += time.perf_counter() - start
+        n = len(images)
+        print(f"{size:<8} {derive_time / n * 1000:>10.1f} {encode_time / n * 1000:>10.1f} {nbytes / n / 1024:>8.0f}")
+
+def run_svg(gen, results):
+    start = time.perf_counter()
+    docs = [gen.render_svg(f"SYM{i:03d}", r) for i, r in enumerate(results)]
+    elapsed = (time.perf_counter() - start) / len(docs)
+    size = sum(len(d.encode('utf-8')) for d in docs) / len(docs)
+    gz = sum(len(gzip.compress(d.encode('utf-8'))) for d in docs) / len(docs)
+    print(f"\nsvg per report: {elapsed * 1000:.1f} ms, {size / 1024:.0f} KiB ({gz / 1024:.1f} KiB gzipped)")
+
+def run_cache(gen, results):
+    with tempfile.TemporaryDirectory() as directory:
+        render_cache._cache = render_cache.RenderCache(directory=directory)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            for i, r in enumerate(results):
+                gen.render_encoded(f"SYM{i:03d}", r)
+            timings.append((time.perf_counter() - start) / len(results))
+        stats = render_cache._cache.stats()
+        render_cache._cache = None
+    print(f"\nrender_encoded per report: cold {timings[0] * 1000:.1f} ms, cached {timings[1] * 1000:.2f} ms "
+          f"({stats['hits']} hits, {stats['misses']} misses)")
+
+def run_fonts(gen, n=50):
+    sizes = [72, 48, 32, 24, 18, 16]
+    start = time.perf_counter()
+    for _ in range(n):
+        for size in sizes:
+            # What every instance did before the registry (with the resolved file instead of arial.ttf)
+            if gen.fonts.primary:
+                ImageFont.truetype(gen.fonts.primary, size)
+            else:
+                ImageFont.load_default(size=size)
+    per_instance = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        InfographicGenerator()
+    shared = (time.perf_counter() - start) / n
+
+    stats = gen.fonts.stats()
+    print(f"\ngenerator init: font loads per instance {per_instance * 1000:.2f} ms, shared registry {shared * 1000:.3f} ms")
+    print(f"fonts: primary={stats['primary'] or 'built-in'} fallbacks={stats['fallbacks']} "
+          f"startup {stats['startup_ms']} ms, {stats['loads']} loads ({stats['load_ms']} ms), "
+          f"missing glyphs: {''.join(stats['missing']) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Infographic render benchmark")
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--news", type=int, default=6)
+    args = parser.parse_args()
+
+    gen = InfographicGenerator()
+    results = [sample_result(i, args.news) for i in range(args.reports)]
+
+    print(f"{'mode':<18} {'draw ms':>10} {'encode ms':>10} {'total ms':>10} {'KiB':>10}")
+    # Before: every report draws the full canvas from scratch
+    run("no template cache", gen, results, cold=True)
+    # After: the static layer is drawn once, reports only add the dynamic parts
+    generator.clear_template_cache()
+    run("template cached", gen, results, cold=False)
+    keys = {gen.compute_layout(r)['key'] for r in results}
+    print(f"static layers: {len(keys)} distinct for {len(results)} reports "
+          f"(hit rate {1 - len(keys) / len(results):.0%})")
+
+    run_arcs(gen, results)
+    run_encodings(gen, results)
+    run_sizes(gen, results)
+    run_svg(gen, results)
+    run_cache(gen, results)
+    run_fonts(gen)
+
+if __name__ == "__main__":
+    main()
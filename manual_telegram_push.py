@@ -6,41 +6,23 @@ import asyncio
 # Ensure src is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
 
-from src.fetchers.fundamentals import FundamentalFetcher
-from src.fetchers.technicals import TechnicalFetcher
-from src.fetchers.news import NewsFetcher
-from src.analysis.engine import AnalysisEngine
+from src.pipeline import analyze_symbol, analyze_watchlist
 from src.renderer.generator import InfographicGenerator
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID
+from src.renderer.digest import DigestRenderer, digest_caption, rank_results
+from src.bot.photos import send_report_photo
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID, SNAPSHOT_MAX_AGE, DIGEST_WATCHLIST, DIGEST_MAX_CARDS
 
 def send_manual_report(symbol):
     print(f"Generating report for {symbol}...")
     
-    # 1. Fetch
-    ff = FundamentalFetcher()
-    fund_data = ff.get_data(symbol)
+    # 1. Fetch + Analyze
+    result = analyze_symbol(symbol, comprehensive_news=False)
     
-    tf = TechnicalFetcher()
-    tech_data = tf.get_data(symbol)
-    
-    nf = NewsFetcher()
-    news_data = nf.fetch_latest_news(symbol)
-    
-    if not fund_data and not tech_data:
+    if not result:
         print(f"Could not fetch data for {symbol}")
         return
 
-    # 2. Analyze
-    engine = AnalysisEngine()
-    result = engine.evaluate_stock(fund_data, tech_data, news_data)
-    result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-    
-    # 3. Generate Image
-    output_path = f"{symbol}_manual_report.png"
-    gen = InfographicGenerator()
-    gen.generate_report(symbol, result, output_path)
-    
-    # 4. Send Image
+    # 2. Send Image (rendered in memory, skipped when Telegram already has this exact report)
     print(f"Sending to Channel ID: {TELEGRAM_CHANNEL_ID}")
     
     caption = (
@@ -51,15 +33,37 @@ def send_manual_report(symbol):
         f"Long Term: {result.get('long_term_verdict', 'N/A')}"
     )
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-    with open(output_path, 'rb') as f:
-        resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'}, files={'photo': f})
+    resp = send_report_photo(TELEGRAM_CHANNEL_ID, symbol, result, caption=caption,
+                             render=InfographicGenerator().render_encoded)
     
     print(f"Response: {resp.status_code} - {resp.text}")
+
+def send_digest(symbols=None):
+    """Analyze a watchlist in parallel and post one contact sheet instead of a report per stock."""
+    symbols = symbols or DIGEST_WATCHLIST
+    print(f"Building digest for {len(symbols)} stocks...")
+    
+    # 1. Fetch + Analyze (concurrently, one batch insert)
+    results = analyze_watchlist(symbols, max_age=SNAPSHOT_MAX_AGE)
+    if not results:
+        print("Could not fetch data for any stock in the watchlist")
+        return
     
-    # Cleanup
-    if os.path.exists(output_path):
-        os.remove(output_path)
+    # 2. One sheet per DIGEST_MAX_CARDS stocks (Telegram limits photo dimensions)
+    renderer = DigestRenderer()
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
+    # Ranked once over the whole watchlist: later sheets continue the numbering (#61, #62, ...)
+    ranked = rank_results(results)
+    for start in range(0, len(ranked), DIGEST_MAX_CARDS):
+        sheet = ranked[start:start + DIGEST_MAX_CARDS]
+        photo = renderer.render_encoded(sheet, rank_offset=start)
+        caption = digest_caption(ranked) if start == 0 else None
+        resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'},
+                             files={'photo': (f"digest.{photo.ext}", photo.data, photo.mimetype)})
+        print(f"Response: {resp.status_code} - {resp.text}")
 
 if __name__ == "__main__":
-    send_manual_report("ANANTRAJ")
+    if len(sys.argv) > 1 and sys.argv[1] == "--digest":
+        send_digest(sys.argv[2].split(",") if len(sys.argv) > 2 else None)
+    else:
+        send_manual_report(sys.argv[1] if len(sys.argv) > 1 else "ANANTRAJ")
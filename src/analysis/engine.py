@@ -3,6 +3,23 @@ from src.config import TOTAL_PARAMETERS
 
 logger = logging.getLogger(__name__)
 
+# Parameter groups, in the order evaluate_stock() emits them into 'details'
+FUNDAMENTAL_PARAMS = [
+    'Market Cap', 'CMP vs 52W', 'P/E Ratio', 'PEG Ratio', 'EPS Trend',
+    'EBITDA Trend', 'Debt / Equity', 'Dividend Yield', 'Intrinsic Value',
+    'Current Ratio', 'Promoter Holding', 'FII/DII Trend', 'Operating Cash Flow',
+    'ROCE', 'ROE', 'Revenue CAGR', 'Profit CAGR', 'Interest Coverage',
+    'Free Cash Flow', 'Equity Dilution', 'Pledged Shares', 'Contingent Liab',
+    'Piotroski Score', 'Working Cap Cycle', 'CFO / PAT', 'Book Value Analysis'
+]
+TECHNICAL_PARAMS = ['Trend (DMA)', 'RSI', 'MACD', 'Pivot Support', 'Volume Trend']
+NEWS_PARAMS = [
+    'Orders / Business', 'Dividend / Buyback', 'Results Performance',
+    'Regulatory / Credit', 'Sector vs Nifty', 'Peer Comparison',
+    'Promoter Pledge', 'Management'
+]
+ALL_PARAMS = FUNDAMENTAL_PARAMS + TECHNICAL_PARAMS + NEWS_PARAMS
+
 class AnalysisEngine:
     def __init__(self):
         pass
@@ -96,6 +113,14 @@ class AnalysisEngine:
         
         return score_report
 
+    def fundamental_score(self, fundamentals):
+        """Fundamental score on its own, for progress updates before the other data arrives."""
+        return self._analyze_fundamentals(dict(fundamentals or {}))[0]
+
+    def technical_score(self, technicals):
+        """Technical score on its own, for progress updates before the other data arrives."""
+        return self._analyze_technicals(dict(technicals or {}))[0]
+
     def _analyze_fundamentals(self, data):
         score = 0
         details = {}
@@ -0,0 +1,316 @@
+import logging
+import re
+import threading
+import time
+import numpy as np
+from src.analysis.engine import ALL_PARAMS
+from src.database import latest_snapshot_rows, snapshot_version
+
+logger = logging.getLogger(__name__)
+
+# Stored Score columns that can be screened next to the engine parameters
+SCORE_COLUMNS = ['total_score', 'fundamental_score', 'technical_score', 'news_score', 'cmp']
+
+# Friendly names -> column (matched after normalisation, see _norm)
+ALIASES = {
+    'stock p/e': 'P/E Ratio', 'pe': 'P/E Ratio', 'p/e': 'P/E Ratio',
+    'peg': 'PEG Ratio', 'd/e': 'Debt / Equity', 'debt/equity': 'Debt / Equity',
+    'dividend': 'Dividend Yield', 'promoter': 'Promoter Holding',
+    'fcf': 'Free Cash Flow', 'ocf': 'Operating Cash Flow', 'piotroski': 'Piotroski Score',
+    'score': 'total_score', 'total': 'total_score', 'fundamental': 'fundamental_score',
+    'technical': 'technical_score', 'news': 'news_score', 'price': 'cmp', 'current price': 'cmp',
+}
+
+CACHE_TTL = 3600  # seconds between full rebuilds; new snapshots are applied incrementally
+
+class ScreenError(ValueError):
+    """Invalid screen expression or column."""
+
+def _norm(name):
+    name = re.sub(r'\s*/\s*', '/', name.strip().lower())
+    return re.sub(r'\s+', ' ', name)
+
+_COLUMN_LOOKUP = {_norm(c): c for c in ALL_PARAMS + SCORE_COLUMNS}
+_COLUMN_LOOKUP.update({_norm(k): v for k, v in ALIASES.items()})
+
+def resolve_column(name):
+    """'Stock P/E' -> 'P/E Ratio', 'ROCE.score' -> 'ROCE.score' (the parameter's 0/0.5/1 score)."""
+    key = _norm(name)
+    suffix = ''
+    if key.endswith('.score'):
+        key, suffix = key[:-len('.score')], '.score'
+    column = _COLUMN_LOOKUP.get(key)
+    if column is None or (suffix and column in SCORE_COLUMNS):
+        raise ScreenError(f"Unknown field '{name.strip()}'")
+    return column + suffix
+
+# ---------- Parsing ----------
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<num>-?\d+(?:\.\d+)?)%?(?![\w/])     |
+        (?P<op>>=|<=|!=|==|=|>|<)                |
+        (?P<lpar>\()                             |
+        (?P<rpar>\))                             |
+        "(?P<quoted>[^"]+)"                      |
+        (?P<word>[\w/&.%-]+)
+    )''', re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not'}
+
+def _tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ScreenError(f"Unexpected character at position {pos}: '{expression[pos:pos + 10]}'")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'word' and value.lower() in _KEYWORDS:
+            kind, value = value.lower(), value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+class _Parser:
+    """
+    expr    := and_expr ('or' and_expr)*
+    and_expr:= not_expr ('and' not_expr)*
+    not_expr:= 'not' not_expr | '(' expr ')' | field op number
+    field   := word+ | "quoted name"
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind=None):
+        if self.pos >= len(self.tokens):
+            raise ScreenError("Unexpected end of expression")
+        tok = self.tokens[self.pos]
+        if kind and tok[0] != kind:
+            raise ScreenError(f"Expected {kind} but found '{tok[1]}'")
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        if not self.tokens:
+            raise ScreenError("Empty expression")
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise ScreenError(f"Unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def expr(self):
+        node = self.and_expr()
+        while self.peek() == 'or':
+            self.take()
+            node = ('or', node, self.and_expr())
+        return node
+
+    def and_expr(self):
+        node = self.not_expr()
+        while self.peek() == 'and':
+            self.take()
+            node = ('and', node, self.not_expr())
+        return node
+
+    def not_expr(self):
+        kind = self.peek()
+        if kind == 'not':
+            self.take()
+            return ('not', self.not_expr())
+        if kind == 'lpar':
+            self.take()
+            node = self.expr()
+            self.take('rpar')
+            return node
+        return self.comparison()
+
+    def comparison(self):
+        words = []
+        while self.peek() in ('word', 'quoted'):
+            words.append(self.take()[1])
+        if not words:
+            raise ScreenError(f"Expected a field name near '{self.tokens[self.pos][1] if self.pos < len(self.tokens) else ''}'")
+        column = resolve_column(' '.join(words))
+        op = self.take('op')[1]
+        value = float(self.take('num')[1])
+        return ('cmp', column, op, value)
+
+def parse_expression(expression):
+    """Parse a screen like 'ROCE > 20 and Stock P/E < 15' into a small AST of tuples."""
+    return _Parser(_tokenize(expression)).parse()
+
+def referenced_columns(node):
+    if node[0] == 'cmp':
+        return [node[1]]
+    return [c for child in node[1:] for c in referenced_columns(child)]
+
+# ---------- Columnar cache ----------
+
+_OPS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    '=': np.equal, '==': np.equal, '!=': np.not_equal
+}
+
+_ALL_COLUMNS = SCORE_COLUMNS + ALL_PARAMS + [p + '.score' for p in ALL_PARAMS]
+
+class ScreenCache:
+    """
+    Latest snapshot of every stored stock as one float64 NumPy array per column (NaN = missing).
+    New snapshots are applied incrementally; a full rebuild happens every CACHE_TTL seconds.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.built_at = 0
+        self.stock_ids = np.array([], dtype=np.int64)
+        self.symbols = np.array([], dtype=object)
+        self.labels = {'health_label': np.array([], dtype=object), 'captured_at': np.array([], dtype=object)}
+        self.columns = {name: np.array([], dtype=np.float64) for name in _ALL_COLUMNS}
+        self._lock = threading.Lock()
+
+    def _is_current(self, version, full):
+        return not full and version == self.version
+
+    def refresh(self, force=False):
+        version = snapshot_version()
+        full = force or self.version is None or time.time() - self.built_at >= CACHE_TTL
+        if self._is_current(version, full):
+            return
+        with self._lock:
+            full = force or self.version is None or time.time() - self.built_at >= CACHE_TTL
+            if self._is_current(version, full):
+                return
+            start = time.perf_counter()
+            score_rows, param_rows = latest_snapshot_rows(since_id=None if full else self.version)
+            self._apply(score_rows, param_rows, full)
+            self.version = version
+            if full:
+                self.built_at = time.time()
+            logger.info(f"Screen cache {'rebuilt' if full else 'updated'}: {len(score_rows)} stock(s) "
+                        f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def _apply(self, score_rows, param_rows, full):
+        """Build new arrays (readers keep using the old ones until the swap at the end)."""
+        stock_ids = [] if full else self.stock_ids.tolist()
+        symbols = [] if full else self.symbols.tolist()
+        health = [] if full else self.labels['health_label'].tolist()
+        captured = [] if full else self.labels['captured_at'].tolist()
+        index = {sid: i for i, sid in enumerate(stock_ids)}
+
+        added = 0
+        for row in score_rows:
+            if row[0] not in index:
+                index[row[0]] = len(stock_ids)
+                stock_ids.append(row[0]); symbols.append(row[1]); health.append(None); captured.append(None)
+                added += 1
+
+        n = len(stock_ids)
+        columns = {}
+        for name in _ALL_COLUMNS:
+            columns[name] = np.full(n, np.nan)
+            if not full:
+                old = self.columns[name]
+                columns[name][:len(old)] = old
+
+        # Overwrite the rows of re-evaluated stocks
+        rows = np.array([index[row[0]] for row in score_rows], dtype=np.intp)
+        for name in ALL_PARAMS:
+            columns[name][rows] = np.nan
+            columns[name + '.score'][rows] = np.nan
+        for pos, name in enumerate(SCORE_COLUMNS):
+            columns[name][rows] = np.array([row[3 + pos] for row in score_rows], dtype=np.float64)  # None -> nan
+        for row in score_rows:
+            i = index[row[0]]
+            health[i] = row[8]
+            captured[i] = row[2].isoformat() if row[2] else None
+        for stock_id, param, value, score in param_rows:
+            i = index.get(stock_id)
+            if i is None or param not in columns:
+                continue
+            if value is not None:
+                columns[param][i] = value
+            if score is not None:
+                columns[param + '.score'][i] = score
+
+        stock_ids = np.array(stock_ids, dtype=np.int64)
+        symbols = np.array(symbols, dtype=object)
+        health = np.array(health, dtype=object)
+        captured = np.array(captured, dtype=object)
+        if full or added:
+            # Keep rows ordered by symbol: stable tie-break when sorting screen results
+            order = np.argsort(symbols, kind='stable')
+            stock_ids, symbols, health, captured = stock_ids[order], symbols[order], health[order], captured[order]
+            columns = {name: values[order] for name, values in columns.items()}
+
+        self.stock_ids = stock_ids
+        self.symbols = symbols
+        self.labels = {'health_label': health, 'captured_at': captured}
+        self.columns = columns
+
+    def mask(self, node):
+        kind = node[0]
+        if kind == 'cmp':
+            _, column, op, value = node
+            values = self.columns[column]
+            with np.errstate(invalid='ignore'):
+                return _OPS[op](values, value) & ~np.isnan(values)
+        if kind == 'and':
+            return self.mask(node[1]) & self.mask(node[2])
+        if kind == 'or':
+            return self.mask(node[1]) | self.mask(node[2])
+        if kind == 'not':
+            return ~self.mask(node[1])
+        raise ScreenError(f"Bad node {kind}")
+
+_cache = ScreenCache()
+
+def get_cache():
+    _cache.refresh()
+    return _cache
+
+def run_screen(expression, sort='total_score', descending=True, page=1, per_page=25):
+    """
+    Evaluate a screen against the latest stored snapshots.
+    Returns {'expression', 'total', 'page', 'per_page', 'sort', 'results': [{symbol, ...}]}.
+    Raises ScreenError for invalid expressions.
+    """
+    node = parse_expression(expression)
+    sort_column = resolve_column(sort) if sort else 'total_score'
+    page = max(int(page), 1)
+    per_page = min(max(int(per_page), 1), 500)
+
+    cache = get_cache()
+    matches = np.flatnonzero(cache.mask(node))
+
+    # NaN sorts last in both directions
+    values = cache.columns[sort_column][matches]
+    order = np.argsort(-values if descending else values, kind='stable')
+    matches = matches[order]
+
+    page_rows = matches[(page - 1) * per_page: page * per_page]
+    shown = ['total_score'] + [c for c in dict.fromkeys(referenced_columns(node) + [sort_column]) if c != 'total_score']
+    results = []
+    for i in page_rows:
+        row = {'symbol': cache.symbols[i], 'health_label': cache.labels['health_label'][i],
+               'captured_at': cache.labels['captured_at'][i]}
+        for column in shown:
+            v = cache.columns[column][i]
+            row[column] = None if np.isnan(v) else float(v)
+        results.append(row)
+
+    return {
+        'expression': expression,
+        'total': int(len(matches)),
+        'page': page,
+        'per_page': per_page,
+        'sort': sort_column,
+        'descending': descending,
+        'results': results
+    }
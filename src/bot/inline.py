@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime
+from telegram import Update, InlineQueryResultArticle, InlineQueryResultCachedPhoto, InputTextMessageContent
+from telegram.ext import ContextTypes
+from src.config import SNAPSHOT_MAX_AGE, INLINE_QUERY_TIMEOUT
+from src.database import load_latest_evaluation, load_telegram_file_id
+from src.pipeline import analyze_symbol
+from src.bot.scheduler import get_scheduler, SchedulerError
+from src.fetchers.symbols import get_symbol_master
+from src.renderer.generator import report_key
+from src.renderer.text_report import render_text
+
+logger = logging.getLogger(__name__)
+
+# Background refreshes: one task per symbol, run on the bot's FairScheduler like chat analyses.
+# Inline queries arrive on every keystroke, so symbols whose analysis failed are not retried for a while.
+FAILED_RETRY_AFTER = 600
+_refreshing = {}
+_failed = {}
+
+def snapshot_age(result):
+    """Seconds since a stored snapshot was captured (0 for a live result)."""
+    if 'captured_at' not in result:
+        return 0
+    return (datetime.utcnow() - datetime.fromisoformat(result['captured_at'])).total_seconds()
+
+async def _refresh(job):
+    # The pipeline persists the result, so the next inline query finds it stored
+    return await job
+
+def _refresh_done(symbol, task):
+    _refreshing.pop(symbol, None)
+    error = None if task.cancelled() else task.exception()
+    if error:
+        logger.error(f"[{symbol}] Inline refresh failed: {error}")
+    if task.cancelled() or error or not task.result():
+        _failed[symbol] = time.monotonic()
+    else:
+        _failed.pop(symbol, None)
+
+def refresh_in_background(application, symbol, user_id):
+    """
+    Start (or join) a background analysis of symbol. Returns its task, or None while backing off.
+    The analysis is queued on the scheduler under user_id (also the id of the user's private chat),
+    so it counts toward the shared worker limit and that user's rate budget; raises SchedulerError
+    when the scheduler rejects it.
+    """
+    task = _refreshing.get(symbol)
+    if task is not None:
+        return task
+    failed_at = _failed.get(symbol)
+    if failed_at is not None and time.monotonic() - failed_at < FAILED_RETRY_AFTER:
+        return None
+    job = get_scheduler().submit(user_id, analyze_symbol, symbol, comprehensive_news=False)
+    task = application.create_task(_refresh(job), name=f"inline-refresh-{symbol}")
+    _refreshing[symbol] = task
+    task.add_done_callback(lambda t: _refresh_done(symbol, t))
+    return task
+
+def inline_results(symbol, result, fresh=True):
+    """The cached report photo (if it was ever uploaded) and the text report, for answering a query."""
+    total = result.get('total_score', 0)
+    description = (f"Score {total:.1f}/37 · Swing {result.get('swing_verdict', 'N/A')} · "
+                   f"Long Term {result.get('long_term_verdict', 'N/A')}")
+    if not fresh:
+        description += f" · as of {result['captured_at'][:16]} UTC"
+
+    results = []
+    file_id = load_telegram_file_id(report_key(symbol, result))
+    if file_id:
+        results.append(InlineQueryResultCachedPhoto(
+            id=f"{symbol}-photo", photo_file_id=file_id, title=f"📊 {symbol} report", description=description,
+            caption=f"📊 {symbol} · Score {total:.1f}/37 · {result.get('health_label', 'N/A')}"))
+    text, parse_mode = render_text(symbol, result)
+    results.append(InlineQueryResultArticle(
+        id=f"{symbol}-text", title=f"📊 {symbol} · {total:.1f}/37", description=description,
+        input_message_content=InputTextMessageContent(text, parse_mode=parse_mode)))
+    return results
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    @bot SYMBOL in any chat, answered from the stored snapshot and Telegram file_id caches.
+    A missing or old snapshot triggers a background refresh; only when nothing is stored at all
+    does the answer wait for it, and then for at most INLINE_QUERY_TIMEOUT seconds.
+    (Inline mode must be enabled for the bot with BotFather's /setinline.)
+    """
+    query = update.inline_query
+    # Company names and aliases ("tata motors", "RIL") resolve locally; anything else is taken as a ticker
+    master = get_symbol_master()
+    symbol = master.resolve(query.query) or query.query.strip().upper()
+    if not re.match(r'^[A-Z0-9&.\-]{2,20}$', symbol):
+        await query.answer([], cache_time=5)
+        return
+    # Partial tickers typed on the way to a real one ("TA", "TAT") are not worth an analysis
+    known = not len(master) or symbol in master
+
+    # 1. Stored snapshot, any age
+    result = await asyncio.to_thread(load_latest_evaluation, symbol)
+    fresh = result is not None and snapshot_age(result) <= SNAPSHOT_MAX_AGE
+
+    # 2. Refresh in the background; wait briefly only if there is nothing to show yet
+    task = rejected = None
+    if not fresh and known:
+        try:
+            task = refresh_in_background(context.application, symbol, query.from_user.id)
+        except SchedulerError as e:
+            rejected = e
+        if result is None and task is not None:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(task), INLINE_QUERY_TIMEOUT)
+                fresh = True
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                # Logged by _refresh_done
+                pass
+
+    if not result:
+        if rejected is not None:
+            answer = InlineQueryResultArticle(
+                id=f"{symbol}-busy", title=f"🚦 {symbol} can't be analyzed right now",
+                description="Too many requests. Try again in a minute.",
+                input_message_content=InputTextMessageContent(f"🚦 {symbol} analysis is not available right now."))
+        elif task is not None and not task.done():
+            answer = InlineQueryResultArticle(
+                id=f"{symbol}-pending", title=f"⏳ Analyzing {symbol}...",
+                description="Not analyzed recently. Try again in a few seconds.",
+                input_message_content=InputTextMessageContent(f"⏳ {symbol} analysis is not ready yet."))
+        else:
+            answer = InlineQueryResultArticle(
+                id=f"{symbol}-missing", title=f"⚠️ No data for {symbol}", description="Please verify the ticker.",
+                input_message_content=InputTextMessageContent(f"⚠️ Could not fetch data for {symbol}."))
+        await query.answer([answer], cache_time=0)
+        return
+
+    # 3. Answer (Telegram may cache fresh answers for a minute)
+    results = await asyncio.to_thread(inline_results, symbol, result, fresh)
+    await query.answer(results, cache_time=60 if fresh else 0)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import requests
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+from src.config import TELEGRAM_BOT_TOKEN
+from src.database import load_telegram_file_id, save_telegram_file_id, forget_telegram_file_id
+from src.renderer.generator import report_key
+from src.renderer.pool import get_render_pool, RenderError
+
+logger = logging.getLogger(__name__)
+
+# Most photos Telegram accepts in one sendMediaGroup album
+ALBUM_SIZE = 10
+
+SEND_PHOTO_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
+
+def send_report_photo(chat_id, symbol, result, caption=None, parse_mode='Markdown', fmt=None, render=None):
+    """
+    Send a report through the Bot API (web app, manual push). A report already uploaded with the
+    same content hash is sent by file_id, skipping both the render and the upload.
+    render(symbol, result, fmt) -> EncodedImage defaults to the render pool. Returns the response.
+    """
+    key = report_key(symbol, result, fmt)
+    data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': parse_mode}
+
+    file_id = load_telegram_file_id(key)
+    if file_id:
+        resp = requests.post(SEND_PHOTO_URL, data={**data, 'photo': file_id})
+        if resp.status_code == 200:
+            logger.info(f"[{symbol}] Report sent by file_id ({key[:12]})")
+            return resp
+        # A rejected file_id is dropped and the image uploaded again
+        logger.warning(f"[{symbol}] Telegram rejected stored file_id: {resp.text}")
+        forget_telegram_file_id(key)
+
+    photo = (render or get_render_pool().render)(symbol, result, fmt)
+    resp = requests.post(SEND_PHOTO_URL, data=data, files={'photo': (f"{symbol}.{photo.ext}", photo.data, photo.mimetype)})
+    if resp.status_code == 200:
+        save_telegram_file_id(key, resp.json()['result']['photo'][-1]['file_id'])
+    return resp
+
+async def send_report_photo_async(bot, chat_id, symbol, result, caption=None, parse_mode='Markdown', fmt=None):
+    """send_report_photo() for the bot: python-telegram-bot, render pool off the event loop."""
+    key = report_key(symbol, result, fmt)
+
+    file_id = await asyncio.to_thread(load_telegram_file_id, key)
+    if file_id:
+        try:
+            message = await bot.send_photo(chat_id=chat_id, photo=file_id, caption=caption, parse_mode=parse_mode)
+            logger.info(f"[{symbol}] Report sent by file_id ({key[:12]})")
+            return message
+        except BadRequest as e:
+            logger.warning(f"[{symbol}] Telegram rejected stored file_id: {e}")
+            await asyncio.to_thread(forget_telegram_file_id, key)
+
+    photo = await get_render_pool().render_async(symbol, result, fmt)
+    message = await bot.send_photo(chat_id=chat_id, photo=photo.data, filename=f"{symbol}_report.{photo.ext}",
+                                   caption=caption, parse_mode=parse_mode)
+    if message.photo:
+        await asyncio.to_thread(save_telegram_file_id, key, message.photo[-1].file_id)
+    return message
+
+async def _album_media(items, file_ids, fmt):
+    """Photo per item: its stored file_id, else a render (all renders in parallel); None if rendering failed."""
+    pool = get_render_pool()
+
+    async def media(i):
+        if file_ids[i]:
+            return file_ids[i]
+        symbol, result = items[i]
+        try:
+            return await pool.render_async(symbol, result, fmt)
+        except RenderError as e:
+            logger.error(f"[{symbol}] Could not render report for album: {e}")
+            return None
+
+    return await asyncio.gather(*(media(i) for i in range(len(items))))
+
+async def send_report_album_async(bot, chat_id, items, caption_for=None, parse_mode='Markdown', fmt=None):
+    """
+    Send reports for [(symbol, result)] as sendMediaGroup albums of up to ALBUM_SIZE photos, in order.
+    Renders run in parallel on the render pool; reports uploaded before are sent by file_id.
+    caption_for(chunk) gives the caption shown under each album. Returns the symbols not sent.
+    """
+    keys = [report_key(symbol, result, fmt) for symbol, result in items]
+    file_ids = await asyncio.to_thread(lambda: [load_telegram_file_id(key) for key in keys])
+    media = await _album_media(items, file_ids, fmt)
+    failed = [symbol for (symbol, _), m in zip(items, media) if m is None]
+
+    sendable = [i for i, m in enumerate(media) if m is not None]
+    if not sendable:
+        return failed
+    # Even chunks (11 reports -> 6 + 5): an album needs at least two photos
+    per_album = -(-len(sendable) // max(1, -(-len(sendable) // ALBUM_SIZE)))
+    for start in range(0, len(sendable), per_album):
+        chunk = sendable[start:start + per_album]
+
+        def album():
+            caption = caption_for([items[i] for i in chunk]) if caption_for else None
+            photos = []
+            for n, i in enumerate(chunk):
+                m = media[i]
+                extra = {'caption': caption, 'parse_mode': parse_mode} if n == 0 and caption else {}
+                if isinstance(m, str):
+                    photos.append(InputMediaPhoto(m, **extra))
+                else:
+                    photos.append(InputMediaPhoto(m.data, filename=f"{items[i][0]}_report.{m.ext}", **extra))
+            return photos
+
+        async def send():
+            photos = album()
+            if len(photos) == 1:
+                return [await bot.send_photo(chat_id=chat_id, photo=photos[0].media, caption=photos[0].caption,
+                                             parse_mode=photos[0].parse_mode)]
+            return await bot.send_media_group(chat_id=chat_id, media=photos)
+
+        try:
+            messages = await send()
+        except BadRequest as e:
+            reused = [i for i in chunk if isinstance(media[i], str)]
+            if not reused:
+                raise
+            # One stale file_id rejects the whole album: drop the stored ids and upload this chunk instead
+            logger.warning(f"Telegram rejected stored file_id(s) in album: {e}")
+            await asyncio.to_thread(lambda: [forget_telegram_file_id(keys[i]) for i in reused])
+            rendered = await _album_media([items[i] for i in reused], [None] * len(reused), fmt)
+            for i, m in zip(reused, rendered):
+                media[i] = m
+            failed.extend(items[i][0] for i in reused if media[i] is None)
+            chunk = [i for i in chunk if media[i] is not None]
+            if not chunk:
+                continue
+            messages = await send()
+
+        uploaded = [(keys[i], message.photo[-1].file_id) for i, message in zip(chunk, messages)
+                    if not isinstance(media[i], str) and message.photo]
+        if uploaded:
+            await asyncio.to_thread(lambda: [save_telegram_file_id(key, file_id) for key, file_id in uploaded])
+        logger.info(f"Album of {len(chunk)} report(s) sent ({len(chunk) - len(uploaded)} by file_id)")
+    return failed
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from src.config import BOT_ANALYSIS_WORKERS, BOT_QUEUE_SIZE, BOT_RATE_BURST, BOT_RATE_PER_MINUTE
+
+logger = logging.getLogger(__name__)
+
+# Queue waits kept for the wait-time percentiles
+WAIT_SAMPLES = 500
+
+class SchedulerError(RuntimeError):
+    """An analysis was not accepted by the scheduler."""
+
+class RateLimitedError(SchedulerError):
+    """The chat used up its token bucket; retry_after is the wait in seconds for the next token."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited, next analysis possible in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class QueueFullError(SchedulerError):
+    """The global queue already holds BOT_QUEUE_SIZE waiting analyses."""
+
+class TokenBucket:
+    """capacity tokens, refilled continuously at rate tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, n=1):
+        """Take n tokens; returns 0 on success, else the seconds until n tokens are available."""
+        self._refill()
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0
+        return (n - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def full(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+class Job:
+    def __init__(self, chat_id, func, args, kwargs, cached):
+        self.chat_id = chat_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cached = cached
+        self.queued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        self.position = 0
+
+    def __await__(self):
+        return self.future.__await__()
+
+class FairScheduler:
+    """
+    Runs blocking analysis calls for the bot, at most `workers` at a time (in threads).
+    Each chat has a token bucket and its own queue; queued jobs are started one chat at a time in
+    turn, so one chat pasting 30 tickers cannot starve the others. Jobs marked cached (a fresh
+    snapshot exists, so they finish in milliseconds) are started before the others and cost no token.
+    Lives on the bot's event loop; submit() must be called from it.
+    """
+
+    def __init__(self, workers=BOT_ANALYSIS_WORKERS, max_queue=BOT_QUEUE_SIZE,
+                 rate_per_minute=BOT_RATE_PER_MINUTE, burst=BOT_RATE_BURST):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self._buckets = {}
+        self._queues = OrderedDict()  # chat_id -> deque of jobs, in turn order
+        self._queued = 0
+        self._running = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'cached': 0,
+                         'rate_limited': 0, 'queue_full': 0, 'waited': 0}
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) > 1000:
+                # Forget chats whose bucket has refilled completely
+                self._buckets = {c: b for c, b in self._buckets.items() if not b.full()}
+            bucket = self._buckets[chat_id] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def submit(self, chat_id, func, *args, cached=False, **kwargs):
+        """
+        Schedule func(*args, **kwargs). Returns the Job (await it for the result); job.position is
+        0 if it started right away, else its estimated place in the queue.
+        Raises RateLimitedError or QueueFullError instead of queueing; a rejected job costs no token.
+        """
+        if self._running >= self.workers and self._queued >= self.max_queue:
+            self.counters['queue_full'] += 1
+            raise QueueFullError(f"Analysis queue is full ({self.max_queue} waiting)")
+        retry_after = 0 if cached else self._bucket(chat_id).take()
+        if retry_after:
+            self.counters['rate_limited'] += 1
+            raise RateLimitedError(retry_after)
+
+        job = Job(chat_id, func, args, kwargs, cached)
+        self.counters['submitted'] += 1
+        self.counters['cached'] += cached
+        self._queues.setdefault(chat_id, deque()).append(job)
+        self._queued += 1
+        self._dispatch()
+        if not job.future.done() and job in self._queues.get(chat_id, ()):
+            job.position = self._position(job)
+            self.counters['waited'] += 1
+        return job
+
+    def _position(self, job):
+        """Place in line: cached jobs first, then one job per chat per turn."""
+        own = list(self._queues[job.chat_id])
+        index = own.index(job)
+        if job.cached:
+            # Only other cache hits start before a cache hit
+            ahead = sum(1 for j in own[:index] if j.cached) + 1
+            return ahead + sum(1 for chat_id, queue in self._queues.items() if chat_id != job.chat_id
+                               for j in queue if j.cached)
+        ahead = index + 1
+        for chat_id, queue in self._queues.items():
+            if chat_id != job.chat_id:
+                ahead += min(len(queue), index + 1)
+        return ahead
+
+    def _next_job(self):
+        # Cache hits first (cheap), then the head of the next chat's queue; the chat goes to the back
+        for cached_only in (True, False):
+            for chat_id, queue in self._queues.items():
+                job = next((j for j in queue if j.cached), None) if cached_only else queue[0]
+                if job is None:
+                    continue
+                queue.remove(job)
+                if queue:
+                    self._queues.move_to_end(chat_id)
+                else:
+                    del self._queues[chat_id]
+                return job
+        return None
+
+    def _dispatch(self):
+        while self._running < self.workers and self._queued:
+            job = self._next_job()
+            self._queued -= 1
+            if job.future.cancelled():
+                continue
+            self._running += 1
+            self._waits.append(time.monotonic() - job.queued_at)
+            asyncio.get_running_loop().create_task(self._run(job))
+
+    async def _run(self, job):
+        try:
+            result = await asyncio.to_thread(job.func, *job.args, **job.kwargs)
+            if not job.future.done():
+                job.future.set_result(result)
+            self.counters['completed'] += 1
+        except Exception as e:
+            self.counters['failed'] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+    def metrics(self):
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3) if waits else 0.0
+
+        return {
+            'running': self._running, 'queued': self._queued, 'chats_waiting': len(self._queues),
+            'workers': self.workers, 'max_queue': self.max_queue,
+            'wait_avg_s': round(sum(waits) / len(waits), 3) if waits else 0.0,
+            'wait_p50_s': pct(0.5), 'wait_p95_s': pct(0.95), 'wait_max_s': round(waits[-1], 3) if waits else 0.0,
+            **self.counters,
+        }
+
+_scheduler = None
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler()
+    return _scheduler
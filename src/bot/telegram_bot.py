@@ -1,76 +1,201 @@
 from telegram import Update
-from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
+from telegram.error import TelegramError
+from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, InlineQueryHandler, MessageHandler, filters
+import asyncio
 import logging
+from datetime import datetime
 import os
+import re
 import sys
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.config import TELEGRAM_BOT_TOKEN
-from src.analysis.engine import AnalysisEngine
+from src.config import TELEGRAM_BOT_TOKEN, BOT_MODE, BOT_CONCURRENT_UPDATES, BOT_RATE_BURST, SNAPSHOT_MAX_AGE
+from src.pipeline import analyze_symbol
+from src.database import latest_snapshot_time
 from src.fetchers.fundamentals import FundamentalFetcher
 from src.fetchers.technicals import TechnicalFetcher
-from src.fetchers.news import NewsFetcher
-from src.renderer.generator import InfographicGenerator
+from src.fetchers.symbols import get_symbol_master
+from src.bot.photos import send_report_photo_async, send_report_album_async
+from src.bot.inline import inline_query
+from src.bot.scheduler import get_scheduler, SchedulerError, RateLimitedError
+from src.renderer.text_report import render_text
+
+# Most symbols answered from one message ("TCS INFY HDFCBANK" or /analyze TCS INFY HDFCBANK); never more
+# than a chat's rate burst, so a full request from an idle chat is not partly rate limited
+MAX_SYMBOLS_PER_REQUEST = min(20, BOT_RATE_BURST)
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
 
+class ProgressMessage:
+    """
+    Placeholder message edited in place as analysis stages finish, then turned into the text report.
+    Edits are serialised; once finish() has run, late stage updates are ignored.
+    """
+
+    def __init__(self, message):
+        self.message = message
+        self.lines = [message.text]
+        self.shown = message.text
+        self.done = False
+        self.lock = asyncio.Lock()
+
+    async def _edit(self, text, parse_mode=None):
+        if text == self.shown:
+            return True
+        try:
+            await self.message.edit_text(text, parse_mode=parse_mode)
+            self.shown = text
+            return True
+        except TelegramError as e:
+            logging.warning(f"Could not update progress message: {e}")
+            return False
+
+    async def update(self):
+        async with self.lock:
+            if not self.done:
+                await self._edit("\n".join(self.lines))
+
+    async def finish(self, text, parse_mode=None):
+        """Replace the placeholder with the final text; False if the edit failed."""
+        async with self.lock:
+            self.done = True
+            return await self._edit(text, parse_mode)
+
+def _stage_line(stage, info):
+    if stage == 'fundamentals':
+        if not info['available']:
+            return "⚠️ Fundamentals unavailable"
+        price = f" · ₹{info['cmp']:.2f}" if info.get('cmp') else ""
+        return f"✅ Fundamentals: {info['score']:.1f}/24{price}"
+    if stage == 'technicals':
+        return f"✅ Technicals: {info['score']:.1f}/5" if info['available'] else "⚠️ Technicals unavailable"
+    if stage == 'news':
+        return f"✅ News: {info['count']} items, scoring..."
+    return None
+
+def _ranking_caption(chunk, ranked):
+    """Album caption: the reports in this album with their overall rank (albums are sent best score first)."""
+    position = {symbol: rank for rank, (symbol, _) in enumerate(ranked, 1)}
+    lines = [f"📊 *{len(ranked)} stocks ranked by score*"]
+    for symbol, result in chunk:
+        rank = position[symbol]
+        lines.append(f"{rank}. {symbol}: {result.get('total_score', 0):.1f}/37 · Swing {result.get('swing_verdict', 'N/A')}"
+                     f" · Long {result.get('long_term_verdict', 'N/A')}")
+    caption = "\n".join(lines)
+    # Telegram media captions are limited to 1024 characters
+    while len(caption) > 1024:
+        lines.pop()
+        caption = "\n".join(lines)
+    return caption
+
+def parse_symbols(text):
+    """
+    Several tickers in one message, as NSE symbols: comma separated, or space separated when every
+    word is a known ticker / alias in the symbol master ("TCS INFY", but not "TATA MOTORS").
+    """
+    master = get_symbol_master()
+    if ',' in text:
+        tokens = [t.strip() for t in text.split(',') if t.strip()]
+        symbols = [master.resolve(t) or t.upper() for t in tokens]
+        if not all(re.match(r'^[A-Z0-9&.\-]+$', s) for s in symbols):
+            return []
+    else:
+        tokens = text.split()
+        # A company name made of several words is one stock
+        if len(tokens) < 2 or master.resolve(text):
+            return []
+        symbols = [master.resolve(t) for t in tokens]
+        if not all(symbols):
+            return []
+    symbols = list(dict.fromkeys(symbols))
+    return symbols if len(symbols) >= 2 else []
+
+def has_fresh_snapshot(symbol):
+    """A snapshot younger than SNAPSHOT_MAX_AGE exists, so analysis can reuse it (scheduled first)."""
+    captured_at = latest_snapshot_time(symbol)
+    return captured_at is not None and (datetime.utcnow() - captured_at).total_seconds() <= SNAPSHOT_MAX_AGE
+
+def _rejected_text(error):
+    if isinstance(error, RateLimitedError):
+        return f"🐢 You're sending requests too quickly. Please try again in {error.retry_after:.0f}s."
+    return "🚦 The bot is busy right now. Please try again in a minute."
+
+def submit_analysis(cid, symbol, cached, **kwargs):
+    """Queue analyze_symbol() on the fair scheduler; a fresh snapshot is reused instead of re-fetching."""
+    return get_scheduler().submit(cid, analyze_symbol, symbol, cached=cached,
+                                  max_age=SNAPSHOT_MAX_AGE if cached else None, **kwargs)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(chat_id=update.effective_chat.id, text="Welcome! Type any stock name (e.g., TATAMOTORS) to get a full analysis report.")
 
-async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE, symbol: str):
+def _report_caption(symbol, result):
+    stale_note = f"⚠️ Live data unavailable, showing snapshot from {result['captured_at'][:16]} UTC\n" if result.get('stale') else ""
+    return (
+        f"📊 *{symbol} Analysis*\n"
+        f"{stale_note}"
+        f"Score: {result['total_score']:.1f}/39\n"
+        f"Risk: {result.get('health_label', 'N/A')}\n"
+        f"Swing: {result.get('swing_verdict', 'N/A')}\n"
+        f"Long Term: {result.get('long_term_verdict', 'N/A')}"
+    )
+
+async def send_report_image(context: ContextTypes.DEFAULT_TYPE, cid, symbol: str, result):
+    """Render the infographic and send it; runs in the background after the text reply."""
+    try:
+        # Rendered in a worker process, or sent by file_id if this exact image was uploaded before
+        logging.info(f"[{symbol}] Sending report image...")
+        await send_report_photo_async(context.bot, cid, symbol, result, caption=_report_caption(symbol, result))
+        logging.info(f"[{symbol}] Finished analysis successfully.")
+    except Exception as e:
+        logging.error(f"Error rendering report for {symbol}: {e}", exc_info=True)
+        await context.bot.send_message(chat_id=cid, text=f"❌ Could not generate the report image for {symbol}. "
+                                                         f"The text summary above is complete.")
+
+async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE, symbol: str, with_image=True):
     cid = update.effective_chat.id
     try:
         logging.info(f"Starting analysis for {symbol}")
-        # 1. Fetch
-        ff = FundamentalFetcher()
-        logging.info(f"[{symbol}] Fetching fundamentals...")
-        fund_data = ff.get_data(symbol)
-        
-        tf = TechnicalFetcher()
-        logging.info(f"[{symbol}] Fetching technicals...")
-        tech_data = tf.get_data(symbol)
-        
-        nf = NewsFetcher()
-        logging.info(f"[{symbol}] Fetching comprehensive news...")
-        news_data = nf.fetch_comprehensive_news(symbol)
-        logging.info(f"[{symbol}] Fetched {len(news_data)} news items")
-        
-        if not fund_data and not tech_data:
-             await context.bot.send_message(chat_id=cid, text=f"⚠️ Could not fetch data for {symbol}. Please verify the ticker.")
-             return
+        placeholder = await context.bot.send_message(chat_id=cid, text=f"⏳ Analyzing {symbol}... Please wait.")
+        progress = ProgressMessage(placeholder)
+        loop = asyncio.get_running_loop()
 
-        # 2. Analyze
-        logging.info(f"[{symbol}] Evaluating stock...")
-        engine = AnalysisEngine()
-        result = engine.evaluate_stock(fund_data, tech_data, news_data)
-        result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-        result['news_items'] = news_data  # Pass news to infographic
-        
-        # 3. Generate Image
-        logging.info(f"[{symbol}] Generating infographic...")
-        output_path = f"{symbol}_report.png"
-        gen = InfographicGenerator()
-        gen.generate_report(symbol, result, output_path)
+        def on_stage(stage, info):
+            # Called from the analysis thread; edits are scheduled back onto the event loop
+            line = _stage_line(stage, info)
+            if line:
+                progress.lines.append(line)
+                asyncio.run_coroutine_threadsafe(progress.update(), loop)
+
+        # 1. Fetch + Analyze (snapshot is persisted by the pipeline) on the scheduler's worker threads
+        cached = await asyncio.to_thread(has_fresh_snapshot, symbol)
+        try:
+            job = submit_analysis(cid, symbol, cached, on_stage=on_stage)
+        except SchedulerError as e:
+            await progress.finish(_rejected_text(e))
+            return
+        if job.position:
+            progress.lines.append(f"🚦 Busy, you are #{job.position} in the queue")
+            await progress.update()
+        result = await job
         
-        # 4. Send Image
-        logging.info(f"[{symbol}] Sending photo to chat...")
-        caption = (
-            f"📊 *{symbol} Analysis*\n"
-            f"Score: {result['total_score']:.1f}/39\n"
-            f"Risk: {result.get('health_label', 'N/A')}\n"
-            f"Swing: {result.get('swing_verdict', 'N/A')}\n"
-            f"Long Term: {result.get('long_term_verdict', 'N/A')}"
-        )
+        if not result:
+             await progress.finish(f"⚠️ Could not fetch data for {symbol}. Please verify the ticker.")
+             return
         
-        with open(output_path, 'rb') as photo:
-            await context.bot.send_photo(chat_id=cid, photo=photo, caption=caption, parse_mode='Markdown')
+        # 2. Placeholder becomes the text report, no rendering involved
+        text, parse_mode = render_text(symbol, result)
+        if not await progress.finish(text, parse_mode):
+            await context.bot.send_message(chat_id=cid, text=text, parse_mode=parse_mode)
         
-        logging.info(f"[{symbol}] Finished analysis successfully.")
+        # 3. Image follows when it is ready, without holding up this handler
+        if with_image:
+            context.application.create_task(send_report_image(context, cid, symbol, result),
+                                            name=f"report-image-{symbol}")
         
     except Exception as e:
         error_msg = str(e)
@@ -84,54 +209,155 @@ async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE, symb
         if len(error_msg) > 200:
             error_msg = error_msg[:200] + "..."
         await context.bot.send_message(chat_id=cid, text=f"❌ Error analyzing {symbol}:\n{error_msg}\n\nPlease check logs for details.")
-    finally:
-        # Cleanup
-        if 'output_path' in locals() and os.path.exists(output_path):
-            os.remove(output_path)
+
+async def analyze_many(update: Update, context: ContextTypes.DEFAULT_TYPE, symbols):
+    """Analyze several symbols in parallel and answer with albums of reports, ranked by score."""
+    cid = update.effective_chat.id
+    if len(symbols) > MAX_SYMBOLS_PER_REQUEST:
+        await context.bot.send_message(chat_id=cid, text=f"⚠️ Up to {MAX_SYMBOLS_PER_REQUEST} stocks per request, "
+                                                         f"analyzing the first {MAX_SYMBOLS_PER_REQUEST}.")
+        symbols = symbols[:MAX_SYMBOLS_PER_REQUEST]
+    try:
+        placeholder = await context.bot.send_message(chat_id=cid, text=f"⏳ Analyzing {len(symbols)} stocks: {', '.join(symbols)}...")
+        progress = ProgressMessage(placeholder)
+        loop = asyncio.get_running_loop()
+
+        # 1. One scheduled analysis per symbol; the scheduler interleaves them with other chats' requests
+        fresh = await asyncio.to_thread(lambda: {s: has_fresh_snapshot(s) for s in symbols})
+        jobs, rejected, error = {}, [], None
+        for symbol in symbols:
+            try:
+                jobs[symbol] = submit_analysis(cid, symbol, fresh[symbol], comprehensive_news=False)
+            except SchedulerError as e:
+                rejected.append(symbol)
+                error = e
+        if not jobs:
+            await progress.finish(_rejected_text(error))
+            return
+        position = max(job.position for job in jobs.values())
+        if position:
+            progress.lines.append(f"🚦 Busy, your last stock is #{position} in the queue")
+            await progress.update()
+
+        async def wait(symbol, job):
+            try:
+                return symbol, await job
+            except Exception as e:
+                logging.error(f"[{symbol}] Analysis failed: {e}")
+                return symbol, None
+
+        results = []
+        for done in asyncio.as_completed([wait(symbol, job) for symbol, job in jobs.items()]):
+            symbol, result = await done
+            if result:
+                results.append((symbol, result))
+                progress.lines.append(f"✅ {symbol}: {result.get('total_score', 0):.1f}/37")
+                await progress.update()
+
+        analyzed = {symbol for symbol, _ in results}
+        missing = [s for s in jobs if s not in analyzed]
+        if not results:
+            await progress.finish(f"⚠️ Could not fetch data for {', '.join(jobs)}. Please verify the tickers.")
+            return
+
+        # 2. Render in parallel and send as albums, best score first
+        ranked = sorted(results, key=lambda item: item[1].get('total_score', 0), reverse=True)
+        summary = f"📊 Analyzed {len(results)}/{len(symbols)} stocks, sending reports..."
+        if missing:
+            summary += f"\n⚠️ No data for: {', '.join(missing)}"
+        if rejected:
+            summary += f"\n{_rejected_text(error)} Skipped: {', '.join(rejected)}"
+        await progress.finish(summary)
+        failed = await send_report_album_async(context.bot, cid, ranked, caption_for=lambda chunk: _ranking_caption(chunk, ranked))
+        if failed:
+            await context.bot.send_message(chat_id=cid, text=f"❌ Could not generate reports for: {', '.join(failed)}")
+    except Exception as e:
+        logging.error(f"Error analyzing {symbols}: {e}", exc_info=True)
+        await context.bot.send_message(chat_id=cid, text=f"❌ Error analyzing {', '.join(symbols)}:\n{str(e)[:200]}")
 
 async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         await context.bot.send_message(chat_id=update.effective_chat.id, text="Please provide a stock name. Usage: /analyze TATAMOTORS")
         return
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Analyzing {context.args[0].upper()}... Please wait.")
+    text = " ".join(context.args)
+    symbol = get_symbol_master().resolve(text)
+    if symbol:
+        await analyze_stock(update, context, symbol)
+        return
+    symbols = parse_symbols(text)
+    if symbols:
+        await analyze_many(update, context, symbols)
+        return
     await analyze_stock(update, context, context.args[0].upper())
 
+async def quick_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Text-only report: scores, verdicts and top reasons without the infographic."""
+    if not context.args:
+        await context.bot.send_message(chat_id=update.effective_chat.id, text="Please provide a stock name. Usage: /quick TATAMOTORS")
+        return
+    # Same lookup as /analyze: ticker, BSE code, alias or company name ("/quick tata motors", "/quick RIL")
+    text = " ".join(context.args)
+    master = get_symbol_master()
+    symbol = master.resolve(text)
+    if symbol:
+        await analyze_stock(update, context, symbol, with_image=False)
+        return
+    results = master.search(text)
+    if results:
+        await analyze_best_match(update, context, text, results, with_image=False)
+        return
+    await analyze_stock(update, context, context.args[0].upper(), with_image=False)
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.message.text:
         return
     text = update.message.text.strip()
     logging.info(f"Received message: {text}")
     
-    # 1. Try as direct ticker if it matches the pattern
-    import re
+    # 1. Exact ticker, BSE code, alias or company name from the local symbol master (no network)
+    master = get_symbol_master()
+    symbol = master.resolve(text)
+    if symbol:
+        await analyze_stock(update, context, symbol)
+        return
+
+    # 2. Several tickers in one message
+    symbols = parse_symbols(text)
+    if symbols:
+        await analyze_many(update, context, symbols)
+        return
+
+    # 3. Symbol master not downloaded yet: probe the fetchers to see if it's a real ticker
     ff = FundamentalFetcher()
-    if re.match(r'^[A-Za-z0-9&.\-]+$', text):
+    if not len(master) and re.match(r'^[A-Za-z0-9&.\-]+$', text):
         symbol = text.upper()
-        # Peek at data to see if it's a real ticker
-        # We'll just try to analyze it. If it fails, we fall through to search.
-        # But wait, analyze_stock is async and does its own messaging.
-        # Let's check data first
         logging.info(f"Checking if {symbol} is a direct ticker...")
-        fund_data = ff.get_data(symbol)
+        fund_data = await asyncio.to_thread(ff.get_data, symbol)
         tf = TechnicalFetcher()
-        tech_data = tf.get_data(symbol)
+        tech_data = await asyncio.to_thread(tf.get_data, symbol)
         
         if fund_data or (tech_data and tech_data.get('indicators_available')):
-            await context.bot.send_message(chat_id=update.effective_chat.id, text=f"🔍 Analyzing ticker {symbol}... Please wait.")
             await analyze_stock(update, context, symbol)
             return
         else:
             logging.info(f"{symbol} not found as direct ticker. Trying search...")
 
-    # 2. Treat as Name Search (or fallback from failed ticker)
-    results = ff.search_ticker(text)
+    # 4. Prefix / fuzzy name search on the symbol master, Screener search as the fallback
+    results = master.search(text)
+    if not results:
+        results = await asyncio.to_thread(ff.search_ticker, text)
     
     if not results:
         await context.bot.send_message(chat_id=update.effective_chat.id, text=f"❌ Could not find any stock matching '{text}'. Please try a different name or ticker.")
-    elif len(results) == 1:
+    else:
+        await analyze_best_match(update, context, text, results)
+
+async def analyze_best_match(update: Update, context: ContextTypes.DEFAULT_TYPE, text, results, with_image=True):
+    """Analyze the first of [(name, symbol)] search results, listing the other matches as suggestions."""
+    if len(results) == 1:
         name, symbol = results[0]
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"🎯 Found: *{name}* ({symbol})\nAnalyzing now...", parse_mode='Markdown')
-        await analyze_stock(update, context, symbol)
+        await context.bot.send_message(chat_id=update.effective_chat.id, text=f"🎯 Found: *{name}* ({symbol})", parse_mode='Markdown')
+        await analyze_stock(update, context, symbol, with_image=with_image)
     else:
         best_name, best_symbol = results[0]
         suggestions = "\n".join([f"• `{r[1]}` ({r[0]})" for r in results[1:5]])
@@ -140,18 +366,32 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text=f"🤔 Found multiple matches for '{text}'.\n\nI'll analyze the best match: *{best_name}* (`{best_symbol}`)\n\nOther possibilities:\n{suggestions}",
             parse_mode='Markdown'
         )
-        await analyze_stock(update, context, best_symbol)
+        await analyze_stock(update, context, best_symbol, with_image=with_image)
 
-if __name__ == '__main__':
-    if not TELEGRAM_BOT_TOKEN:
-        print("Error: TELEGRAM_BOT_TOKEN not found in config/env.")
-        exit(1)
-        
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Analysis queue metrics: load and how long requests waited for a worker."""
+    m = get_scheduler().metrics()
+    text = (
+        f"📈 Analysis queue\n"
+        f"Running: {m['running']}/{m['workers']} · Waiting: {m['queued']}/{m['max_queue']} ({m['chats_waiting']} chats)\n"
+        f"Wait: avg {m['wait_avg_s']:.2f}s · p50 {m['wait_p50_s']:.2f}s · p95 {m['wait_p95_s']:.2f}s · max {m['wait_max_s']:.2f}s\n"
+        f"Analyses: {m['completed']} done, {m['failed']} failed, {m['cached']} from snapshots, {m['waited']} had to wait\n"
+        f"Rejected: {m['rate_limited']} rate limited, {m['queue_full']} queue full"
+    )
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=text)
+
+def build_application(webhook=False):
+    """The bot with all handlers registered. In webhook mode updates are fed in by src/bot/webhook.py."""
+    builder = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).concurrent_updates(BOT_CONCURRENT_UPDATES)
+    if webhook:
+        builder = builder.updater(None)
+    application = builder.build()
     
     start_handler = CommandHandler('start', start)
     analyze_handler = CommandHandler('analyze', analyze_command)
     stock_handler = CommandHandler('stock', analyze_command)
+    quick_handler = CommandHandler('quick', quick_command)
+    stats_handler = CommandHandler('stats', stats_command)
     
     # Text handler for direct symbols
     text_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
@@ -159,7 +399,21 @@ if __name__ == '__main__':
     application.add_handler(start_handler)
     application.add_handler(analyze_handler)
     application.add_handler(stock_handler)
+    application.add_handler(quick_handler)
+    application.add_handler(stats_handler)
     application.add_handler(text_handler)
+    application.add_handler(InlineQueryHandler(inline_query))
+    return application
+
+if __name__ == '__main__':
+    if not TELEGRAM_BOT_TOKEN:
+        print("Error: TELEGRAM_BOT_TOKEN not found in config/env.")
+        exit(1)
+    if BOT_MODE == 'webhook':
+        print("BOT_MODE=webhook: updates are received by the web app (gunicorn src.web.app:app), not polled.")
+        exit(1)
+        
+    application = build_application()
     
     print("Bot is polling...")
     application.run_polling()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import requests
+from telegram import Bot, Update
+from src.config import TELEGRAM_BOT_TOKEN, WEBHOOK_URL, WEBHOOK_SECRET
+from src.bot.telegram_bot import build_application
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = '/telegram/webhook'
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+# Longest wait for the Application to initialize (it calls getMe) when the first update arrives
+START_TIMEOUT = 30
+
+class WebhookError(RuntimeError):
+    """The bot could not be started in this worker."""
+
+class WebhookBot:
+    """
+    The bot Application on its own event loop thread inside a web worker (BOT_MODE=webhook).
+    Updates POSTed to the webhook route are queued onto that loop and handled by the Application,
+    several at a time, exactly like polled updates. It is started by the first update, never at
+    import time, and registering the webhook with Telegram is a separate deploy step
+    (register_webhook, run by start.sh).
+
+    Every gunicorn worker has its own WebhookBot, Application and FairScheduler, so per-chat rate
+    limits, the analysis worker limit and /bot/metrics are per worker. start.sh runs gunicorn with
+    its default single worker; with --workers N a chat can get up to N times its rate budget.
+    """
+
+    def __init__(self, application=None):
+        self.application = application
+        self.loop = None
+        self._thread = None
+        self._error = None
+        self._lock = threading.Lock()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.application.initialize())
+            self.loop.run_until_complete(self.application.start())
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            ready.set()
+        self.loop.run_forever()
+
+    def call(self, coro, timeout=30):
+        """Run a coroutine on the bot's loop from a web thread and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def start(self):
+        """Start the loop thread once per process. Raises WebhookError if the bot cannot initialize."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.application = self.application or build_application(webhook=True)
+            self.loop = asyncio.new_event_loop()
+            self._error = None
+            ready = threading.Event()
+            thread = threading.Thread(target=self._run, args=(ready,), name='telegram-webhook', daemon=True)
+            thread.start()
+            if not ready.wait(START_TIMEOUT) or self._error is not None:
+                # Telegram slow or unreachable: the next update tries again with a fresh Application
+                error = self._error or TimeoutError(f"no answer within {START_TIMEOUT}s")
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.application = None
+                raise WebhookError(f"Telegram bot could not start: {error!r}")
+            self._thread = thread
+            atexit.register(self.stop)
+        logger.info("Telegram bot started in webhook mode")
+
+    def process(self, data):
+        """
+        Queue one update (the decoded JSON body Telegram posted); returns once it is queued.
+        The first update of a worker starts the bot (WebhookError if that fails).
+        """
+        if self._thread is None:
+            self.start()
+        update = Update.de_json(data, self.application.bot)
+        self.call(self.application.update_queue.put(update), timeout=5)
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self.call(self.application.stop())
+            self.call(self.application.shutdown())
+        except Exception as e:
+            logger.error(f"Error stopping webhook bot: {e!r}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        thread.join(timeout=5)
+
+def register_webhook(url=WEBHOOK_URL):
+    """Point Telegram at this app's webhook route. Once per deploy (start.sh), not per worker."""
+    if not url:
+        raise WebhookError("WEBHOOK_URL is not set; Telegram cannot be told where to send updates")
+
+    async def _register():
+        async with Bot(TELEGRAM_BOT_TOKEN) as bot:
+            await bot.set_webhook(url=url + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET,
+                                  allowed_updates=Update.ALL_TYPES)
+
+    asyncio.run(_register())
+    logger.info(f"Webhook registered at {url}{WEBHOOK_PATH}")
+
+_webhook_bot = None
+_webhook_lock = threading.Lock()
+
+def get_webhook_bot():
+    global _webhook_bot
+    if _webhook_bot is None:
+        with _webhook_lock:
+            if _webhook_bot is None:
+                _webhook_bot = WebhookBot()
+    return _webhook_bot
+
+def replay(files, url):
+    """POST recorded update JSON files (one update or a list each) to a running web app."""
+    for path in files:
+        with open(path) as f:
+            payload = json.load(f)
+        for update in payload if isinstance(payload, list) else [payload]:
+            resp = requests.post(url.rstrip("/") + WEBHOOK_PATH, json=update, headers={SECRET_HEADER: WEBHOOK_SECRET})
+            print(f"{path} update {update.get('update_id')}: {resp.status_code} {resp.text.strip()}")
+
+if __name__ == '__main__':
+    #   python -m src.bot.webhook register                  (deploy step, see start.sh)
+    #   python -m src.bot.webhook replay update.json --url http://127.0.0.1:5000
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Telegram webhook tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    register = subparsers.add_parser("register", help="Point Telegram at WEBHOOK_URL + " + WEBHOOK_PATH)
+    register.add_argument("--url", default=WEBHOOK_URL, help="Public base URL (default WEBHOOK_URL)")
+    replayer = subparsers.add_parser("replay", help="POST recorded Telegram update JSON to the webhook route")
+    replayer.add_argument("files", nargs="+", help="JSON files, each one update or a list of updates")
+    replayer.add_argument("--url", default="http://127.0.0.1:5000", help="Base URL of the web app")
+    args = parser.parse_args()
+
+    if args.command == "register":
+        try:
+            register_webhook(args.url.rstrip("/"))
+        except Exception as e:
+            logger.error(f"Webhook registration failed: {e!r}")
+            raise SystemExit(1)
+    else:
+        replay(args.files, args.url)
@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 # Base Paths
@@ -14,9 +15,86 @@ MONEYCONTROL_URL = "https://www.moneycontrol.com/"
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "8468277745:AAE5EpRJGZOM7Pip8BfHR-_s7UQIUyMIbbM")
 TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID", "-5057435695")
 
+# Telegram file_id reuse: the file_id of an uploaded report is stored per content hash and
+# identical reports are resent by file_id (no upload) for this many days
+TELEGRAM_FILE_ID_DAYS = int(os.getenv("TELEGRAM_FILE_ID_DAYS", "30"))
+
+# Bot transport: "polling" (separate process, start.sh) or "webhook" (updates POSTed to the web app at
+# /telegram/webhook). WEBHOOK_URL is the public base URL (Render sets RENDER_EXTERNAL_URL); the secret
+# is sent back by Telegram in a header and defaults to a value derived from the bot token.
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", os.getenv("RENDER_EXTERNAL_URL", "")).rstrip("/")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", hashlib.sha256(TELEGRAM_BOT_TOKEN.encode()).hexdigest()[:32])
+# Updates handled at the same time (analyses spend most of their time waiting on fetches and renders)
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "8"))
+
+# Bot analysis scheduler (src/bot/scheduler.py): analyses run at most BOT_ANALYSIS_WORKERS at a time,
+# chats take turns, at most BOT_QUEUE_SIZE wait. Each chat may start BOT_RATE_BURST analyses at once,
+# refilled at BOT_RATE_PER_MINUTE; symbols with a fresh snapshot go first and use no rate budget.
+# A multi-stock message is capped at BOT_RATE_BURST symbols, so an idle chat's request always fits.
+BOT_ANALYSIS_WORKERS = int(os.getenv("BOT_ANALYSIS_WORKERS", "4"))
+BOT_QUEUE_SIZE = int(os.getenv("BOT_QUEUE_SIZE", "50"))
+BOT_RATE_BURST = int(os.getenv("BOT_RATE_BURST", "20"))
+BOT_RATE_PER_MINUTE = float(os.getenv("BOT_RATE_PER_MINUTE", "6"))
+
 # News API Keys (Free Tiers)
 MARKETAUX_API_TOKEN = os.getenv("MARKETAUX_API_TOKEN", "")
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY", "")
 
 # Scoring Constants
 TOTAL_PARAMETERS = 39
+
+# Snapshots (seconds): reuse a stored evaluation younger than this instead of re-fetching
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "900"))
+
+# Database connection pool (process-wide engine in src/database.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+# Snapshot retention: intraday rows older than INTRADAY_DAYS are compacted to one row per day,
+# daily rows older than RETENTION_DAYS are deleted (3 years covers 8+ quarters of history)
+SNAPSHOT_INTRADAY_DAYS = int(os.getenv("SNAPSHOT_INTRADAY_DAYS", "7"))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "1095"))
+# auto: compaction/retention run once a day in a background thread after a save;
+# cron: only `python -m src.main maintain` runs them (schedule it yourself)
+SNAPSHOT_MAINTENANCE = os.getenv("SNAPSHOT_MAINTENANCE", "auto").lower()
+
+# Report image encoding: png, png-optimized, png-palette, webp-lossless, webp, jpeg or auto
+# (auto = smallest candidate meeting the quality threshold, see src/renderer/encoders.py)
+REPORT_IMAGE_FORMAT = os.getenv("REPORT_IMAGE_FORMAT", "png-palette")
+
+# Rendered image cache (content hash -> encoded image): in-memory LRU + files under RENDER_CACHE_DIR
+# (set RENDER_CACHE_DIR to an empty string to keep the cache in memory only)
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(DATA_DIR, 'render_cache'))
+RENDER_CACHE_MEMORY_MB = int(os.getenv("RENDER_CACHE_MEMORY_MB", "64"))
+RENDER_CACHE_DISK_MB = int(os.getenv("RENDER_CACHE_DISK_MB", "512"))
+
+# Report fonts (src/renderer/fonts.py): RENDER_FONT overrides the primary .ttf, RENDER_FALLBACK_FONTS
+# (os.pathsep separated) are tried first for emoji / symbols the primary font has no glyph for
+RENDER_FONT = os.getenv("RENDER_FONT", "")
+RENDER_FALLBACK_FONTS = [p for p in os.getenv("RENDER_FALLBACK_FONTS", "").split(os.pathsep) if p]
+
+# Render worker processes (src/renderer/pool.py): at most RENDER_MAX_PENDING renders queued or running,
+# callers wait up to RENDER_TIMEOUT seconds for a slot / the result. RENDER_WORKERS=0 renders inline.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(2, os.cpu_count() or 1))))
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", str(max(RENDER_WORKERS, 1) * 4)))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "30"))
+
+# Daily digest (src/renderer/digest.py): default watchlist, parallel fetch threads, cards per image
+DIGEST_WATCHLIST = [s.strip() for s in os.getenv(
+    "DIGEST_WATCHLIST", "RELIANCE,TCS,HDFCBANK,INFY,ICICIBANK,ITC,SBIN,BHARTIARTL,LT").split(",") if s.strip()]
+DIGEST_WORKERS = int(os.getenv("DIGEST_WORKERS", "4"))
+DIGEST_MAX_CARDS = int(os.getenv("DIGEST_MAX_CARDS", "60"))
+
+# Inline mode (@bot SYMBOL, src/bot/inline.py): answered from stored snapshots; when nothing is stored
+# a live analysis gets INLINE_QUERY_TIMEOUT seconds before a "try again" result is returned
+INLINE_QUERY_TIMEOUT = float(os.getenv("INLINE_QUERY_TIMEOUT", "2.5"))
+
+# Local symbol master (src/fetchers/symbols.py): NSE equity list (+ BSE scrip codes) cached in
+# SYMBOL_MASTER_DIR and re-downloaded in the background when older than SYMBOL_MASTER_REFRESH_HOURS
+SYMBOL_MASTER_URL = os.getenv("SYMBOL_MASTER_URL", "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv")
+SYMBOL_MASTER_BSE_URL = os.getenv(
+    "SYMBOL_MASTER_BSE_URL",
+    "https://api.bseindia.com/BseIndiaAPI/api/ListofScripData/w?Group=&Scripcode=&industry=&segment=Equity&status=Active")
+SYMBOL_MASTER_DIR = os.getenv("SYMBOL_MASTER_DIR", os.path.join(DATA_DIR, 'symbols'))
+SYMBOL_MASTER_REFRESH_HOURS = float(os.getenv("SYMBOL_MASTER_REFRESH_HOURS", "24"))
@@ -1,8 +1,18 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
-from datetime import datetime
-from src.config import DB_PATH
+from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Date, Text, Index, event, insert, select, update, delete, func, inspect, text
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date
+from src.config import (DB_PATH, DB_POOL_SIZE, DB_MAX_OVERFLOW, SNAPSHOT_INTRADAY_DAYS, SNAPSHOT_RETENTION_DAYS,
+                        SNAPSHOT_MAINTENANCE, TELEGRAM_FILE_ID_DAYS)
+from src.analysis.engine import FUNDAMENTAL_PARAMS, TECHNICAL_PARAMS, NEWS_PARAMS
+import json
+import logging
 import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -12,48 +22,76 @@ class Stock(Base):
     symbol = Column(String, unique=True, nullable=False)
     name = Column(String)
     sector = Column(String)
-    
+
     fundamentals = relationship("Fundamental", back_populates="stock")
     technicals = relationship("Technical", back_populates="stock")
     news_trends = relationship("NewsTrend", back_populates="stock")
-    scores = relationship("Score", back_populates="stock", uselist=False)
+    scores = relationship("Score", back_populates="stock")
     reports = relationship("Report", back_populates="stock")
 
 class Fundamental(Base):
     __tablename__ = 'fundamentals'
+    __table_args__ = (
+        Index('ix_fundamentals_stock_date', 'stock_id', 'param_code', 'snapshot_date'),
+        Index('ix_fundamentals_param_date', 'param_code', 'snapshot_date'),
+    )
     id = Column(Integer, primary_key=True)
     stock_id = Column(Integer, ForeignKey('stocks.id'))
     param_code = Column(String)
     value = Column(Float)
+    display_value = Column(String) # Value exactly as shown on the report
     score = Column(Float) # 0, 0.5, 1
     status = Column(String) # Positive/Neutral/Negative
-    
+    captured_at = Column(DateTime, default=datetime.utcnow)
+    snapshot_date = Column(Date) # Day bucket used by history queries and compaction
+    granularity = Column(String, default='intraday') # intraday | daily (after compaction)
+
     stock = relationship("Stock", back_populates="fundamentals")
 
 class Technical(Base):
     __tablename__ = 'technicals'
+    __table_args__ = (
+        Index('ix_technicals_stock_date', 'stock_id', 'param_code', 'snapshot_date'),
+        Index('ix_technicals_param_date', 'param_code', 'snapshot_date'),
+    )
     id = Column(Integer, primary_key=True)
     stock_id = Column(Integer, ForeignKey('stocks.id'))
     param_code = Column(String)
     value = Column(Float)
+    display_value = Column(String)
     score = Column(Float)
     status = Column(String)
-    
+    captured_at = Column(DateTime, default=datetime.utcnow)
+    snapshot_date = Column(Date) # Day bucket used by history queries and compaction
+    granularity = Column(String, default='intraday') # intraday | daily (after compaction)
+
     stock = relationship("Stock", back_populates="technicals")
 
 class NewsTrend(Base):
     __tablename__ = 'news_trends'
+    __table_args__ = (
+        Index('ix_news_trends_stock_date', 'stock_id', 'param_code', 'snapshot_date'),
+        Index('ix_news_trends_param_date', 'param_code', 'snapshot_date'),
+    )
     id = Column(Integer, primary_key=True)
     stock_id = Column(Integer, ForeignKey('stocks.id'))
     param_code = Column(String)
     value = Column(Float) # Could be 1/0 for boolean flags or count
+    display_value = Column(String)
     score = Column(Float)
     status = Column(String)
-    
+    captured_at = Column(DateTime, default=datetime.utcnow)
+    snapshot_date = Column(Date) # Day bucket used by history queries and compaction
+    granularity = Column(String, default='intraday') # intraday | daily (after compaction)
+
     stock = relationship("Stock", back_populates="news_trends")
 
 class Score(Base):
     __tablename__ = 'scores'
+    __table_args__ = (
+        Index('ix_scores_stock_date', 'stock_id', 'snapshot_date'),
+        Index('ix_scores_date', 'snapshot_date'),
+    )
     id = Column(Integer, primary_key=True)
     stock_id = Column(Integer, ForeignKey('stocks.id'))
     fundamental_score = Column(Float)
@@ -61,7 +99,12 @@ class Score(Base):
     news_score = Column(Float)
     total_score = Column(Float)
     health_label = Column(String) # Buy/Hold/Avoid
-    
+    cmp = Column(Float)
+    payload = Column(Text) # JSON: verdicts, summaries and news items of the evaluation
+    captured_at = Column(DateTime, default=datetime.utcnow)
+    snapshot_date = Column(Date) # Day bucket used by history queries and compaction
+    granularity = Column(String, default='intraday') # intraday | daily (after compaction)
+
     stock = relationship("Stock", back_populates="scores")
 
 class Report(Base):
@@ -70,18 +113,591 @@ class Report(Base):
     stock_id = Column(Integer, ForeignKey('stocks.id'))
     image_path = Column(String)
     generated_at = Column(DateTime, default=datetime.utcnow)
-    
+
     stock = relationship("Stock", back_populates="reports")
 
+class TelegramFile(Base):
+    __tablename__ = 'telegram_files'
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String, unique=True, nullable=False) # Render cache key of the image
+    file_id = Column(String, nullable=False) # Returned by Telegram for the uploaded photo
+    uses = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# Which table each engine parameter is stored in
+PARAM_MODELS = [(Fundamental, FUNDAMENTAL_PARAMS), (Technical, TECHNICAL_PARAMS), (NewsTrend, NEWS_PARAMS)]
+SNAPSHOT_MODELS = [Fundamental, Technical, NewsTrend, Score]
+
+# Result keys stored in dedicated columns (or added back on load) rather than in Score.payload
+_NON_PAYLOAD_KEYS = {'fundamental_score', 'technical_score', 'news_score', 'total_score', 'health_label',
+                     'cmp', 'details', 'symbol', 'captured_at', 'stale'}
+
+# SQLite tuning applied to every pooled connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',      # web and bot processes can write concurrently
+    'synchronous': 'NORMAL',    # safe with WAL, avoids an fsync per commit
+    'busy_timeout': 5000,       # wait for the other writer instead of "database is locked"
+    'cache_size': -64000,       # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,     # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+# Thread-local sessions; always bound to the process-wide engine by session_scope()
+Session = scoped_session(sessionmaker(expire_on_commit=False))
+
+def _create_engine():
+    engine = create_engine(
+        f'sqlite:///{DB_PATH}',
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        connect_args={'timeout': 30, 'check_same_thread': False}
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, conn_record):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+def get_engine():
+    """Process-wide engine + connection pool. Re-created after a fork (gunicorn / render workers)."""
+    global _engine, _engine_pid
+    if _engine is None or _engine_pid != os.getpid():
+        with _engine_lock:
+            if _engine is None or _engine_pid != os.getpid():
+                if _engine is not None:
+                    # Inherited from the parent process: drop the pool without closing its connections
+                    _engine.dispose(close=False)
+                os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+                _engine = _create_engine()
+                _engine_pid = os.getpid()
+    return _engine
+
+def _add_missing_columns(engine):
+    """create_all() never alters existing tables, so add columns introduced after a DB was created."""
+    inspector = inspect(engine)
+    added = set()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                    logger.info(f"Added column {table.name}.{column.name}")
+                    added.add((table.name, column.name))
+    return added
+
+def _create_missing_indexes(engine, added_columns):
+    """Indexes added to tables that already existed are not created by create_all() either."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        # Backfill rows written before snapshot_date existed
+        for model in SNAPSHOT_MODELS:
+            if (model.__tablename__, 'snapshot_date') not in added_columns:
+                continue
+            conn.execute(update(model)
+                         .where(model.snapshot_date.is_(None), model.captured_at.is_not(None))
+                         .values(snapshot_date=func.date(model.captured_at), granularity='intraday'))
+
+def _analyze(engine, force=False):
+    """
+    Gather query planner statistics (sqlite_stat1). Without them SQLite assumes ix_*_param_date is as
+    selective as ix_*_stock_date and scans a parameter's whole history instead of probing one snapshot.
+    Runs on first start and from the daily maintenance; a full ANALYZE takes well under a second.
+    """
+    with engine.begin() as conn:
+        if not force:
+            has_stats = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first()
+            if has_stats and conn.execute(text("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'fundamentals'")).first():
+                return
+        conn.execute(text("ANALYZE"))
+
 def init_db():
-    # Ensure data directory exists
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    
-    engine = create_engine(f'sqlite:///{DB_PATH}')
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    added = _add_missing_columns(engine)
+    _create_missing_indexes(engine, added)
+    _analyze(engine)
     return engine
 
 def get_session():
-    engine = create_engine(f'sqlite:///{DB_PATH}')
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """A new standalone session on the shared engine. Caller is responsible for closing it."""
+    _ensure_schema()
+    return sessionmaker(bind=get_engine())()
+
+@contextmanager
+def session_scope():
+    """
+    Transactional scope around the calling thread's session:
+        with session_scope() as session:
+            session.add(...)
+    Commits on success, rolls back on error and always releases the connection to the pool.
+    """
+    _ensure_schema()
+    session = Session(bind=get_engine())
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        Session.remove()
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _ensure_schema():
+    global _schema_ready
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                init_db()
+                _schema_ready = True
+
+def _parse_number(value):
+    """Pull the leading number out of a display value like '64.6%', 'P/B: 12.5' or '23.89 (Ind: 0.00)'."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'-?\d+(?:\.\d+)?', str(value or ''))
+    return float(match.group()) if match else None
+
+def save_evaluations(evaluations, captured_at=None):
+    """
+    Persist a batch of (symbol, evaluate_stock result) pairs as timestamped snapshots.
+    All rows of the batch are written with bulk inserts in a single transaction.
+    Returns the number of evaluations saved.
+    """
+    evaluations = [(symbol.upper(), result) for symbol, result in evaluations if result]
+    if not evaluations:
+        return 0
+    captured_at = captured_at or datetime.utcnow()
+
+    try:
+        with session_scope() as session:
+            # 1. Make sure every symbol has a Stock row
+            symbols = {symbol for symbol, _ in evaluations}
+            stock_ids = dict(session.execute(
+                select(Stock.symbol, Stock.id).where(Stock.symbol.in_(symbols))).all())
+            missing = symbols - set(stock_ids)
+            if missing:
+                # OR IGNORE: another process may add the same symbol concurrently
+                session.execute(insert(Stock).prefix_with('OR IGNORE'), [{'symbol': s} for s in sorted(missing)])
+                stock_ids = dict(session.execute(
+                    select(Stock.symbol, Stock.id).where(Stock.symbol.in_(symbols))).all())
+
+            # 2. Parameter rows, grouped per table
+            param_rows = {model: [] for model, _ in PARAM_MODELS}
+            score_rows = []
+            for symbol, result in evaluations:
+                stock_id = stock_ids[symbol]
+                details = result.get('details', {})
+                for model, params in PARAM_MODELS:
+                    for param in params:
+                        if param not in details:
+                            continue
+                        item = details[param]
+                        param_rows[model].append({
+                            'stock_id': stock_id,
+                            'param_code': param,
+                            'value': _parse_number(item.get('value')),
+                            'display_value': str(item.get('value')),
+                            'score': item.get('score'),
+                            'status': item.get('status'),
+                            'captured_at': captured_at,
+                            'snapshot_date': captured_at.date(),
+                            'granularity': 'intraday'
+                        })
+
+                payload = {k: v for k, v in result.items() if k not in _NON_PAYLOAD_KEYS}
+                score_rows.append({
+                    'stock_id': stock_id,
+                    'fundamental_score': result.get('fundamental_score'),
+                    'technical_score': result.get('technical_score'),
+                    'news_score': result.get('news_score'),
+                    'total_score': result.get('total_score'),
+                    'health_label': result.get('health_label'),
+                    'cmp': _parse_number(result.get('cmp')),
+                    'payload': json.dumps(payload, default=str),
+                    'captured_at': captured_at,
+                    'snapshot_date': captured_at.date(),
+                    'granularity': 'intraday'
+                })
+
+            # 3. Bulk insert (executemany) per table
+            for model, rows in param_rows.items():
+                if rows:
+                    session.execute(insert(model), rows)
+            session.execute(insert(Score), score_rows)
+
+        logger.info(f"Saved {len(evaluations)} evaluation snapshot(s)")
+        _maybe_maintain()
+        return len(evaluations)
+    except Exception as e:
+        logger.error(f"Error saving evaluations: {e}")
+        return 0
+
+def load_latest_evaluation(symbol, max_age=None):
+    """
+    Rebuild the most recent stored evaluation of a symbol in the evaluate_stock() result format.
+    max_age (seconds) skips snapshots older than that. Returns None if nothing usable is stored.
+    """
+    try:
+        with session_scope() as session:
+            stock = session.execute(select(Stock).where(Stock.symbol == symbol.upper())).scalar_one_or_none()
+            if stock is None:
+                return None
+
+            query = select(Score).where(Score.stock_id == stock.id)
+            if max_age is not None:
+                query = query.where(Score.captured_at >= datetime.utcnow() - timedelta(seconds=max_age))
+            score = session.execute(query.order_by(Score.captured_at.desc(), Score.id.desc()).limit(1)).scalar_one_or_none()
+            if score is None:
+                return None
+
+            result = json.loads(score.payload) if score.payload else {}
+            result.update({
+                'symbol': stock.symbol,
+                'fundamental_score': score.fundamental_score or 0,
+                'technical_score': score.technical_score or 0,
+                'news_score': score.news_score or 0,
+                'total_score': score.total_score or 0,
+                'health_label': score.health_label,
+                'cmp': score.cmp or 0,
+                'captured_at': score.captured_at.isoformat(),
+                'details': {}
+            })
+
+            for model, _ in PARAM_MODELS:
+                rows = session.execute(
+                    select(model)
+                    .where(model.stock_id == stock.id, model.captured_at == score.captured_at)
+                    .order_by(model.id)).scalars()
+                for row in rows:
+                    result['details'][row.param_code] = {
+                        'value': row.display_value, 'score': row.score, 'status': row.status}
+            return result
+    except Exception as e:
+        logger.error(f"Error loading stored evaluation for {symbol}: {e}")
+        return None
+
+def load_telegram_file_id(content_hash, max_age_days=TELEGRAM_FILE_ID_DAYS):
+    """file_id of an image already uploaded to Telegram, or None if unknown or expired."""
+    try:
+        with session_scope() as session:
+            row = session.execute(
+                select(TelegramFile).where(TelegramFile.content_hash == content_hash)).scalar_one_or_none()
+            if row is None:
+                return None
+            if row.created_at < datetime.utcnow() - timedelta(days=max_age_days):
+                session.delete(row)
+                return None
+            row.uses = (row.uses or 0) + 1
+            return row.file_id
+    except Exception as e:
+        logger.error(f"Error loading Telegram file_id: {e}")
+        return None
+
+def save_telegram_file_id(content_hash, file_id, max_age_days=TELEGRAM_FILE_ID_DAYS):
+    """Remember the file_id of an uploaded image; expired mappings are dropped in the same write."""
+    try:
+        with session_scope() as session:
+            session.execute(delete(TelegramFile).where(
+                TelegramFile.created_at < datetime.utcnow() - timedelta(days=max_age_days)))
+            # OR REPLACE: a re-upload after a rejected file_id overwrites the old mapping
+            session.execute(insert(TelegramFile).prefix_with('OR REPLACE'),
+                            [{'content_hash': content_hash, 'file_id': file_id, 'uses': 0,
+                              'created_at': datetime.utcnow()}])
+    except Exception as e:
+        logger.error(f"Error saving Telegram file_id: {e}")
+
+def forget_telegram_file_id(content_hash):
+    """Drop a mapping Telegram no longer accepts."""
+    try:
+        with session_scope() as session:
+            session.execute(delete(TelegramFile).where(TelegramFile.content_hash == content_hash))
+    except Exception as e:
+        logger.error(f"Error removing Telegram file_id: {e}")
+
+def _param_model(param_code):
+    for model, params in PARAM_MODELS:
+        if param_code in params:
+            return model
+    raise ValueError(f"Unknown parameter: {param_code}")
+
+def _edge_ids(model, partition, *where, first=False):
+    """
+    Ids of the last (first=True: earliest) row of each partition by captured_at, then id.
+    Ids alone are not chronological: save_evaluations(captured_at=...) can backfill older snapshots.
+    """
+    order = [model.captured_at, model.id] if first else [model.captured_at.desc(), model.id.desc()]
+    ranked = (select(model.id, func.row_number().over(partition_by=partition, order_by=order).label('rank'))
+              .where(*where).subquery())
+    return select(ranked.c.id).where(ranked.c.rank == 1)
+
+def compact_snapshots(intraday_days=SNAPSHOT_INTRADAY_DAYS):
+    """
+    Collapse intraday rows older than intraday_days into one daily row per (stock, param, day).
+    The last evaluation of each day (by captured_at) is kept, so param rows and Score rows stay in step.
+    Returns the number of rows deleted.
+    """
+    cutoff = date.today() - timedelta(days=intraday_days)
+    deleted = 0
+    with session_scope() as session:
+        for model in SNAPSHOT_MODELS:
+            group = [model.stock_id, model.snapshot_date]
+            if model is not Score:
+                group.insert(1, model.param_code)
+            keep = _edge_ids(model, group, model.snapshot_date < cutoff)
+            res = session.execute(delete(model).where(
+                model.snapshot_date < cutoff,
+                model.granularity == 'intraday',
+                model.id.not_in(keep)))
+            deleted += res.rowcount or 0
+            session.execute(update(model)
+                            .where(model.snapshot_date < cutoff, model.granularity == 'intraday')
+                            .values(granularity='daily'))
+    return deleted
+
+def apply_retention(retention_days=SNAPSHOT_RETENTION_DAYS):
+    """Delete snapshots older than retention_days. Returns the number of rows deleted."""
+    cutoff = date.today() - timedelta(days=retention_days)
+    deleted = 0
+    with session_scope() as session:
+        for model in SNAPSHOT_MODELS:
+            res = session.execute(delete(model).where(model.snapshot_date < cutoff))
+            deleted += res.rowcount or 0
+    return deleted
+
+def run_maintenance():
+    """Compaction, retention and fresh planner statistics. Returns (rows compacted, rows expired)."""
+    compacted = compact_snapshots()
+    expired = apply_retention()
+    _analyze(get_engine(), force=True)
+    logger.info(f"Snapshot maintenance: compacted {compacted} rows, expired {expired} rows")
+    return compacted, expired
+
+_last_maintenance = None
+_maintenance_lock = threading.Lock()
+
+def _claim_maintenance(now):
+    """
+    At most one run a day per database, across processes (bot, gunicorn workers, CLI):
+    the mtime of a marker file next to the DB records the last run.
+    """
+    marker = f"{DB_PATH}.maintained"
+    try:
+        if now - os.path.getmtime(marker) < 86400:
+            return False
+    except OSError:
+        pass
+    with open(marker, 'a'):
+        pass
+    os.utime(marker, (now, now))
+    return True
+
+def _maintenance_worker():
+    try:
+        run_maintenance()
+    except Exception as e:
+        logger.error(f"Snapshot maintenance failed: {e}")
+
+def _maybe_maintain():
+    """Start run_maintenance() in a background thread at most once a day, so a save never waits for it."""
+    global _last_maintenance
+    if SNAPSHOT_MAINTENANCE != 'auto':
+        return
+    now = datetime.utcnow()
+    with _maintenance_lock:
+        if _last_maintenance and now - _last_maintenance < timedelta(days=1):
+            return
+        _last_maintenance = now
+        try:
+            if not _claim_maintenance(time.time()):
+                return
+        except OSError as e:
+            logger.warning(f"Snapshot maintenance marker not writable: {e}")
+            return
+    threading.Thread(target=_maintenance_worker, name='snapshot-maintenance', daemon=True).start()
+
+def param_history(symbol, param_code, days=730, per='day'):
+    """
+    Value/score history of one parameter, e.g. param_history('TCS', 'ROCE', days=730, per='quarter')
+    for "ROCE of TCS over 8 quarters". Uses the (stock_id, snapshot_date) index.
+    per='day' returns the last value of each day, per='quarter' the last value of each quarter.
+    """
+    model = _param_model(param_code)
+    since = date.today() - timedelta(days=days)
+    with session_scope() as session:
+        stock_id = session.execute(select(Stock.id).where(Stock.symbol == symbol.upper())).scalar_one_or_none()
+        if stock_id is None:
+            return []
+        last_of_day = _edge_ids(model, [model.snapshot_date], model.stock_id == stock_id,
+                                model.snapshot_date >= since, model.param_code == param_code)
+        rows = session.execute(
+            select(model.snapshot_date, model.value, model.score)
+            .where(model.id.in_(last_of_day))
+            .order_by(model.snapshot_date)).all()
+
+    history = [{'date': d, 'value': v, 'score': sc} for d, v, sc in rows]
+    if per == 'quarter':
+        by_quarter = {}
+        for item in history:
+            by_quarter[(item['date'].year, (item['date'].month - 1) // 3 + 1)] = item
+        history = [dict(item, quarter=f"{y}Q{q}") for (y, q), item in sorted(by_quarter.items())]
+    return history
+
+def score_movers(min_change=5, days=7, limit=50):
+    """
+    Stocks whose total score changed by at least min_change over the last `days` days,
+    comparing the first and last evaluation (by captured_at) in the window. Uses the snapshot_date index.
+    Negative min_change finds fallers.
+    """
+    since = date.today() - timedelta(days=days)
+    with session_scope() as session:
+        first_ids = _edge_ids(Score, [Score.stock_id], Score.snapshot_date >= since, first=True)
+        last_ids = _edge_ids(Score, [Score.stock_id], Score.snapshot_date >= since)
+        first = select(Score.stock_id, Score.total_score).where(Score.id.in_(first_ids)).subquery()
+        last = select(Score.stock_id, Score.total_score, Score.captured_at).where(Score.id.in_(last_ids)).subquery()
+
+        change = (last.c.total_score - first.c.total_score).label('change')
+        query = (select(Stock.symbol, first.c.total_score, last.c.total_score, change, last.c.captured_at)
+                 .join(first, first.c.stock_id == Stock.id)
+                 .join(last, last.c.stock_id == Stock.id))
+        if min_change >= 0:
+            query = query.where(change >= min_change).order_by(change.desc())
+        else:
+            query = query.where(change <= min_change).order_by(change)
+        rows = session.execute(query.limit(limit)).all()
+
+    return [{'symbol': sym, 'from_score': f, 'to_score': t, 'change': c, 'captured_at': at}
+            for sym, f, t, c, at in rows]
+
+def snapshot_version():
+    """Cheap change marker for caches built from stored snapshots (max Score id)."""
+    with session_scope() as session:
+        return session.execute(select(func.max(Score.id))).scalar() or 0
+
+def latest_snapshot_time(symbol):
+    """captured_at of a symbol's most recent snapshot (None if never stored), without loading it."""
+    try:
+        with session_scope() as session:
+            return session.execute(
+                select(func.max(Score.captured_at)).join(Stock, Score.stock_id == Stock.id)
+                .where(Stock.symbol == symbol.upper())).scalar()
+    except Exception as e:
+        logger.error(f"Error reading snapshot time for {symbol}: {e}")
+        return None
+
+def latest_snapshot_rows(since_id=None):
+    """
+    The latest evaluation (by captured_at) of every stock, as plain rows for columnar caches:
+    (score_rows, param_rows) where
+        score_rows = (stock_id, symbol, captured_at, total, fundamental, technical, news, cmp, health_label, score_id)
+        param_rows = (stock_id, param_code, value, score)
+    since_id limits the result to stocks evaluated after that Score id (incremental refresh).
+    """
+    scores = Score.__table__.c
+    with session_scope() as session:
+        conn = session.connection()
+        where = [scores.stock_id.in_(select(scores.stock_id).where(scores.id > since_id))] if since_id else []
+        latest_ids = _edge_ids(Score, [Score.stock_id], *where)
+        latest = (select(scores.stock_id, scores.captured_at, scores.snapshot_date)
+                  .where(scores.id.in_(latest_ids)).subquery())
+
+        score_rows = conn.execute(
+            select(scores.stock_id, Stock.__table__.c.symbol, scores.captured_at, scores.total_score,
+                   scores.fundamental_score, scores.technical_score, scores.news_score, scores.cmp,
+                   scores.health_label, scores.id)
+            .join(Stock.__table__, Stock.__table__.c.id == scores.stock_id)
+            .where(scores.id.in_(latest_ids))).all()
+
+        param_rows = []
+        for model, params in PARAM_MODELS:
+            table = model.__table__
+            # Probes ix_*_stock_date once per latest snapshot (see _analyze)
+            param_rows.extend(conn.execute(
+                select(table.c.stock_id, table.c.param_code, table.c.value, table.c.score)
+                .join(latest, (latest.c.stock_id == table.c.stock_id)
+                      & (latest.c.snapshot_date == table.c.snapshot_date)
+                      & (latest.c.captured_at == table.c.captured_at))
+                .where(table.c.param_code.in_(params))).all())
+    return score_rows, param_rows
+
+def iter_snapshot_chunks(latest_only=True, since=None, until=None, symbols=None, chunk_size=2000):
+    """
+    Stream stored evaluations in chunks of at most chunk_size snapshots, oldest first.
+    Each chunk is a list of (score_row, params) where score_row is
+        (score_id, symbol, captured_at, snapshot_date, cmp, fundamental, technical, news, total, health_label)
+    and params maps param_code -> (value, score).
+    Keyset pagination on Score.id keeps memory flat however many snapshots are stored.
+    latest_only ranks the Score table once up front (one id per stock is held) and pages through those ids.
+    """
+    scores = Score.__table__.c
+    stocks = Stock.__table__.c
+    latest_ids = None
+    if latest_only:
+        with session_scope() as session:
+            latest_ids = sorted(session.execute(_edge_ids(Score, [Score.stock_id])).scalars())
+    last_id = 0
+    pos = 0
+    while True:
+        if latest_ids is not None:
+            batch = latest_ids[pos:pos + chunk_size]
+            pos += chunk_size
+            if not batch:
+                return
+        with session_scope() as session:
+            conn = session.connection()
+            query = (select(scores.id, stocks.symbol, scores.captured_at, scores.snapshot_date, scores.cmp,
+                            scores.fundamental_score, scores.technical_score, scores.news_score,
+                            scores.total_score, scores.health_label, scores.stock_id)
+                     .join(Stock.__table__, stocks.id == scores.stock_id)
+                     .where(scores.id > last_id))
+            if latest_ids is not None:
+                query = query.where(scores.id.in_(batch))
+            if since:
+                query = query.where(scores.snapshot_date >= since)
+            if until:
+                query = query.where(scores.snapshot_date <= until)
+            if symbols:
+                query = query.where(stocks.symbol.in_([s.upper() for s in symbols]))
+            score_rows = conn.execute(query.order_by(scores.id).limit(chunk_size)).all()
+            if not score_rows:
+                # A batch of latest ids can be filtered out entirely (since / until / symbols)
+                if latest_ids is not None:
+                    continue
+                return
+
+            # Probes ix_*_stock_date once per snapshot in the chunk (see _analyze)
+            chunk = (select(scores.stock_id, scores.snapshot_date, scores.captured_at)
+                     .where(scores.id.in_([row.id for row in score_rows])).subquery())
+            params = {(row.stock_id, row.captured_at): {} for row in score_rows}
+            for model, codes in PARAM_MODELS:
+                table = model.__table__
+                rows = conn.execute(
+                    select(table.c.stock_id, table.c.captured_at, table.c.param_code, table.c.value, table.c.score)
+                        .join(chunk, (chunk.c.stock_id == table.c.stock_id)
+                          & (chunk.c.snapshot_date == table.c.snapshot_date)
+                          & (chunk.c.captured_at == table.c.captured_at))
+                    .where(table.c.param_code.in_(codes)))
+                for stock_id, captured_at, code, value, score in rows:
+                    bucket = params.get((stock_id, captured_at))
+                    if bucket is not None:
+                        bucket[code] = (value, score)
+
+        yield [(tuple(row[:10]), params[(row.stock_id, row.captured_at)]) for row in score_rows]
+        last_id = score_rows[-1].id
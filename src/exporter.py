@@ -0,0 +1,171 @@
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+import csv
+import io
+import json
+import logging
+import math
+import os
+from src.analysis.engine import ALL_PARAMS
+from src.database import iter_snapshot_chunks
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+BASE_COLUMNS = ['symbol', 'captured_at', 'snapshot_date', 'cmp', 'fundamental_score', 'technical_score',
+                'news_score', 'total_score', 'health_label']
+
+# One value column and one score column per engine parameter
+EXPORT_COLUMNS = BASE_COLUMNS + [c for p in ALL_PARAMS for c in (p, f"{p}_score")]
+
+class ExportError(ValueError):
+    """Unsupported export format or missing optional dependency."""
+
+def _chunk_columns(chunk):
+    """Turn one chunk of (score_row, params) into column lists keyed by EXPORT_COLUMNS."""
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    for score_row, params in chunk:
+        _, symbol, captured_at, snapshot_date, cmp, f_score, t_score, n_score, total, health = score_row
+        for name, value in zip(BASE_COLUMNS, (symbol, captured_at, snapshot_date, cmp, f_score, t_score,
+                                              n_score, total, health)):
+            columns[name].append(value)
+        for param in ALL_PARAMS:
+            value, score = params.get(param, (None, None))
+            columns[param].append(value)
+            columns[f"{param}_score"].append(score)
+    return columns
+
+def _arrow_schema():
+    fields = [
+        pa.field('symbol', pa.string()),
+        pa.field('captured_at', pa.timestamp('us')),
+        pa.field('snapshot_date', pa.date32()),
+    ]
+    for name in BASE_COLUMNS[3:]:
+        fields.append(pa.field(name, pa.string() if name == 'health_label' else pa.float64()))
+    for param in ALL_PARAMS:
+        fields.append(pa.field(param, pa.float64()))
+        fields.append(pa.field(f"{param}_score", pa.float64()))
+    return pa.schema(fields)
+
+class _ChunkSink:
+    """Write-only file object: pyarrow writes into it and the generator drains it after every row group."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+def _stream_arrow(chunks, fmt):
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    out = pa.PythonFile(sink, mode='w')
+    writer = pq.ParquetWriter(out, schema, compression='zstd') if fmt == 'parquet' else pa.ipc.new_stream(out, schema)
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pydict(_chunk_columns(chunk), schema=schema)
+            # One row group / record batch per chunk
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _stream_csv(chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        columns = _chunk_columns(chunk)
+        writer.writerows(zip(*(columns[name] for name in EXPORT_COLUMNS)))
+        yield buf.getvalue().encode('utf-8')
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+def _json_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def _stream_ndjson(chunks):
+    for chunk in chunks:
+        columns = _chunk_columns(chunk)
+        lines = []
+        for values in zip(*(columns[name] for name in EXPORT_COLUMNS)):
+            lines.append(json.dumps({name: _json_value(v) for name, v in zip(EXPORT_COLUMNS, values)}))
+        yield ("\n".join(lines) + "\n").encode('utf-8')
+
+def stream_export(fmt='csv', latest_only=True, since=None, until=None, symbols=None, chunk_size=2000):
+    """
+    Stream stored evaluations as bytes chunks in the given format (parquet, arrow, csv, ndjson).
+    Every chunk_size snapshots become one Parquet row group / Arrow record batch / CSV block,
+    so memory use does not grow with the number of snapshots exported.
+    """
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt in ('parquet', 'arrow') and pa is None:
+        raise ExportError(f"{fmt} export needs pyarrow (pip install pyarrow); csv and ndjson work without it")
+
+    chunks = iter_snapshot_chunks(latest_only=latest_only, since=since, until=until,
+                                  symbols=symbols, chunk_size=chunk_size)
+    if fmt in ('parquet', 'arrow'):
+        return _stream_arrow(chunks, fmt)
+    if fmt == 'csv':
+        return _stream_csv(chunks)
+    return _stream_ndjson(chunks)
+
+def export_to_file(path, fmt='csv', **kwargs):
+    """
+    Write an export to disk chunk by chunk. Returns the number of bytes written.
+    The format is checked before the file is created, and a failed export removes the partial file.
+    """
+    stream = stream_export(fmt, **kwargs)
+    written = 0
+    try:
+        with open(path, 'wb') as f:
+            for data in stream:
+                f.write(data)
+                written += len(data)
+    except BaseException:  # including Ctrl+C part way through a large export
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    logger.info(f"Exported {fmt} to {path} ({written} bytes)")
+    return written
@@ -0,0 +1,274 @@
+import bisect
+import csv
+import difflib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import requests
+from src.config import SYMBOL_MASTER_URL, SYMBOL_MASTER_BSE_URL, SYMBOL_MASTER_DIR, SYMBOL_MASTER_REFRESH_HOURS
+
+logger = logging.getLogger(__name__)
+
+NSE_FILE = 'EQUITY_L.csv'
+BSE_FILE = 'bse_scrips.json'
+# Optional extra aliases, one "alias,SYMBOL" per line
+ALIASES_FILE = 'aliases.csv'
+# How often lookups check whether the cached lists need (re)loading or refreshing
+CHECK_INTERVAL = 300
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Common names people type that are neither the ticker nor the listed company name
+ALIASES = {
+    'RIL': 'RELIANCE', 'SBI': 'SBIN', 'HUL': 'HINDUNILVR', 'L&T': 'LT', 'LNT': 'LT', 'AIRTEL': 'BHARTIARTL',
+    'INFOSYS': 'INFY', 'HDFC': 'HDFCBANK', 'KOTAK': 'KOTAKBANK', 'BAJAJ FINANCE': 'BAJFINANCE',
+    'ASIAN PAINTS': 'ASIANPAINT', 'SUN PHARMA': 'SUNPHARMA', 'DR REDDY': 'DRREDDY', 'ZOMATO': 'ETERNAL',
+    'MAHINDRA': 'M&M', 'ULTRATECH': 'ULTRACEMCO', 'NESTLE': 'NESTLEIND',
+}
+
+# Dropped from company names before indexing ("Larsen & Toubro Limited" -> "LARSEN AND TOUBRO")
+_NAME_NOISE = {'LIMITED', 'LTD', 'THE', 'CO', 'COMPANY', 'CORPORATION', 'CORP', 'INC'}
+
+def normalize(text):
+    """Upper case words without punctuation or company-form suffixes."""
+    text = str(text).upper().replace('&', ' AND ')
+    words = re.findall(r'[A-Z0-9]+', text)
+    return ' '.join(w for w in words if w not in _NAME_NOISE)
+
+class _Index:
+    """Immutable lookup tables; a refresh builds a new one and swaps it in."""
+
+    def __init__(self, companies, aliases):
+        # companies: {symbol: {'name', 'isin', 'bse_code', 'bse_id'}}
+        self.companies = companies
+        self.exact = {}
+        keys = []
+        for symbol, info in companies.items():
+            name = normalize(info['name'])
+            for key in (name, name.replace(' ', '')):
+                if key:
+                    self.exact.setdefault(key, symbol)
+            # Every word start of the name is searchable ("MOTORS" finds TATA MOTORS)
+            words = name.split()
+            for i in range(len(words)):
+                keys.append((' '.join(words[i:]), symbol))
+            keys.append((symbol, symbol))
+        for alias, symbol in aliases.items():
+            if symbol in companies:
+                self.exact[normalize(alias)] = symbol
+                self.exact[alias.upper()] = symbol
+        # Tickers and exchange codes win over names
+        for symbol, info in companies.items():
+            for code in (info.get('bse_code'), info.get('bse_id')):
+                if code:
+                    self.exact[str(code).upper()] = symbol
+            self.exact[symbol] = symbol
+
+        keys.sort()
+        self.prefix_keys = [k for k, _ in keys]
+        self.prefix_symbols = [s for _, s in keys]
+        # Fuzzy candidates bucketed by first character (typos rarely hit the first letter)
+        self.fuzzy = {}
+        for key in set(self.prefix_keys):
+            self.fuzzy.setdefault(key[0], []).append(key)
+        self.fuzzy_symbols = dict(zip(self.prefix_keys, self.prefix_symbols))
+
+class SymbolMaster:
+    """
+    Offline ticker resolution from the NSE equity list (EQUITY_L.csv) and the BSE scrip list:
+    exact lookups (ticker, BSE code, alias, company name), a sorted prefix index searched with
+    bisect and a difflib fuzzy fallback. The lists are cached in SYMBOL_MASTER_DIR and refreshed
+    in a background thread once they are older than SYMBOL_MASTER_REFRESH_HOURS; BSE-only
+    companies are not indexed (the fetchers work on NSE symbols).
+    """
+
+    def __init__(self, directory=SYMBOL_MASTER_DIR, refresh_hours=SYMBOL_MASTER_REFRESH_HOURS):
+        self.directory = directory
+        self.refresh_seconds = refresh_hours * 3600
+        self._index = _Index({}, {})
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._checked_at = 0.0
+        self.loaded_at = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __len__(self):
+        return len(self._index.companies)
+
+    def __contains__(self, symbol):
+        return symbol in self._index.companies
+
+    # ========== 1. LOADING ==========
+    def _read_nse(self, text):
+        companies = {}
+        reader = csv.DictReader(io.StringIO(text))
+        reader.fieldnames = [f.strip().upper() for f in reader.fieldnames or []]
+        for row in reader:
+            symbol = (row.get('SYMBOL') or '').strip().upper()
+            if symbol:
+                companies[symbol] = {'name': (row.get('NAME OF COMPANY') or symbol).strip(),
+                                     'isin': (row.get('ISIN NUMBER') or '').strip(), 'bse_code': None, 'bse_id': None}
+        return companies
+
+    def _add_bse(self, companies, scrips):
+        """Attach BSE scrip codes / ids to NSE companies with the same ISIN."""
+        by_isin = {info['isin']: info for info in companies.values() if info['isin']}
+        for scrip in scrips:
+            info = by_isin.get((scrip.get('ISIN_NUMBER') or '').strip())
+            if info:
+                info['bse_code'] = str(scrip.get('SCRIP_CD') or '').strip() or None
+                info['bse_id'] = (scrip.get('scrip_id') or '').strip().upper() or None
+
+    def _read_aliases(self):
+        aliases = dict(ALIASES)
+        path = self._path(ALIASES_FILE)
+        if os.path.exists(path):
+            with open(path, newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 2 and row[0].strip() and not row[0].startswith('#'):
+                        aliases[row[0].strip()] = row[1].strip().upper()
+        return aliases
+
+    def load(self):
+        """Build the index from the cached lists. Returns the number of companies indexed."""
+        path = self._path(NSE_FILE)
+        if not os.path.exists(path):
+            return 0
+        start = time.perf_counter()
+        with open(path, encoding='utf-8', errors='replace') as f:
+            companies = self._read_nse(f.read())
+        bse_path = self._path(BSE_FILE)
+        if os.path.exists(bse_path):
+            try:
+                with open(bse_path) as f:
+                    self._add_bse(companies, json.load(f))
+            except ValueError as e:
+                logger.warning(f"Ignoring unreadable BSE scrip list: {e}")
+        self._index = _Index(companies, self._read_aliases())
+        self.loaded_at = os.path.getmtime(path)
+        logger.info(f"Symbol master: {len(companies)} companies indexed in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return len(companies)
+
+    def _write(self, name, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)  # atomic: a concurrent load() never sees a partial file
+
+    def refresh(self):
+        """Download the lists (NSE required, BSE best effort) and rebuild the index. Returns True on success."""
+        try:
+            resp = requests.get(SYMBOL_MASTER_URL, headers=HEADERS, timeout=20)
+            resp.raise_for_status()
+            if not self._read_nse(resp.content.decode('utf-8', errors='replace')):
+                raise ValueError("NSE equity list is empty")
+            self._write(NSE_FILE, resp.content)
+        except Exception as e:
+            logger.error(f"Symbol master refresh failed: {e}")
+            return False
+        try:
+            resp = requests.get(SYMBOL_MASTER_BSE_URL, headers={**HEADERS, 'Referer': 'https://www.bseindia.com/'},
+                                timeout=20)
+            resp.raise_for_status()
+            resp.json()
+            self._write(BSE_FILE, resp.content)
+        except Exception as e:
+            logger.warning(f"BSE scrip list not refreshed: {e}")
+        self.load()
+        return True
+
+    def _refresh_worker(self):
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def ensure_fresh(self):
+        """Load the cached lists on first use; start a background refresh if they are missing or old."""
+        now = time.time()
+        if now - self._checked_at < CHECK_INTERVAL:
+            return
+        with self._lock:
+            if now - self._checked_at < CHECK_INTERVAL:
+                return
+            self._checked_at = now
+            if self.loaded_at is None:
+                self.load()
+            stale = self.loaded_at is None or now - self.loaded_at > self.refresh_seconds
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_worker, name='symbol-master-refresh', daemon=True).start()
+
+    # ========== 2. LOOKUPS ==========
+    def name(self, symbol):
+        info = self._index.companies.get(symbol)
+        return info['name'] if info else symbol
+
+    def resolve(self, text):
+        """The NSE symbol for an exact ticker, BSE code, alias or company name, else None."""
+        self.ensure_fresh()
+        index = self._index
+        text = text.strip()
+        return index.exact.get(text.upper()) or index.exact.get(normalize(text))
+
+    def search(self, text, limit=5):
+        """Best matches as [(company name, symbol)]: exact, then prefix, then fuzzy. Same shape as search_ticker()."""
+        self.ensure_fresh()
+        index = self._index
+        if not index.companies:
+            return []
+        symbols = []
+
+        def add(symbol):
+            if symbol not in symbols:
+                symbols.append(symbol)
+
+        exact = self.resolve(text)
+        if exact:
+            add(exact)
+
+        # Prefix matches on tickers and on every word start of company names
+        query = normalize(text)
+        if query:
+            i = bisect.bisect_left(index.prefix_keys, query)
+            matches = []
+            while i < len(index.prefix_keys) and index.prefix_keys[i].startswith(query) and len(matches) < 200:
+                matches.append((len(index.prefix_keys[i]), index.prefix_symbols[i]))
+                i += 1
+            for _, symbol in sorted(matches):
+                add(symbol)
+
+            # Fuzzy fallback for typos ("TATA MOTRS")
+            if len(symbols) < limit:
+                candidates = index.fuzzy.get(query[0], [])
+                for key in difflib.get_close_matches(query, candidates, n=limit, cutoff=0.75):
+                    add(index.fuzzy_symbols[key])
+
+        return [(self.name(symbol), symbol) for symbol in symbols[:limit]]
+
+    def stats(self):
+        return {'companies': len(self), 'keys': len(self._index.prefix_keys), 'aliases_and_names': len(self._index.exact),
+                'loaded_at': self.loaded_at, 'refreshing': self._refreshing}
+
+_master = None
+_master_lock = threading.Lock()
+
+def get_symbol_master():
+    global _master
+    if _master is None:
+        with _master_lock:
+            if _master is None:
+                _master = SymbolMaster()
+    return _master
@@ -1,60 +1,162 @@
 import argparse
 import logging
-from src.fetchers.fundamentals import FundamentalFetcher
-from src.fetchers.technicals import TechnicalFetcher
-from src.fetchers.news import NewsFetcher
-from src.analysis.engine import AnalysisEngine
+from datetime import date
+from src.pipeline import analyze_symbol, analyze_watchlist
+from src.analysis.screener import run_screen, ScreenError
+from src.exporter import export_to_file, ExportError, EXPORT_FORMATS
 from src.renderer.generator import InfographicGenerator
+from src.renderer.digest import DigestRenderer
+from src.renderer.pdf import export_watchlist_pdf_file
+from src.fetchers.symbols import SymbolMaster
+from src.database import run_maintenance
+from src.config import DIGEST_WATCHLIST, SNAPSHOT_MAX_AGE
 import os
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def main():
-    parser = argparse.ArgumentParser(description="Stock Infographic Generator")
-    parser.add_argument("--stock", type=str, required=True, help="Stock Symbol (e.g., RELIANCE)")
-    parser.add_argument("--output", type=str, default="output.png", help="Output image path")
-    args = parser.parse_args()
-    
+def analyze_command(args):
     symbol = args.stock.upper()
     logger.info(f"Starting analysis for {symbol}...")
     
-    # 1. Fetch Data
-    logger.info("Fetching Fundamentals...")
-    ff = FundamentalFetcher()
-    fund_data = ff.get_data(symbol)
+    # 1. Fetch, analyze and store the snapshot
+    analysis_result = analyze_symbol(symbol)
     
-    logger.info("Fetching Technicals...")
-    tf = TechnicalFetcher()
-    tech_data = tf.get_data(symbol)
-    
-    logger.info("Fetching News...")
-    nf = NewsFetcher()
-    news_data = nf.fetch_comprehensive_news(symbol)
-    logger.info(f"Fetched {len(news_data)} news items")
-    
-    if not fund_data and not tech_data:
+    if not analysis_result:
         logger.error("Failed to fetch sufficient data.")
         return
     
-    # 2. Analyze
-    logger.info("Running Analysis Engine...")
-    engine = AnalysisEngine()
-    analysis_result = engine.evaluate_stock(fund_data, tech_data, news_data)
-    
-    # Add CMP and news to result for display
-    analysis_result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-    analysis_result['news_items'] = news_data  # Pass news to infographic
-    
     logger.info(f"Score: {analysis_result['total_score']}/37 - Risk: {analysis_result.get('health_label', 'N/A')}")
     
-    # 3. Generate Image
+    # 2. Generate Image
     logger.info("Generating Infographic...")
     gen = InfographicGenerator()
-    gen.generate_report(symbol, analysis_result, args.output)
+    paths = gen.generate_report(symbol, analysis_result, args.output, sizes=args.sizes.split(','))
+    
+    for size, path in paths.items():
+        logger.info(f"Report ({size}) saved to {path}")
+
+def digest_command(args):
+    symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else DIGEST_WATCHLIST
+    results = analyze_watchlist(symbols, max_workers=args.workers, max_age=SNAPSHOT_MAX_AGE)
+    if not results:
+        logger.error("Could not fetch data for any stock in the watchlist.")
+        return
+    output = args.output or "digest.png"
+    DigestRenderer().render_image(results).save(output)
+    logger.info(f"Digest of {len(results)} stocks saved to {output}")
+
+def pdf_command(args):
+    symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else DIGEST_WATCHLIST
+    output = args.output or "watchlist.pdf"
+    export_watchlist_pdf_file(output, symbols, max_workers=args.workers)
+
+def screen_command(args):
+    try:
+        result = run_screen(args.expression, sort=args.sort, descending=not args.asc,
+                            page=args.page, per_page=args.per_page)
+    except ScreenError as e:
+        logger.error(f"Invalid screen: {e}")
+        return
+    
+    rows = result['results']
+    columns = [c for c in (rows[0].keys() if rows else []) if c not in ('symbol', 'health_label', 'captured_at')]
+    print(f"{result['total']} match(es) for: {result['expression']}  (page {result['page']}, sorted by {result['sort']})")
+    if rows:
+        print(f"{'Symbol':<14}" + "".join(f"{c[:16]:>18}" for c in columns))
+        for row in rows:
+            values = "".join(f"{row[c]:>18.2f}" if row[c] is not None else f"{'-':>18}" for c in columns)
+            print(f"{row['symbol']:<14}{values}")
+
+def export_command(args):
+    output = args.output or f"evaluations.{EXPORT_FORMATS[args.format][1]}"
+    symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else None
+    try:
+        written = export_to_file(output, args.format, latest_only=not args.history, since=args.since,
+                                 until=args.until, symbols=symbols, chunk_size=args.chunk_size)
+    except ExportError as e:
+        logger.error(f"Export failed: {e}")
+        return
+    logger.info(f"Wrote {written} bytes to {output}")
+
+def maintain_command(args):
+    compacted, expired = run_maintenance()
+    print(f"Compacted {compacted} rows, expired {expired} rows")
+
+def symbols_command(args):
+    master = SymbolMaster()
+    if args.refresh and not master.refresh():
+        logger.error("Symbol master refresh failed")
+        return
+    if not master.load():
+        logger.error("No symbol master downloaded yet, run: symbols --refresh")
+        return
+    if args.query:
+        for name, symbol in master.search(args.query, limit=args.limit):
+            print(f"{symbol:<14}{name}")
+    else:
+        print(master.stats())
+
+def main():
+    parser = argparse.ArgumentParser(description="Stock Infographic Generator")
+    parser.add_argument("--stock", type=str, help="Stock Symbol (e.g., RELIANCE)")
+    parser.add_argument("--output", type=str, default="output.png", help="Output image path")
+    parser.add_argument("--sizes", type=str, default="full",
+                        help="Comma separated sizes from one render: full,medium,thumb (extra sizes saved as <output>_<size>.png)")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    screen = subparsers.add_parser("screen", help="Screen stored snapshots, e.g. \"ROCE > 20 and Stock P/E < 15\"")
+    screen.add_argument("expression", type=str, help="Filter expression")
+    screen.add_argument("--sort", type=str, default="total_score", help="Column to sort by")
+    screen.add_argument("--asc", action="store_true", help="Sort ascending (default descending)")
+    screen.add_argument("--page", type=int, default=1)
+    screen.add_argument("--per-page", type=int, default=25)
+    
+    export = subparsers.add_parser("export", help="Export stored evaluations (one column per parameter value + score)")
+    export.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    export.add_argument("--history", action="store_true", help="All stored snapshots instead of the latest per stock")
+    export.add_argument("--since", type=date.fromisoformat, help="First snapshot date (YYYY-MM-DD)")
+    export.add_argument("--until", type=date.fromisoformat, help="Last snapshot date (YYYY-MM-DD)")
+    export.add_argument("--symbols", type=str, help="Comma separated symbols (default: all)")
+    export.add_argument("--chunk-size", type=int, default=2000, help="Snapshots per row group / chunk")
+    export.add_argument("--output", type=str, help="Output file (default evaluations.<ext>)")
+    
+    digest = subparsers.add_parser("digest", help="Analyze a watchlist in parallel and render one contact sheet")
+    digest.add_argument("--symbols", type=str, help="Comma separated symbols (default: DIGEST_WATCHLIST)")
+    digest.add_argument("--workers", type=int, default=4, help="Parallel fetch threads")
+    digest.add_argument("--output", type=str, help="Output image (default digest.png)")
+    
+    pdf = subparsers.add_parser("pdf", help="Watchlist PDF: a report page per stock plus a score index")
+    pdf.add_argument("--symbols", type=str, help="Comma separated symbols (default: DIGEST_WATCHLIST)")
+    pdf.add_argument("--workers", type=int, default=4, help="Parallel fetch threads")
+    pdf.add_argument("--output", type=str, help="Output file (default watchlist.pdf)")
+    
+    subparsers.add_parser("maintain", help="Compact and expire old snapshots now (for cron, see SNAPSHOT_MAINTENANCE)")
+    
+    symbols = subparsers.add_parser("symbols", help="Look up tickers in the local symbol master (NSE / BSE list)")
+    symbols.add_argument("query", type=str, nargs="?", help="Ticker, BSE code or company name (omit for index stats)")
+    symbols.add_argument("--refresh", action="store_true", help="Download the latest lists first")
+    symbols.add_argument("--limit", type=int, default=5)
+    
+    args = parser.parse_args()
     
-    logger.info(f"Report saved to {args.output}")
+    if args.command == "screen":
+        screen_command(args)
+    elif args.command == "export":
+        export_command(args)
+    elif args.command == "digest":
+        digest_command(args)
+    elif args.command == "pdf":
+        pdf_command(args)
+    elif args.command == "maintain":
+        maintain_command(args)
+    elif args.command == "symbols":
+        symbols_command(args)
+    elif args.stock:
+        analyze_command(args)
+    else:
+        parser.error("--stock is required (or use a subcommand such as 'screen')")
 
 if __name__ == "__main__":
     main()
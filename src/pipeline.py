@@ -0,0 +1,130 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.config import DIGEST_WORKERS
+from src.fetchers.fundamentals import FundamentalFetcher
+from src.fetchers.technicals import TechnicalFetcher
+from src.fetchers.news import NewsFetcher
+from src.analysis.engine import AnalysisEngine
+from src.database import save_evaluations, load_latest_evaluation
+
+logger = logging.getLogger(__name__)
+
+def _notify(on_stage, symbol, stage, info):
+    if on_stage is None:
+        return
+    try:
+        on_stage(stage, info)
+    except Exception as e:
+        # Progress reporting must never break the analysis itself
+        logger.warning(f"[{symbol}] Stage callback failed for '{stage}': {e}")
+
+def analyze_symbol(symbol, comprehensive_news=True, max_age=None, persist=True, on_stage=None):
+    """
+    Fetch -> evaluate -> persist for one symbol, shared by the CLI, bot and web app.
+
+    max_age: reuse a stored snapshot younger than this many seconds (warm start).
+    If live fetching fails the latest stored snapshot is returned with result['stale'] = True.
+    on_stage: optional callback on_stage(stage, info), called from this thread as each fetch finishes:
+        'fundamentals' {'available', 'score', 'cmp'}, 'technicals' {'available', 'score'}, 'news' {'count'}.
+        Scores there are preliminary (before the live price is applied); the returned result is final.
+    Returns the evaluate_stock() result (plus 'cmp', 'symbol', 'news_items') or None.
+    """
+    symbol = symbol.upper()
+
+    if max_age:
+        cached = load_latest_evaluation(symbol, max_age=max_age)
+        if cached:
+            logger.info(f"[{symbol}] Using stored snapshot from {cached['captured_at']}")
+            return cached
+
+    engine = AnalysisEngine()
+
+    # 1. Fetch
+    logger.info(f"[{symbol}] Fetching fundamentals...")
+    fund_data = FundamentalFetcher().get_data(symbol)
+    if on_stage:
+        score = engine.fundamental_score(fund_data) if fund_data else None
+        _notify(on_stage, symbol, 'fundamentals', {'available': bool(fund_data), 'score': score,
+                                                   'cmp': fund_data.get('Current Price') if fund_data else None})
+
+    logger.info(f"[{symbol}] Fetching technicals...")
+    tech_data = TechnicalFetcher().get_data(symbol)
+    if on_stage:
+        available = bool(tech_data) and tech_data.get('indicators_available', True)
+        score = engine.technical_score(tech_data) if tech_data else None
+        _notify(on_stage, symbol, 'technicals', {'available': available, 'score': score})
+
+    nf = NewsFetcher()
+    if comprehensive_news:
+        logger.info(f"[{symbol}] Fetching comprehensive news...")
+        news_data = nf.fetch_comprehensive_news(symbol)
+    else:
+        news_data = nf.fetch_latest_news(symbol)
+    logger.info(f"[{symbol}] Fetched {len(news_data)} news items")
+    _notify(on_stage, symbol, 'news', {'count': len(news_data)})
+
+    if not fund_data and not tech_data:
+        stale = load_latest_evaluation(symbol)
+        if stale:
+            logger.warning(f"[{symbol}] Live fetch failed, falling back to snapshot from {stale['captured_at']}")
+            stale['stale'] = True
+            return stale
+        return None
+
+    # 2. Analyze
+    logger.info(f"[{symbol}] Evaluating stock...")
+    result = engine.evaluate_stock(fund_data, tech_data, news_data)
+    result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
+    result['symbol'] = symbol
+    result['news_items'] = news_data  # Pass news to infographic
+
+    # 3. Persist
+    if persist:
+        save_evaluations([(symbol, result)])
+
+    return result
+
+def iter_watchlist(symbols, max_workers=DIGEST_WORKERS, max_age=None, comprehensive_news=False):
+    """
+    Analyze many symbols concurrently (fetching is I/O bound, so threads) and yield
+    (symbol, result) as each one completes; failed symbols are skipped. Fresh results are
+    persisted in one batch once the iteration finishes (or is closed early).
+    """
+    symbols = list(dict.fromkeys(s.upper().strip() for s in symbols if s.strip()))
+    if not symbols:
+        return
+
+    def run(symbol):
+        try:
+            return analyze_symbol(symbol, comprehensive_news=comprehensive_news, max_age=max_age, persist=False)
+        except Exception as e:
+            logger.error(f"[{symbol}] Analysis failed: {e}")
+            return None
+
+    fresh = []
+    analyzed = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols))))
+    try:
+        futures = {pool.submit(run, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            result = future.result()
+            if not result:
+                continue
+            # Stored snapshots (warm start / stale fallback) carry captured_at and are already in the database
+            if 'captured_at' not in result:
+                fresh.append((futures[future], result))
+            analyzed += 1
+            yield futures[future], result
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if fresh:
+            save_evaluations(fresh)
+        logger.info(f"Watchlist: {analyzed}/{len(symbols)} analyzed ({len(fresh)} fresh)")
+
+def analyze_watchlist(symbols, max_workers=DIGEST_WORKERS, max_age=None, comprehensive_news=False):
+    """Like iter_watchlist(), but returns [(symbol, result)] in input order."""
+    order = {}
+    for i, symbol in enumerate(symbols):
+        order.setdefault(symbol.upper().strip(), i)
+    results = iter_watchlist(symbols, max_workers=max_workers, max_age=max_age, comprehensive_news=comprehensive_news)
+    return sorted(results, key=lambda item: order[item[0]])
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import numbers
+import os
+import threading
+from collections import OrderedDict
+from src.config import RENDER_CACHE_DIR, RENDER_CACHE_MEMORY_MB, RENDER_CACHE_DISK_MB
+from src.renderer.encoders import ENCODINGS, EncodedImage
+
+logger = logging.getLogger(__name__)
+
+# Bump when the drawing code changes so previously cached images are not served
+RENDER_VERSION = 2
+
+# Result fields drawn on the infographic (anything else, e.g. captured_at or stale, does not change pixels)
+RENDER_FIELDS = [
+    'total_score', 'fundamental_score', 'technical_score', 'news_score', 'health_label',
+    'fundamental_summary', 'technical_summary', 'news_summary',
+    'swing_verdict', 'swing_action', 'swing_reason', 'long_term_verdict', 'long_term_reason',
+    'final_action', 'retail_conclusion',
+]
+NEWS_FIELDS = ['title', 'source', 'category', 'sentiment']
+
+def _rounded(value):
+    # ints and floats (and numpy scalars) hash alike: scores come back from the database as floats
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return round(float(value), 2)
+    return value
+
+def content_hash(stock_name, data, fmt, width):
+    """sha256 over everything the renderer draws, at display precision."""
+    cmp = data.get('cmp', 0)
+    payload = {
+        'v': RENDER_VERSION,
+        'fmt': fmt,
+        'width': width,
+        'name': stock_name,
+        'cmp': f"{cmp:.2f}" if isinstance(cmp, (int, float)) else str(cmp),
+        'fields': {f: _rounded(data.get(f)) for f in RENDER_FIELDS},
+        'details': {k: [str(v.get('value')), _rounded(v.get('score')), v.get('status', '')]
+                    for k, v in (data.get('details') or {}).items()},
+        'news': [[n.get(f) for f in NEWS_FIELDS] for n in (data.get('news_items') or [])[:12]],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def rendition_key(key, size):
+    """Cache key of a derived size: the full-size report keeps the plain content hash."""
+    return key if size == 'full' else f"{key}-{size}"
+
+class RenderCache:
+    """
+    Encoded report images by content hash: an in-memory LRU bounded by bytes, backed by files
+    <hash>.<encoding> in RENDER_CACHE_DIR so restarts and other workers can reuse them.
+    """
+
+    def __init__(self, directory=RENDER_CACHE_DIR, memory_mb=RENDER_CACHE_MEMORY_MB, disk_mb=RENDER_CACHE_DISK_MB):
+        self.directory = directory
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.disk_bytes = disk_mb * 1024 * 1024
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = self.disk_hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+
+        encoded = self._read(key) if self.directory else None
+        with self._lock:
+            if encoded is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, encoded)
+        return encoded
+
+    def put(self, key, encoded):
+        with self._lock:
+            self._remember(key, encoded)
+            self._writes += 1
+            prune = self._writes % 50 == 0
+        if self.directory:
+            self._write(key, encoded)
+            if prune:
+                self._prune_disk()
+
+    def _remember(self, key, encoded):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key).data)
+        self._entries[key] = encoded
+        self._size += len(encoded.data)
+        while self._size > self.memory_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            self._size -= len(old.data)
+
+    def _read(self, key):
+        for fmt, (_, _, mimetype, ext) in ENCODINGS.items():
+            path = os.path.join(self.directory, f"{key}.{fmt}")
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Render cache read failed for {path}: {e}")
+                return None
+            return EncodedImage(data, fmt, mimetype, ext)
+        return None
+
+    def _write(self, key, encoded):
+        path = os.path.join(self.directory, f"{key}.{encoded.format}")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(encoded.data)
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+        except OSError as e:
+            logger.warning(f"Render cache write failed for {path}: {e}")
+
+    def _prune_disk(self):
+        """Delete the least recently written files once the directory exceeds its byte budget."""
+        try:
+            files = [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith('.tmp')]
+        except OSError:
+            return
+        stats = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in files))
+        total = sum(size for _, size, _ in stats)
+        removed = 0
+        for _, size, path in stats:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"Render cache pruned {removed} file(s)")
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits,
+                    'disk_hits': self.disk_hits, 'misses': self.misses}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_render_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache()
+    return _cache
@@ -0,0 +1,144 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from PIL import Image, ImageDraw
+from src.config import REPORT_IMAGE_FORMAT
+from src.renderer.encoders import encode_image
+from src.renderer.generator import InfographicGenerator, REPORT_WIDTH
+
+logger = logging.getLogger(__name__)
+
+# Contact sheet grid: 3 columns of mini score cards
+COLUMNS = 3
+CARD_W, CARD_H = 420, 180
+GAP = 30
+MARGIN_X = (REPORT_WIDTH - COLUMNS * CARD_W - (COLUMNS - 1) * GAP) // 2
+HEADER_H = 150
+
+# Static layers per card count (header band, card frames, ring / bar tracks)
+TEMPLATE_CACHE_SIZE = 4
+_template_cache = OrderedDict()
+_template_lock = threading.Lock()
+
+def _verdict_color(gen, verdict):
+    return gen.green if "BUY" in verdict else (gen.red if "AVOID" in verdict else gen.yellow)
+
+def rank_results(results):
+    """[(symbol, result)] best total score first: the order of cards and of their #rank."""
+    return sorted(results, key=lambda item: item[1].get('total_score', 0), reverse=True)
+
+class DigestRenderer:
+    """One compact image for a whole watchlist: a mini score card per stock, best score first."""
+
+    def __init__(self, generator=None):
+        # Colours, fonts and ring / bar helpers are shared with the full report
+        self.gen = generator or InfographicGenerator()
+
+    def card_positions(self, count):
+        return [(MARGIN_X + (i % COLUMNS) * (CARD_W + GAP), HEADER_H + (i // COLUMNS) * (CARD_H + 25))
+                for i in range(count)]
+
+    def sheet_height(self, count):
+        rows = max(1, -(-count // COLUMNS))
+        return HEADER_H + rows * (CARD_H + 25) + 60
+
+    def get_template(self, count):
+        with _template_lock:
+            template = _template_cache.get(count)
+            if template is not None:
+                _template_cache.move_to_end(count)
+                return template
+        template = self.render_template(count)
+        with _template_lock:
+            _template_cache[count] = template
+            while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+                _template_cache.popitem(last=False)
+        return template
+
+    def render_template(self, count):
+        gen = self.gen
+        img = Image.new('RGB', (REPORT_WIDTH, self.sheet_height(count)), color=gen.bg_color)
+        draw = ImageDraw.Draw(img)
+
+        # ========== 1. HEADER ==========
+        draw.rectangle([0, 0, REPORT_WIDTH, HEADER_H - 30], fill="#1A2332")
+        gen.text(draw, (MARGIN_X, 25), "📊 DAILY DIGEST", font=gen.header_font, fill=gen.yellow)
+
+        # ========== 2. CARD FRAMES ==========
+        for x, y in self.card_positions(count):
+            draw.rounded_rectangle([x, y, x + CARD_W, y + CARD_H], radius=14, fill=gen.card_bg,
+                                   outline=gen.card_border, width=1)
+            cx, cy = x + CARD_W - 75, y + 70
+            draw.ellipse([cx - 48, cy - 48, cx + 48, cy + 48], fill=gen.bg_color, outline=gen.card_border, width=2)
+            for i, label in enumerate(("F", "T", "N")):
+                bx = x + 20 + i * 130
+                gen.text(draw, (bx, y + CARD_H - 32), label, font=gen.tiny_font, fill="#94A3B8")
+                draw.rounded_rectangle([bx + 18, y + CARD_H - 26, bx + 110, y + CARD_H - 20], radius=3, fill="#334155")
+
+        gen.text(draw, (MARGIN_X, img.height - 40), "Generated by Samvruddhi Stock Analyzer | Educational Purpose Only",
+                 font=gen.tiny_font, fill="#64748B")
+        return img
+
+    def render_image(self, results, title=None, rank_offset=0):
+        """
+        results: [(symbol, result)]. Returns the contact sheet as a PIL image.
+        rank_offset: cards already shown on earlier sheets of a split digest (pass rank_results()
+        slices, so the first card of the second 60-card sheet is #61).
+        """
+        gen = self.gen
+        ranked = rank_results(results)
+        img = self.get_template(len(ranked)).copy()
+        draw = ImageDraw.Draw(img)
+
+        if rank_offset:
+            default = f"{datetime.now():%d %b %Y} · ranks #{rank_offset + 1}–#{rank_offset + len(ranked)} by score"
+        else:
+            default = f"{datetime.now():%d %b %Y} · {len(ranked)} stocks ranked by score"
+        gen.text(draw, (MARGIN_X, 85), title or default, font=gen.small_font, fill="#94A3B8")
+
+        for rank, ((symbol, result), (x, y)) in enumerate(zip(ranked, self.card_positions(len(ranked))),
+                                                         rank_offset + 1):
+            score = result.get('total_score', 0)
+            score_color = gen.green if score > 25 else (gen.yellow if score > 15 else gen.red)
+
+            # Name, price and verdicts
+            gen.text(draw, (x + 20, y + 14), f"#{rank}", font=gen.tiny_font, fill="#64748B")
+            gen.text(draw, (x + 60, y + 8), symbol, font=gen.body_font, fill=gen.text_color)
+            cmp = result.get('cmp') or 0
+            stale = " (snapshot)" if result.get('stale') else ""
+            gen.text(draw, (x + 20, y + 45), f"₹{cmp:.2f}{stale}", font=gen.small_font, fill=gen.accent_blue)
+            swing = result.get('swing_verdict', 'N/A')
+            long_term = result.get('long_term_verdict', 'N/A')
+            gen.text(draw, (x + 20, y + 78), f"Swing: {swing}", font=gen.small_font, fill=_verdict_color(gen, swing))
+            gen.text(draw, (x + 20, y + 104), f"Long: {long_term}", font=gen.small_font,
+                     fill=_verdict_color(gen, long_term))
+
+            # Score ring
+            cx, cy = x + CARD_W - 75, y + 70
+            gen.draw_ring(draw, cx, cy, 48, 6, score / 37 * 100, score_color)
+            score_text = f"{score:.1f}"
+            gen.text(draw, (cx - draw.textlength(score_text, font=gen.body_font) // 2, cy - 16), score_text,
+                     font=gen.body_font, fill=score_color)
+            health = result.get('health_label', '')[:18]
+            gen.text(draw, (cx - draw.textlength(health, font=gen.tiny_font) // 2, cy + 55), health,
+                     font=gen.tiny_font, fill=score_color)
+
+            # Fundamental / technical / news bars (fill only, tracks are in the template)
+            for i, (val, max_val, color) in enumerate([(result.get('fundamental_score', 0), 24, gen.blue),
+                                                       (result.get('technical_score', 0), 5, gen.yellow),
+                                                       (result.get('news_score', 0), 8, gen.green)]):
+                bx = x + 20 + i * 130
+                gen.draw_progress_bar(draw, bx + 18, y + CARD_H - 26, 92, 6, val / max_val * 100, color, bg_color=None)
+        return img
+
+    def render_encoded(self, results, fmt=None, title=None, rank_offset=0):
+        return encode_image(self.render_image(results, title, rank_offset), fmt or REPORT_IMAGE_FORMAT)
+
+def digest_caption(results, top=3):
+    """Short Markdown caption: best scores and verdicts, for posting with the sheet."""
+    ranked = rank_results(results)
+    lines = [f"📊 *Daily Digest* — {len(ranked)} stocks"]
+    for symbol, result in ranked[:top]:
+        lines.append(f"• {symbol}: {result.get('total_score', 0):.1f}/37, Long Term {result.get('long_term_verdict', 'N/A')}")
+    return "\n".join(lines)
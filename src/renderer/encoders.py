@@ -0,0 +1,86 @@
+import io
+import logging
+import time
+from collections import namedtuple
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+EncodedImage = namedtuple('EncodedImage', 'data format mimetype ext')
+
+# name -> (PIL format, save options, mimetype, extension)
+# The reports are a few flat colours plus antialiased text, so a 256 colour palette is close to
+# lossless and less than half the size of truecolour PNG. JPEG keeps full chroma (subsampling=0)
+# for sharp coloured text; lossy WebP always subsamples chroma and scores lowest on these images.
+ENCODINGS = {
+    'png': ('PNG', {'compress_level': 6}, 'image/png', 'png'),
+    'png-optimized': ('PNG', {'optimize': True}, 'image/png', 'png'),
+    'png-palette': ('PNG', {'compress_level': 6}, 'image/png', 'png'),
+    'webp-lossless': ('WEBP', {'lossless': True, 'quality': 0, 'method': 4}, 'image/webp', 'webp'),
+    'webp': ('WEBP', {'quality': 90, 'method': 4}, 'image/webp', 'webp'),
+    'jpeg': ('JPEG', {'quality': 88, 'optimize': True, 'progressive': True, 'subsampling': 0}, 'image/jpeg', 'jpg'),
+}
+
+LOSSLESS = {'png', 'png-optimized', 'webp-lossless'}
+
+# Candidates tried by 'auto', cheapest to encode first
+AUTO_CANDIDATES = ['jpeg', 'png-palette', 'webp-lossless']
+AUTO_MIN_PSNR = 38.0     # dB against the truecolour render; below this text edges start to smear
+AUTO_MAX_ENCODE_MS = 1500  # stop trying further candidates once this much time has been spent
+
+class EncodingError(ValueError):
+    """Unknown output encoding."""
+
+def _to_palette(img):
+    return img.quantize(colors=256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+def psnr(original, encoded_bytes):
+    """Peak signal-to-noise ratio (dB) of an encoded image against the original RGB render."""
+    decoded = np.asarray(Image.open(io.BytesIO(encoded_bytes)).convert('RGB'), dtype=np.float32)
+    mse = np.mean((np.asarray(original, dtype=np.float32) - decoded) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+def encode_image(img, fmt='png'):
+    """Encode a PIL image with one of ENCODINGS (or 'auto'). Returns an EncodedImage."""
+    if fmt == 'auto':
+        return encode_auto(img)
+    if fmt not in ENCODINGS:
+        raise EncodingError(f"Unknown image format '{fmt}'. Use one of: auto, {', '.join(ENCODINGS)}")
+
+    pil_format, options, mimetype, ext = ENCODINGS[fmt]
+    if fmt == 'png-palette':
+        img = _to_palette(img)
+    buf = io.BytesIO()
+    img.save(buf, format=pil_format, **options)
+    return EncodedImage(buf.getvalue(), fmt, mimetype, ext)
+
+def encode_auto(img, candidates=None, min_psnr=AUTO_MIN_PSNR, max_encode_ms=AUTO_MAX_ENCODE_MS):
+    """
+    Smallest candidate encoding whose PSNR is at least min_psnr.
+    Falls back to the best-quality candidate tried if none meets the threshold.
+    """
+    start = time.perf_counter()
+    best = fallback = None
+    fallback_psnr = -1
+    for fmt in candidates or AUTO_CANDIDATES:
+        encoded = encode_image(img, fmt)
+        quality = float('inf') if fmt in LOSSLESS else psnr(img, encoded.data)
+        if quality >= min_psnr:
+            if best is None or len(encoded.data) < len(best.data):
+                best = encoded
+        elif quality > fallback_psnr:
+            fallback, fallback_psnr = encoded, quality
+        if (time.perf_counter() - start) * 1000 > max_encode_ms:
+            logger.info(f"Auto encoding stopped after {fmt}: {max_encode_ms} ms budget spent")
+            break
+    return best or fallback
+
+def encoding_for_extension(ext, preferred):
+    """The configured encoding if it produces this extension, otherwise the first one that does."""
+    if ENCODINGS.get(preferred, (None, None, None, None))[3] == ext:
+        return preferred
+    for name, (_, _, _, name_ext) in ENCODINGS.items():
+        if name_ext == ext:
+            return name
+    return None
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from PIL import ImageFont
+from src.config import RENDER_FONT, RENDER_FALLBACK_FONTS
+
+logger = logging.getLogger(__name__)
+
+# Primary face, first one found wins (bare names are looked up by FreeType / Pillow in the usual font dirs)
+FONT_CANDIDATES = [
+    'arial.ttf',
+    'DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'LiberationSans-Regular.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+]
+
+# Faces tried, in order, for characters the primary face has no glyph for (emoji, ₹, arrows, ...)
+FALLBACK_CANDIDATES = [
+    'seguisym.ttf',
+    'DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'Symbola.ttf',
+    '/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf',
+    '/usr/share/fonts/truetype/noto/NotoSansSymbols2-Regular.ttf',
+]
+
+# Drawn instead of a character no face covers (anything else missing is left out rather than drawn as a box)
+SUBSTITUTES = {'₹': 'Rs.'}
+
+def _face_key(font):
+    return font.getname() if hasattr(font, 'getname') else None
+
+class FontRegistry:
+    """
+    Resolves font files once per process and hands out shared FreeTypeFont objects per size.
+    Text the primary face cannot draw is split into runs drawn with fallback faces; glyph
+    coverage is cached per face and character, so the check is only paid once.
+    """
+
+    def __init__(self, candidates=None, fallback_candidates=None):
+        self.candidates = candidates or ([RENDER_FONT] if RENDER_FONT else []) + FONT_CANDIDATES
+        self.fallback_candidates = fallback_candidates or RENDER_FALLBACK_FONTS + FALLBACK_CANDIDATES
+        self.primary = None
+        self.fallbacks = []
+        self._resolved = False
+        self._fonts = {}
+        self._glyphs = {}
+        self._notdef = {}
+        self._lock = threading.Lock()
+        self.startup_ms = 0.0
+        self.loads = self.hits = 0
+        self.load_ms = 0.0
+        self.missing = set()
+
+    def _face(self, path):
+        """(family, style) of a font file, or None if it cannot be loaded."""
+        try:
+            return ImageFont.truetype(path, 12).getname()
+        except OSError:
+            return None
+
+    def _resolve(self):
+        with self._lock:
+            if self._resolved:
+                return
+            start = time.perf_counter()
+            self.primary = next((p for p in self.candidates if self._face(p)), None)
+            faces = {self._face(self.primary)} if self.primary else set()
+            for path in self.fallback_candidates:
+                face = self._face(path)
+                if face and face not in faces:
+                    faces.add(face)
+                    self.fallbacks.append(path)
+            self.startup_ms = (time.perf_counter() - start) * 1000
+            self._resolved = True
+        if self.primary is None:
+            logger.warning("No TrueType font found, using Pillow's built-in font (set RENDER_FONT to a .ttf path)")
+        logger.info(f"Fonts resolved in {self.startup_ms:.1f} ms: primary={self.primary or 'built-in'}, "
+                    f"fallbacks={self.fallbacks or 'none'}")
+
+    def _load(self, path, size):
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+        start = time.perf_counter()
+        if path is None:
+            font = ImageFont.load_default(size=size)
+        else:
+            font = ImageFont.truetype(path, size)
+        self.load_ms += (time.perf_counter() - start) * 1000
+        self.loads += 1
+        self._fonts[key] = font
+        return font
+
+    def get(self, size):
+        """The primary face at this pixel size (loaded once per process)."""
+        if not self._resolved:
+            self._resolve()
+        return self._load(self.primary, size)
+
+    def has_glyph(self, font, char):
+        face = _face_key(font)
+        key = (face, char)
+        found = self._glyphs.get(key)
+        if found is None:
+            if char.isspace():
+                found = True
+            else:
+                # FreeType draws glyph 0 (.notdef) for missing characters; compare against it at the same size
+                notdef_key = (face, font.size)
+                if notdef_key not in self._notdef:
+                    self._notdef[notdef_key] = self._mask(font, '\U0010FFFF')
+                found = self._mask(font, char) != self._notdef[notdef_key]
+            self._glyphs[key] = found
+        return found
+
+    def _mask(self, font, char):
+        mask = font.getmask(char)
+        return mask.size, bytes(mask)
+
+    def covers(self, font, text):
+        return all(self.has_glyph(font, ch) for ch in text)
+
+    def runs(self, text, font):
+        """Split one line into [(text, font)] runs, switching to a fallback face where needed."""
+        runs = []
+        for ch in text:
+            use = font
+            if not self.has_glyph(font, ch):
+                use = None
+                for path in self.fallbacks:
+                    candidate = self._load(path, font.size)
+                    if self.has_glyph(candidate, ch):
+                        use = candidate
+                        break
+                if use is None:
+                    if ch not in self.missing:
+                        self.missing.add(ch)
+                        logger.info(f"No font has a glyph for {ch!r} (U+{ord(ch):04X}), leaving it out")
+                    ch, use = SUBSTITUTES.get(ch, ''), font
+                    if not ch:
+                        continue
+            if runs and runs[-1][1] is use:
+                runs[-1][0] += ch
+            else:
+                runs.append([ch, use])
+        return runs
+
+    def draw_text(self, draw, xy, text, font, fill, spacing=4):
+        """draw.text() with glyph fallback; same positioning and line spacing for multi-line text."""
+        if getattr(draw, 'native_glyph_fallback', False) or not hasattr(font, 'getname') or self.covers(font, text):
+            draw.text(xy, text, font=font, fill=fill, spacing=spacing)
+            return
+        x, y = xy
+        line_h = font.getbbox("A")[3] + spacing
+        for line in text.split("\n"):
+            cx = x
+            for run, run_font in self.runs(line, font):
+                draw.text((cx, y), run, font=run_font, fill=fill)
+                cx += run_font.getlength(run)
+            y += line_h
+
+    def stats(self):
+        return {'primary': self.primary, 'fallbacks': list(self.fallbacks), 'startup_ms': round(self.startup_ms, 2),
+                'loads': self.loads, 'load_ms': round(self.load_ms, 2), 'hits': self.hits,
+                'glyphs_checked': len(self._glyphs), 'missing': sorted(self.missing)}
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_font_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = FontRegistry()
+    return _registry
@@ -1,15 +1,41 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
-import math
+from src.analysis.engine import ALL_PARAMS
+from src.config import REPORT_IMAGE_FORMAT
+from src.renderer.encoders import encode_image
+from src.renderer.cache import content_hash, get_render_cache, rendition_key
+from src.renderer.fonts import get_font_registry
+from src.renderer.svg import SvgDraw
 
 logger = logging.getLogger(__name__)
 
+# Pre-rendered static layers (header band and the data grid's card frames), keyed by the set of
+# parameters shown. They stop above the first text-sized section, so reports of any length share one.
+TEMPLATE_CACHE_SIZE = 6
+
+# Canvas width in pixels (height is computed per report, see compute_layout)
+REPORT_WIDTH = 1400
+
+# Sizes derived from one render: name -> reduction factor of the full canvas (1400, 700, 350 px wide)
+RENDITIONS = {'full': 1, 'medium': 2, 'thumb': 4}
+_template_cache = OrderedDict()
+_template_lock = threading.Lock()
+
+def clear_template_cache():
+    with _template_lock:
+        _template_cache.clear()
+
+def report_key(stock_name, data, fmt=None, size='full'):
+    """Render cache key of a report image, computed without rendering (also keys Telegram file_ids)."""
+    return rendition_key(content_hash(stock_name, data, fmt or REPORT_IMAGE_FORMAT, REPORT_WIDTH), size)
+
 class InfographicGenerator:
     def __init__(self):
-        self.width = 1400  # Wider for better layout
-        self.height = 3800  # Increased height for more news
+        self.width = REPORT_WIDTH
         self.bg_color = "#0F172A"
         self.text_color = "#FFFFFF"
         self.green = "#22C55E"
@@ -20,83 +46,398 @@ class InfographicGenerator:
         self.card_border = "#334155"
         self.accent_blue = "#60A5FA"
         
-        # Load Fonts
-        try:
-            self.title_font = ImageFont.truetype("arial.ttf", 72)
-            self.header_font = ImageFont.truetype("arial.ttf", 48)
-            self.subheader_font = ImageFont.truetype("arial.ttf", 32)
-            self.body_font = ImageFont.truetype("arial.ttf", 24)
-            self.small_font = ImageFont.truetype("arial.ttf", 18)
-            self.tiny_font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            self.title_font = ImageFont.load_default()
-            self.header_font = ImageFont.load_default()
-            self.subheader_font = ImageFont.load_default()
-            self.body_font = ImageFont.load_default()
-            self.small_font = ImageFont.load_default()
-            self.tiny_font = ImageFont.load_default()
+        # Fonts are resolved and loaded once per process (src/renderer/fonts.py), not per instance
+        self.fonts = get_font_registry()
+        self.title_font = self.fonts.get(72)
+        self.header_font = self.fonts.get(48)
+        self.subheader_font = self.fonts.get(32)
+        self.body_font = self.fonts.get(24)
+        self.small_font = self.fonts.get(18)
+        self.tiny_font = self.fonts.get(16)
+
+    def text(self, draw, xy, text, font, fill):
+        """draw.text() with emoji / symbol glyphs taken from a fallback font when the main one lacks them"""
+        self.fonts.draw_text(draw, xy, text, font, fill)
 
     def draw_progress_bar(self, draw, x, y, width, height, percentage, color, bg_color="#334155"):
-        """Draw a progress bar"""
+        """Draw a progress bar (bg_color=None draws only the fill, over a template background)"""
         # Background
-        draw.rounded_rectangle([x, y, x + width, y + height], radius=height//2, fill=bg_color)
+        if bg_color:
+            draw.rounded_rectangle([x, y, x + width, y + height], radius=height//2, fill=bg_color)
         # Fill
         if percentage > 0:
             fill_width = int(width * min(percentage / 100, 1))
             draw.rounded_rectangle([x, y, x + fill_width, y + height], radius=height//2, fill=color)
 
-    def draw_metric_card(self, draw, x, y, width, height, label, value, score, status="", icon=""):
-        """Draw a compact metric card"""
-        # Card background
+    def draw_ring(self, draw, center_x, center_y, radius, thickness, percentage, color):
+        """Draw a progress ring (0-100%) clockwise from the top as a single native arc"""
+        angle = 360 * min(percentage, 100) / 100
+        if angle <= 0:
+            return
+        draw.arc([center_x - radius, center_y - radius, center_x + radius, center_y + radius],
+                 start=-90, end=-90 + angle, fill=color, width=thickness)
+
+    def draw_metric_card_frame(self, draw, x, y, width, height, label):
+        """Static part of a metric card: background, label and empty progress bar"""
         draw.rounded_rectangle([x, y, x + width, y + height], radius=8, fill=self.card_bg, outline=self.card_border, width=1)
-        
+        self.text(draw, (x + 30, y + 8), label, font=self.tiny_font, fill="#94A3B8")
+        draw.rounded_rectangle([x + 10, y + height - 12, x + width - 10, y + height - 6], radius=3, fill="#334155")
+
+    def draw_metric_card(self, draw, x, y, width, height, label, value, score, status="", icon=""):
+        """Draw the dynamic part of a compact metric card (frame and label come from the template)"""
         # Score color
         dot_color = self.green if score >= 1 else (self.yellow if score == 0.5 else self.red)
         
         # Icon/Status dot
         if icon:
-            draw.text((x + 10, y + 8), icon, font=self.body_font, fill=dot_color)
+            self.text(draw, (x + 10, y + 8), icon, font=self.body_font, fill=dot_color)
         else:
             draw.ellipse([x + 8, y + 8, x + 20, y + 20], fill=dot_color)
         
-        # Label
-        draw.text((x + 30, y + 8), label, font=self.tiny_font, fill="#94A3B8")
-        
         # Value
         value_str = str(value)
         if len(value_str) > 12:
             value_str = value_str[:9] + "..."
-        draw.text((x + 10, y + 28), value_str, font=self.small_font, fill=self.text_color)
+        self.text(draw, (x + 10, y + 28), value_str, font=self.small_font, fill=self.text_color)
         
         # Progress bar
         progress_pct = score * 100
-        self.draw_progress_bar(draw, x + 10, y + height - 12, width - 20, 6, progress_pct, dot_color)
+        self.draw_progress_bar(draw, x + 10, y + height - 12, width - 20, 6, progress_pct, dot_color, bg_color=None)
         
         # Status text if provided
         if status:
             status_short = status[:15] + "..." if len(status) > 15 else status
-            draw.text((x + 10, y + height - 25), status_short, font=self.tiny_font, fill="#64748B")
+            self.text(draw, (x + 10, y + height - 25), status_short, font=self.tiny_font, fill="#64748B")
 
-    def generate_report(self, stock_name, data, output_path):
-        img = Image.new('RGB', (self.width, self.height), color=self.bg_color)
-        draw = ImageDraw.Draw(img)
+    def wrap_text(self, text, font, max_width):
+        """Greedy word wrap by rendered width (font metrics), keeping explicit line breaks."""
+        lines = []
+        for paragraph in str(text).split('\n'):
+            line = ''
+            for word in paragraph.split():
+                candidate = f"{line} {word}" if line else word
+                if line and font.getlength(candidate) > max_width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+
+    def text_height(self, lines, font, spacing=4):
+        """Height of lines drawn as one multiline draw.text() call (same line spacing as Pillow)."""
+        if not lines:
+            return 0
+        line_h = font.getbbox("A")[3] + spacing
+        return line_h * (len(lines) - 1) + font.getbbox("Ag")[3]
+
+    def compute_layout(self, data):
+        """
+        First pass: wrap every text block with real font metrics, size the boxes that hold them and
+        position every section, which gives the exact canvas height. The second pass (render_template /
+        render_image) only draws. layout['key'] holds everything the static layer depends on; it
+        covers the canvas down to layout['static_h'], the rest is sized by each report's text.
+        """
+        details = data.get('details', {})
+        keys = tuple(k for k in ALL_PARAMS if k in details)
+        news_count = min(len(data.get('news_items') or []), 12)
+        layout = {'text': {}}
+
+        # ========== 2. COMPACT 3-COLUMN DATA GRID ==========
+        y_start = 250
+        layout['grid_title_y'] = y_start
+        y_start += 50
         
-        # ========== 1. ENHANCED HEADER ==========
-        header_y = 30
+        # Card dimensions
+        card_w = 420
+        card_h = 85
+        card_spacing = 20
+        col_spacing = 30
+        layout['card_size'] = (card_w, card_h)
         
-        # Gradient-like background for header
+        # Draw in 3 columns (column is chosen by position in ALL_PARAMS, even if keys are missing)
+        col_xs = [60, 60 + card_w + col_spacing, 60 + (card_w + col_spacing) * 2]
+        col_heights = [0, 0, 0]
+        cards = []
+        for idx, key in enumerate(ALL_PARAMS):
+            if key not in details:
+                continue
+            col_idx = idx % 3
+            cards.append((key, col_xs[col_idx], y_start + col_heights[col_idx]))
+            col_heights[col_idx] += card_h + card_spacing
+        layout['cards'] = cards
+        
+        y_cards = y_start + max(col_heights) + 60
+
+        # ========== 3. ENHANCED SUMMARY CARDS ==========
+        layout['insights_title_y'] = y_cards
+        layout['static_h'] = y_cards - 30
+        y_cards += 50
+        layout['summary_y'] = y_cards
+        box_w = 420
+        box_h = 180
+        for field in ('fundamental_summary', 'technical_summary', 'news_summary'):
+            lines = self.wrap_text(data.get(field, 'No summary.'), self.small_font, box_w - 40)
+            layout['text'][field] = lines
+            # Text starts 60px into the box; keep a 20px bottom margin
+            box_h = max(box_h, 60 + self.text_height(lines, self.small_font) + 20)
+        layout['summary_size'] = (box_w, box_h)
+        y_cards += box_h + 40
+
+        # ========== 4. DECISION CARDS ==========
+        layout['decisions_title_y'] = y_cards
+        y_cards += 50
+        layout['decisions_y'] = y_cards
+        dec_w = 650
+        text_w = dec_w - 60
+        text = layout['text']
+        for field in ('swing_reason', 'swing_action', 'long_term_reason'):
+            text[field] = self.wrap_text(data.get(field, ''), self.small_font, text_w) if data.get(field) else []
+
+        # Offsets inside the card; the action / score line move down when the reason wraps further
+        reason_bottom = 145 + self.text_height(text['swing_reason'], self.small_font)
+        layout['swing_action_dy'] = max(200, reason_bottom + 15) if text['swing_reason'] else 200
+        swing_bottom = layout['swing_action_dy'] + 25 + self.text_height(text['swing_action'], self.small_font) \
+            if text['swing_action'] else reason_bottom
+        lt_bottom = 145 + self.text_height(text['long_term_reason'], self.small_font)
+        layout['lt_score_dy'] = max(220, lt_bottom + 15)
+        dec_h = max(280, swing_bottom + 30, layout['lt_score_dy'] + 45)  # 280 = minimum card height
+        layout['decision_size'] = (dec_w, dec_h)
+        y_cards += dec_h + 40
+
+        # ========== 5. NEWS SECTION ==========
+        layout['news_title_y'] = y_cards
+        y_cards += 50
+        news_w = 620
+        news_h = 100
+        news_spacing = 20
+        layout['news_size'] = (news_w, news_h)
+        if news_count == 0:
+            layout['news_cards'] = []
+            layout['no_news_y'] = y_cards
+            y_cards += 100
+        else:
+            # 2-column news layout, up to 12 items (6 rows x 2 columns)
+            layout['news_cards'] = [(60 if i % 2 == 0 else 680, y_cards + (i // 2) * (news_h + news_spacing))
+                                    for i in range(news_count)]
+            y_cards = layout['news_cards'][-1][1] + news_h + news_spacing + 40
+
+        # ========== 6. VISUAL METRICS ==========
+        layout['charts_title_y'] = y_cards
+        y_cards += 50
+        chart_size = 280
+        chart_spacing = 40
+        layout['chart_size'] = chart_size
+        layout['charts'] = [(60 + (chart_size + chart_spacing) * i, y_cards) for i in range(4)]
+        y_cards += chart_size + 60
+
+        # ========== 7. FINAL VERDICT ==========
+        layout['final_y'] = y_cards
+        verdict_text = f"{data.get('final_action', 'Analyze more data.')}\n\n{data.get('retail_conclusion', '')}"
+        text['verdict'] = self.wrap_text(verdict_text, self.small_font, 1340 - 90 - 30)
+        final_h = max(180, 120 + self.text_height(text['verdict'], self.small_font) + 30)
+        layout['final_h'] = final_h
+
+        # Footer sits 40px below the verdict box
+        layout['height'] = y_cards + final_h + 80
+        layout['key'] = (self.width, keys)
+        return layout
+
+    def get_template(self, layout):
+        """The static layer for this layout, rendered once per process and then served from cache."""
+        key = layout['key']
+        with _template_lock:
+            template = _template_cache.get(key)
+            if template is not None:
+                _template_cache.move_to_end(key)
+                return template
+        template = self.render_template(layout)
+        with _template_lock:
+            _template_cache[key] = template
+            while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+                _template_cache.popitem(last=False)
+        return template
+
+    def render_template(self, layout):
+        """Rasterise the static layer for this layout (the top layout['static_h'] pixels of the canvas)."""
+        img = Image.new('RGB', (self.width, layout['static_h']), color=self.bg_color)
+        self.draw_template(ImageDraw.Draw(img), layout)
+        return img
+
+    def draw_template(self, draw, layout):
+        """Draw the cached static layer: header band, price box, score badge and data grid frames."""
+        header_y = 30
+
+        # ========== 1. HEADER ==========
         draw.rectangle([0, 0, self.width, 200], fill="#1A2332")
+        self.text(draw, (60, header_y), "📈", font=self.title_font, fill=self.yellow)
+        draw.rounded_rectangle([60, header_y + 80, 400, header_y + 140], radius=12, 
+                              fill=self.card_bg, outline=self.accent_blue, width=2)
+        self.text(draw, (80, header_y + 95), "Current Price", font=self.tiny_font, fill="#94A3B8")
+        # Score badge background (outline is drawn in the score colour later)
+        draw.rounded_rectangle([450, header_y + 30, 730, header_y + 180], radius=20, fill=self.card_bg)
+
+        stats_x = 760
+        self.text(draw, (stats_x, header_y + 30), "📊 Quick Stats", font=self.subheader_font, fill=self.yellow)
+        y_offset = header_y + 75
+        for label in ("Fundamental", "Technical", "News"):
+            self.text(draw, (stats_x, y_offset), label, font=self.tiny_font, fill="#94A3B8")
+            draw.rounded_rectangle([stats_x + 100, y_offset + 3, stats_x + 300, y_offset + 11], radius=4, fill="#334155")
+            y_offset += 25
+
+        # ========== 2. DATA GRID ==========
+        self.text(draw, (60, layout['grid_title_y']), "📋 DETAILED ANALYSIS", font=self.subheader_font, fill=self.yellow)
+        card_w, card_h = layout['card_size']
+        for key, x, y in layout['cards']:
+            self.draw_metric_card_frame(draw, x, y, card_w, card_h, key)
+
+    def draw_frames(self, draw, layout):
+        """
+        Section titles, card frames and chart backgrounds below the data grid. Their positions and
+        sizes follow the report's wrapped text, so they are drawn per report rather than cached.
+        """
+        # ========== 3. SUMMARY CARDS ==========
+        self.text(draw, (60, layout['insights_title_y']), "💡 KEY INSIGHTS", font=self.subheader_font, fill=self.yellow)
+        box_w, box_h = layout['summary_size']
+        for x in (60, 500, 940):
+            draw.rounded_rectangle([x, layout['summary_y'], x + box_w, layout['summary_y'] + box_h], radius=15, fill=self.card_bg)
+
+        # ========== 4. DECISION CARDS ==========
+        y = layout['decisions_y']
+        dec_w, dec_h = layout['decision_size']
+        self.text(draw, (60, layout['decisions_title_y']), "🎯 TRADING DECISIONS", font=self.subheader_font, fill=self.yellow)
+        draw.rounded_rectangle([60, y, 60 + dec_w, y + dec_h], radius=20, fill=self.card_bg)
+        draw.rounded_rectangle([730, y, 730 + dec_w, y + dec_h], radius=20, fill=self.card_bg)
+        self.text(draw, (90, y + 20), "⚡ Swing Trading", font=self.body_font, fill="#94A3B8")
+        self.text(draw, (760, y + 20), "📅 Long-Term Investment", font=self.body_font, fill="#94A3B8")
+
+        # ========== 5. NEWS SECTION ==========
+        self.text(draw, (60, layout['news_title_y']), "📰 LATEST NEWS & UPDATES", font=self.subheader_font, fill=self.yellow)
+        news_w, news_h = layout['news_size']
+        if not layout['news_cards']:
+            y = layout['no_news_y']
+            draw.rounded_rectangle([60, y, 1340, y + 80], radius=12, 
+                                  fill=self.card_bg, outline=self.card_border)
+            self.text(draw, (90, y + 30), "No recent news available. Check exchange filings for updates.", 
+                     font=self.small_font, fill="#94A3B8")
+        for x, y in layout['news_cards']:
+            draw.rounded_rectangle([x, y, x + news_w, y + news_h], radius=12, fill=self.card_bg)
+
+        # ========== 6. VISUAL METRICS ==========
+        self.text(draw, (60, layout['charts_title_y']), "📊 KEY METRICS VISUALIZATION", font=self.subheader_font, fill=self.yellow)
+        size = layout['chart_size']
+        for x, y in layout['charts']:
+            self.draw_chart_background(draw, x, y, size)
+
+        # ========== 7. FINAL VERDICT ==========
+        final_y = layout['final_y']
+        draw.rounded_rectangle([60, final_y, 1340, final_y + layout['final_h']], radius=20, 
+                              fill="#1A2332", outline=self.yellow, width=4)
+        self.text(draw, (90, final_y + 20), "🎯 FINAL VERDICT", font=self.subheader_font, fill=self.yellow)
+
+        # Footer
+        self.text(draw, (60, layout['height'] - 40), "Generated by Samvruddhi Stock Analyzer | Educational Purpose Only", 
+                 font=self.tiny_font, fill="#64748B")
+
+    def generate_report(self, stock_name, data, output_path, sizes=('full',)):
+        """
+        Render once and save every requested size. 'full' goes to output_path, other sizes
+        next to it as <name>_<size><ext>. Returns {size: path}.
+        """
+        root, ext = os.path.splitext(output_path)
+        paths = {}
+        for size, img in self.derive_sizes(self.render_image(stock_name, data), sizes).items():
+            paths[size] = output_path if size == 'full' else f"{root}_{size}{ext}"
+            img.save(paths[size])
+        return paths
+
+    def derive_sizes(self, img, sizes):
+        """
+        Downscale one full render to the requested RENDITIONS with Image.reduce (box filter, no
+        resampling kernel), each size reduced from the next larger one already computed.
+        """
+        unknown = [s for s in sizes if s not in RENDITIONS]
+        if unknown:
+            raise ValueError(f"Unknown report size(s) {unknown}. Use: {', '.join(RENDITIONS)}")
+        derived = {}
+        current, factor = img, 1
+        for size in sorted(set(sizes), key=RENDITIONS.get):
+            target = RENDITIONS[size]
+            if target % factor:
+                current, factor = img, 1
+            if target != factor:
+                current = current.reduce(target // factor)
+                factor = target
+            derived[size] = current
+        return derived
+
+    def render_set(self, stock_name, data, fmt=None, sizes=tuple(RENDITIONS), use_cache=True):
+        """
+        Encoded images for several sizes from a single render: {size: EncodedImage}.
+        Each size is cached under the report's content hash; only missing sizes are encoded.
+        """
+        fmt = fmt or REPORT_IMAGE_FORMAT
+        if not use_cache:
+            return {size: encode_image(img, fmt)
+                    for size, img in self.derive_sizes(self.render_image(stock_name, data), sizes).items()}
+
+        cache = get_render_cache()
+        key = content_hash(stock_name, data, fmt, self.width)
+        encoded = {size: cache.get(rendition_key(key, size)) for size in sizes}
+        missing = [size for size, hit in encoded.items() if hit is None]
+        if not missing:
+            logger.info(f"[{stock_name}] Report image served from render cache ({key[:12]})")
+            return encoded
+        for size, img in self.derive_sizes(self.render_image(stock_name, data), missing).items():
+            encoded[size] = encode_image(img, fmt)
+            cache.put(rendition_key(key, size), encoded[size])
+        return encoded
+
+    def render_encoded(self, stock_name, data, fmt=None, use_cache=True, size='full'):
+        """
+        Render and encode in memory (fmt defaults to REPORT_IMAGE_FORMAT). Returns an EncodedImage.
+        An unchanged result (same content hash) is served from the render cache without drawing.
+        """
+        return self.render_set(stock_name, data, fmt, (size,), use_cache)[size]
+
+    def render_bytes(self, stock_name, data, fmt=None, use_cache=True):
+        """Render the report straight to encoded bytes (for uploads / HTTP responses, no temp file)."""
+        return self.render_encoded(stock_name, data, fmt, use_cache).data
+
+    def render_image(self, stock_name, data):
+        """Compose the report over the cached static layer and per-report frames; returns the PIL image."""
+        layout = self.compute_layout(data)
+        img = Image.new('RGB', (self.width, layout['height']), color=self.bg_color)
+        img.paste(self.get_template(layout), (0, 0))
+        draw = ImageDraw.Draw(img)
+        self.draw_frames(draw, layout)
+        self.draw_report(draw, stock_name, data, layout)
+        return img
+
+    def render_svg(self, stock_name, data):
+        """
+        The same report as an SVG document (str): identical layout and drawing code, recorded as
+        vector elements instead of rasterised. Text is left to the viewer's fonts, emoji included.
+        """
+        layout = self.compute_layout(data)
+        family = self.body_font.getname()[0] if hasattr(self.body_font, 'getname') else None
+        svg = SvgDraw(self.width, layout['height'], self.bg_color, font_family=family)
+        self.draw_template(svg, layout)
+        self.draw_frames(svg, layout)
+        self.draw_report(svg, stock_name, data, layout)
+        return svg.tostring()
+
+    def draw_report(self, draw, stock_name, data, layout):
+        """Draw everything that depends on the stock, over draw_template() and draw_frames()."""
+        # ========== 1. ENHANCED HEADER ==========
+        header_y = 30
         
-        # Stock Name with icon
-        draw.text((60, header_y), "📈", font=self.title_font, fill=self.yellow)
-        draw.text((120, header_y), stock_name, font=self.title_font, fill=self.text_color)
+        # Stock Name (icon, header band and price box are in the template)
+        self.text(draw, (120, header_y), stock_name, font=self.title_font, fill=self.text_color)
         
         # CMP with better styling
         cmp = data.get('cmp', 0)
-        draw.rounded_rectangle([60, header_y + 80, 400, header_y + 140], radius=12, 
-                              fill=self.card_bg, outline=self.accent_blue, width=2)
-        draw.text((80, header_y + 95), "Current Price", font=self.tiny_font, fill="#94A3B8")
-        draw.text((80, header_y + 115), f"₹{cmp:.2f}", font=self.header_font, fill=self.accent_blue)
+        self.text(draw, (80, header_y + 115), f"₹{cmp:.2f}", font=self.header_font, fill=self.accent_blue)
         
         # Score Badge (Enhanced)
         score = data.get('total_score', 0)
@@ -110,7 +451,7 @@ class InfographicGenerator:
         badge_h = 150
         
         draw.rounded_rectangle([badge_x, badge_y, badge_x + badge_w, badge_y + badge_h], 
-                              radius=20, fill=self.card_bg, outline=score_color, width=4)
+                              radius=20, outline=score_color, width=4)
         
         # Score circle/arc
         center_x = badge_x + badge_w // 2
@@ -123,85 +464,35 @@ class InfographicGenerator:
         
         # Score percentage arc
         score_pct = (score / 37) * 100
-        for angle in range(0, int(360 * score_pct / 100), 5):
-            rad = math.radians(angle - 90)
-            x1 = center_x + (radius - 5) * math.cos(rad)
-            y1 = center_y + (radius - 5) * math.sin(rad)
-            x2 = center_x + radius * math.cos(rad)
-            y2 = center_y + radius * math.sin(rad)
-            draw.line([(x1, y1), (x2, y2)], fill=score_color, width=2)
+        self.draw_ring(draw, center_x, center_y, radius, 5, score_pct, score_color)
         
         # Score text in center
-        draw.text((center_x - 35, center_y - 20), f"{score:.1f}", font=self.header_font, fill=score_color)
-        draw.text((center_x - 50, center_y + 15), "/37", font=self.body_font, fill="#94A3B8")
-        draw.text((badge_x + 20, badge_y + 110), risk_label, font=self.body_font, fill=score_color)
+        self.text(draw, (center_x - 35, center_y - 20), f"{score:.1f}", font=self.header_font, fill=score_color)
+        self.text(draw, (center_x - 50, center_y + 15), "/37", font=self.body_font, fill="#94A3B8")
+        self.text(draw, (badge_x + 20, badge_y + 110), risk_label, font=self.body_font, fill=score_color)
         
-        # Quick stats on right
+        # Quick stats on right (title, labels and bar backgrounds are in the template)
         stats_x = 760
-        draw.text((stats_x, header_y + 30), "📊 Quick Stats", font=self.subheader_font, fill=self.yellow)
-        
         fund_score = data.get('fundamental_score', 0)
         tech_score = data.get('technical_score', 0)
         news_score = data.get('news_score', 0)
         
         # Mini progress bars for scores
         y_offset = header_y + 75
-        for label, val, max_val, color in [("Fundamental", fund_score, 24, self.blue), 
-                                           ("Technical", tech_score, 5, self.yellow),
-                                           ("News", news_score, 8, self.green)]:
-            draw.text((stats_x, y_offset), label, font=self.tiny_font, fill="#94A3B8")
+        for val, max_val, color in [(fund_score, 24, self.blue), 
+                                    (tech_score, 5, self.yellow),
+                                    (news_score, 8, self.green)]:
             pct = (val / max_val) * 100 if max_val > 0 else 0
-            self.draw_progress_bar(draw, stats_x + 100, y_offset + 3, 200, 8, pct, color)
-            draw.text((stats_x + 310, y_offset), f"{val:.1f}", font=self.tiny_font, fill=color)
+            self.draw_progress_bar(draw, stats_x + 100, y_offset + 3, 200, 8, pct, color, bg_color=None)
+            self.text(draw, (stats_x + 310, y_offset), f"{val:.1f}", font=self.tiny_font, fill=color)
             y_offset += 25
 
         # ========== 2. COMPACT 3-COLUMN DATA GRID ==========
-        y_start = 250
         details = data.get('details', {})
+        card_w, card_h = layout['card_size']
         
-        # Section header
-        draw.text((60, y_start), "📋 DETAILED ANALYSIS", font=self.subheader_font, fill=self.yellow)
-        y_start += 50
-        
-        # Card dimensions
-        card_w = 420
-        card_h = 85
-        card_spacing = 20
-        col_spacing = 30
-        
-        # Organize keys into 3 columns
-        all_fund_keys = [
-            'Market Cap', 'CMP vs 52W', 'P/E Ratio', 'PEG Ratio', 'EPS Trend', 
-            'EBITDA Trend', 'Debt / Equity', 'Dividend Yield', 'Intrinsic Value',
-            'Current Ratio', 'Promoter Holding', 'FII/DII Trend', 'Operating Cash Flow',
-            'ROCE', 'ROE', 'Revenue CAGR', 'Profit CAGR', 'Interest Coverage',
-            'Free Cash Flow', 'Equity Dilution', 'Pledged Shares', 'Contingent Liab',
-            'Piotroski Score', 'Working Cap Cycle', 'CFO / PAT', 'Book Value Analysis'
-        ]
-        
-        tech_keys = ['Trend (DMA)', 'RSI', 'MACD', 'Pivot Support', 'Volume Trend']
-        news_keys = ['Orders / Business', 'Dividend / Buyback', 'Results Performance',
-                    'Regulatory / Credit', 'Sector vs Nifty', 'Peer Comparison', 
-                    'Promoter Pledge', 'Management']
-        
-        all_keys = all_fund_keys + tech_keys + news_keys
-        
-        # Draw in 3 columns
-        col1_x = 60
-        col2_x = 60 + card_w + col_spacing
-        col3_x = 60 + (card_w + col_spacing) * 2
-        
-        current_y = y_start
-        col_heights = [0, 0, 0]
-        
-        for idx, key in enumerate(all_keys):
-            if key not in details:
-                continue
-                
+        for key, col_x, col_y in layout['cards']:
             val = details[key]
-            col_idx = idx % 3
-            col_x = [col1_x, col2_x, col3_x][col_idx]
-            col_y = current_y + col_heights[col_idx]
             
             # Get icon based on category
             icon = ""
@@ -222,20 +513,15 @@ class InfographicGenerator:
             
             self.draw_metric_card(draw, col_x, col_y, card_w, card_h, key, val['value'], 
                                  val['score'], val.get('status', ''), icon)
-            
-            col_heights[col_idx] += card_h + card_spacing
-        
-        y_cards = y_start + max(col_heights) + 60
 
         # ========== 3. ENHANCED SUMMARY CARDS ==========
-        draw.text((60, y_cards), "💡 KEY INSIGHTS", font=self.subheader_font, fill=self.yellow)
-        y_cards += 50
+        y_cards = layout['summary_y']
         
         f_summary = data.get('fundamental_summary', 'No summary.')
         t_summary = data.get('technical_summary', 'No summary.')
         n_summary = data.get('news_summary', 'No summary.')
         
-        def draw_enhanced_summary_box(title, text, icon, x, y, width, height):
+        def draw_enhanced_summary_box(title, text, lines, icon, x, y, width, height):
             # Determine colors
             if "Bullish" in text or "🟢" in text:
                 border_color = self.green
@@ -247,176 +533,129 @@ class InfographicGenerator:
                 border_color = self.yellow
                 icon_color = self.yellow
             
-            # Card with gradient effect
+            # Card outline (the fill is in the template)
             draw.rounded_rectangle([x, y, x + width, y + height], radius=15, 
-                                  fill=self.card_bg, outline=border_color, width=3)
+                                  outline=border_color, width=3)
             
             # Icon and title
-            draw.text((x + 20, y + 15), icon, font=self.header_font, fill=icon_color)
-            draw.text((x + 80, y + 20), title, font=self.body_font, fill=icon_color)
+            self.text(draw, (x + 20, y + 15), icon, font=self.header_font, fill=icon_color)
+            self.text(draw, (x + 80, y + 20), title, font=self.body_font, fill=icon_color)
             
-            # Text with wrapping
-            import textwrap
-            wrapped = textwrap.fill(text, width=40)
-            draw.text((x + 20, y + 60), wrapped, font=self.small_font, fill="#E2E8F0")
+            # Text, wrapped to the box width in compute_layout
+            self.text(draw, (x + 20, y + 60), "\n".join(lines), font=self.small_font, fill="#E2E8F0")
 
-        box_w = 420
-        box_h = 180
-        draw_enhanced_summary_box("Fundamental", f_summary, "📊", 60, y_cards, box_w, box_h)
-        draw_enhanced_summary_box("Technical", t_summary, "📈", 500, y_cards, box_w, box_h)
-        draw_enhanced_summary_box("News", n_summary, "📰", 940, y_cards, box_w, box_h)
-        
-        y_cards += box_h + 40
+        box_w, box_h = layout['summary_size']
+        wrapped = layout['text']
+        draw_enhanced_summary_box("Fundamental", f_summary, wrapped['fundamental_summary'], "📊", 60, y_cards, box_w, box_h)
+        draw_enhanced_summary_box("Technical", t_summary, wrapped['technical_summary'], "📈", 500, y_cards, box_w, box_h)
+        draw_enhanced_summary_box("News", n_summary, wrapped['news_summary'], "📰", 940, y_cards, box_w, box_h)
 
         # ========== 4. DECISION CARDS (Enhanced) ==========
-        draw.text((60, y_cards), "🎯 TRADING DECISIONS", font=self.subheader_font, fill=self.yellow)
-        y_cards += 50
+        y_cards = layout['decisions_y']
         
         # Swing Card
         swing_verdict = data.get('swing_verdict', 'WAIT')
         s_color = self.green if "BUY" in swing_verdict else (self.red if "AVOID" in swing_verdict else self.yellow)
         
-        swing_w = 650
-        swing_h = 280  # Increased height for more content
+        swing_w, swing_h = layout['decision_size']
         draw.rounded_rectangle([60, y_cards, 60 + swing_w, y_cards + swing_h], radius=20, 
-                              fill=self.card_bg, outline=s_color, width=4)
+                              outline=s_color, width=4)
         
-        draw.text((90, y_cards + 20), "⚡ Swing Trading", font=self.body_font, fill="#94A3B8")
-        draw.text((90, y_cards + 60), swing_verdict, font=self.header_font, fill=s_color)
+        self.text(draw, (90, y_cards + 60), swing_verdict, font=self.header_font, fill=s_color)
         
         swing_action = data.get('swing_action', '')
         swing_reason = data.get('swing_reason', '')
         
         # Enhanced reason display with better formatting
-        import textwrap
         if swing_reason:
             # Make reason more prominent
-            draw.text((90, y_cards + 120), "📋 Reason:", font=self.small_font, fill=self.yellow)
-            wrapped_reason = textwrap.fill(swing_reason, width=60)
-            draw.text((90, y_cards + 145), wrapped_reason, font=self.small_font, fill="#E2E8F0")
+            self.text(draw, (90, y_cards + 120), "📋 Reason:", font=self.small_font, fill=self.yellow)
+            self.text(draw, (90, y_cards + 145), "\n".join(wrapped['swing_reason']), font=self.small_font, fill="#E2E8F0")
         
         if swing_action:
-            draw.text((90, y_cards + 200), "💡 Action:", font=self.small_font, fill=self.yellow)
-            wrapped_action = textwrap.fill(swing_action, width=60)
-            draw.text((90, y_cards + 225), wrapped_action, font=self.small_font, fill="#E2E8F0")
+            action_y = y_cards + layout['swing_action_dy']
+            self.text(draw, (90, action_y), "💡 Action:", font=self.small_font, fill=self.yellow)
+            self.text(draw, (90, action_y + 25), "\n".join(wrapped['swing_action']), font=self.small_font, fill="#E2E8F0")
         
         # Long Term Card
         lt_verdict = data.get('long_term_verdict', 'AVOID')
         l_color = self.green if "BUY" in lt_verdict else (self.red if "AVOID" in lt_verdict else self.yellow)
         
-        lt_w = 650
-        lt_h = 280  # Increased height for more content
+        lt_w, lt_h = layout['decision_size']
         draw.rounded_rectangle([730, y_cards, 730 + lt_w, y_cards + lt_h], radius=20, 
-                              fill=self.card_bg, outline=l_color, width=4)
+                              outline=l_color, width=4)
         
-        draw.text((760, y_cards + 20), "📅 Long-Term Investment", font=self.body_font, fill="#94A3B8")
-        draw.text((760, y_cards + 60), lt_verdict, font=self.header_font, fill=l_color)
+        self.text(draw, (760, y_cards + 60), lt_verdict, font=self.header_font, fill=l_color)
         
         lt_reason = data.get('long_term_reason', '')
-        import textwrap
         
         # Enhanced reason display
         if lt_reason:
-            draw.text((760, y_cards + 120), "📋 Reason:", font=self.small_font, fill=self.yellow)
-            lt_wrapped = textwrap.fill(lt_reason, width=60)
-            draw.text((760, y_cards + 145), lt_wrapped, font=self.small_font, fill="#E2E8F0")
+            self.text(draw, (760, y_cards + 120), "📋 Reason:", font=self.small_font, fill=self.yellow)
+            self.text(draw, (760, y_cards + 145), "\n".join(wrapped['long_term_reason']), font=self.small_font, fill="#E2E8F0")
         
         # Add key metrics summary for long-term
         total_score = data.get('total_score', 0)
         fund_score = data.get('fundamental_score', 0)
         if total_score > 0:
             score_text = f"Overall Score: {total_score:.1f}/37 | Fundamental: {fund_score:.1f}/24"
-            draw.text((760, y_cards + 220), score_text, font=self.tiny_font, fill="#94A3B8")
-        
-        y_cards += swing_h + 40
+            self.text(draw, (760, y_cards + layout['lt_score_dy']), score_text, font=self.tiny_font, fill="#94A3B8")
 
         # ========== 5. NEWS SECTION (Card-based) ==========
-        draw.text((60, y_cards), "📰 LATEST NEWS & UPDATES", font=self.subheader_font, fill=self.yellow)
-        y_cards += 50
-        
         news_items = data.get('news_items', [])
-        
-        if not news_items or len(news_items) == 0:
-            draw.rounded_rectangle([60, y_cards, 1340, y_cards + 80], radius=12, 
-                                  fill=self.card_bg, outline=self.card_border)
-            draw.text((90, y_cards + 30), "No recent news available. Check exchange filings for updates.", 
-                     font=self.small_font, fill="#94A3B8")
-            y_cards += 100
-        else:
-            # 2-column news layout
-            news_w = 620
-            news_h = 100
-            news_spacing = 20
-            current_news_y = y_cards
+        news_w, news_h = layout['news_size']
+        
+        # Up to 12 news items (6 rows x 2 columns); "no news" card is part of the template
+        for news, (news_x, current_news_y) in zip(news_items, layout['news_cards']):
+            source = news.get('source', 'News')
+            title = news.get('title', 'No title')
+            category = news.get('category', 'General')
+            sentiment = news.get('sentiment', 'Neutral')
             
-            # Show up to 12 news items (6 rows x 2 columns)
-            for i, news in enumerate(news_items[:12]):
-                if i % 2 == 0:
-                    news_x = 60
-                    if i > 0:
-                        current_news_y += news_h + news_spacing
-                else:
-                    news_x = 680
-                
-                source = news.get('source', 'News')
-                title = news.get('title', 'No title')
-                category = news.get('category', 'General')
-                sentiment = news.get('sentiment', 'Neutral')
-                
-                # Truncate title
-                if len(title) > 60:
-                    title = title[:57] + "..."
-                
-                # Sentiment color
-                sentiment_color = self.green if sentiment == 'Positive' else (self.red if sentiment == 'Negative' else "#94A3B8")
-                
-                # News card
-                draw.rounded_rectangle([news_x, current_news_y, news_x + news_w, current_news_y + news_h], 
-                                      radius=12, fill=self.card_bg, outline=sentiment_color, width=2)
-                
-                # Category badge
-                if category != 'General':
-                    badge_w = len(category) * 7 + 10
-                    draw.rounded_rectangle([news_x + 15, current_news_y + 10, news_x + 15 + badge_w, current_news_y + 30], 
-                                          radius=4, fill=sentiment_color + "40", outline=sentiment_color)
-                    draw.text((news_x + 20, current_news_y + 12), category, font=self.tiny_font, fill=sentiment_color)
-                
-                # Title
-                title_y = current_news_y + 35
-                sentiment_icon = "🟢" if sentiment == 'Positive' else ("🔴" if sentiment == 'Negative' else "⚪")
-                draw.text((news_x + 15, title_y), f"{sentiment_icon} {title}", 
-                         font=self.small_font, fill="#E2E8F0")
-                
-                # Source
-                draw.text((news_x + 15, current_news_y + 75), f"📌 {source}", 
-                         font=self.tiny_font, fill="#64748B")
+            # Truncate title
+            if len(title) > 60:
+                title = title[:57] + "..."
+            
+            # Sentiment color
+            sentiment_color = self.green if sentiment == 'Positive' else (self.red if sentiment == 'Negative' else "#94A3B8")
+            
+            # News card outline
+            draw.rounded_rectangle([news_x, current_news_y, news_x + news_w, current_news_y + news_h], 
+                                  radius=12, outline=sentiment_color, width=2)
+            
+            # Category badge
+            if category != 'General':
+                badge_w = len(category) * 7 + 10
+                draw.rounded_rectangle([news_x + 15, current_news_y + 10, news_x + 15 + badge_w, current_news_y + 30], 
+                                      radius=4, fill=sentiment_color + "40", outline=sentiment_color)
+                self.text(draw, (news_x + 20, current_news_y + 12), category, font=self.tiny_font, fill=sentiment_color)
+            
+            # Title
+            title_y = current_news_y + 35
+            sentiment_icon = "🟢" if sentiment == 'Positive' else ("🔴" if sentiment == 'Negative' else "⚪")
+            self.text(draw, (news_x + 15, title_y), f"{sentiment_icon} {title}", 
+                     font=self.small_font, fill="#E2E8F0")
             
-            y_cards = current_news_y + news_h + news_spacing + 40
+            # Source
+            self.text(draw, (news_x + 15, current_news_y + 75), f"📌 {source}", 
+                     font=self.tiny_font, fill="#64748B")
 
         # ========== 6. VISUAL METRICS (Enhanced Charts) ==========
-        draw.text((60, y_cards), "📊 KEY METRICS VISUALIZATION", font=self.subheader_font, fill=self.yellow)
-        y_cards += 50
-        
-        # Larger, better charts in 2x2 grid
-        chart_size = 280
-        chart_spacing = 40
-        chart_y = y_cards
+        chart_size = layout['chart_size']
+        (chart1_x, chart_y), (chart2_x, _), (chart3_x, _), (chart4_x, _) = layout['charts']
         
         # Chart 1: Promoter Holding
-        chart1_x = 60
         promoter = float(data.get('details', {}).get('Promoter Holding', {}).get('value', '0').replace('%', '') or 0)
         self.draw_large_chart(draw, chart1_x, chart_y, chart_size, "Promoter Holding", 
                             promoter, 100, self.green, f"{promoter:.1f}%")
         
         # Chart 2: Fundamental Score
-        chart2_x = 60 + chart_size + chart_spacing
         fund_score_val = data.get('fundamental_score', 0)
         fund_pct = (fund_score_val / 24) * 100
         self.draw_large_chart(draw, chart2_x, chart_y, chart_size, "Fundamental", 
                             fund_pct, 100, self.blue, f"{fund_score_val:.1f}/24")
         
         # Chart 3: Debt Level
-        chart3_x = 60 + (chart_size + chart_spacing) * 2
         debt = float(data.get('details', {}).get('Debt / Equity', {}).get('value', '0') or 0)
         debt_pct = min((debt / 2) * 100, 100) if debt > 0 else 0
         debt_color = self.red if debt > 1 else self.green
@@ -424,42 +663,22 @@ class InfographicGenerator:
                             debt_pct, 100, debt_color, f"{debt:.2f}")
         
         # Chart 4: Technical Score
-        chart4_x = 60 + (chart_size + chart_spacing) * 3
         tech_score_val = data.get('technical_score', 0)
         tech_pct = (tech_score_val / 5) * 100
         self.draw_large_chart(draw, chart4_x, chart_y, chart_size, "Technical", 
                             tech_pct, 100, self.yellow, f"{tech_score_val:.1f}/5")
-        
-        y_cards += chart_size + 60
 
         # ========== 7. FINAL VERDICT (Enhanced) ==========
-        final_y = y_cards
-        draw.rounded_rectangle([60, final_y, 1340, final_y + 180], radius=20, 
-                              fill="#1A2332", outline=self.yellow, width=4)
-        
-        draw.text((90, final_y + 20), "🎯 FINAL VERDICT", font=self.subheader_font, fill=self.yellow)
+        final_y = layout['final_y']
         
         health_label = data.get('health_label', '')
         health_color = self.green if "High" in health_label else (self.red if "Risk" in health_label else self.yellow)
-        draw.text((90, final_y + 70), health_label, font=self.header_font, fill=health_color)
-        
-        final_action = data.get('final_action', 'Analyze more data.')
-        retail_conc = data.get('retail_conclusion', '')
+        self.text(draw, (90, final_y + 70), health_label, font=self.header_font, fill=health_color)
         
-        import textwrap
-        verdict_text = f"{final_action}\n\n{retail_conc}"
-        wrapped_verdict = textwrap.fill(verdict_text, width=80)
-        draw.text((90, final_y + 120), wrapped_verdict, font=self.small_font, fill="#E2E8F0")
-        
-        # Footer
-        draw.text((60, self.height - 40), "Generated by Samvruddhi Stock Analyzer | Educational Purpose Only", 
-                 font=self.tiny_font, fill="#64748B")
-        
-        img.save(output_path)
-        return output_path
+        self.text(draw, (90, final_y + 120), "\n".join(wrapped['verdict']), font=self.small_font, fill="#E2E8F0")
 
-    def draw_large_chart(self, draw, x, y, size, label, percentage, max_val, color, value_text):
-        """Draw a large donut chart"""
+    def draw_chart_background(self, draw, x, y, size):
+        """Static part of a donut chart: ring background and inner circle"""
         center_x = x + size // 2
         center_y = y + size // 2
         radius = size // 2 - 20
@@ -468,26 +687,25 @@ class InfographicGenerator:
         draw.ellipse([center_x - radius, center_y - radius, center_x + radius, center_y + radius], 
                     fill="#1E293B", outline=self.card_border, width=3)
         
-        # Donut slice
-        if percentage > 0:
-            end_angle = int(360 * (percentage / max_val))
-            for angle in range(0, end_angle, 2):
-                rad = math.radians(angle - 90)
-                x1 = center_x + (radius - 8) * math.cos(rad)
-                y1 = center_y + (radius - 8) * math.sin(rad)
-                x2 = center_x + radius * math.cos(rad)
-                y2 = center_y + radius * math.sin(rad)
-                draw.line([(x1, y1), (x2, y2)], fill=color, width=3)
-        
         # Inner circle (donut effect)
         inner_radius = radius * 0.65
         draw.ellipse([center_x - inner_radius, center_y - inner_radius, 
                      center_x + inner_radius, center_y + inner_radius], 
                     fill=self.bg_color)
+
+    def draw_large_chart(self, draw, x, y, size, label, percentage, max_val, color, value_text):
+        """Draw the dynamic part of a large donut chart (background comes from the template)"""
+        center_x = x + size // 2
+        center_y = y + size // 2
+        radius = size // 2 - 20
+        
+        # Donut slice (outside the inner circle, so it can be drawn over the template)
+        if percentage > 0:
+            self.draw_ring(draw, center_x, center_y, radius, 8, percentage / max_val * 100, color)
         
         # Center text
-        draw.text((center_x - 40, center_y - 25), value_text, font=self.body_font, fill=color)
+        self.text(draw, (center_x - 40, center_y - 25), value_text, font=self.body_font, fill=color)
         
-        # Label below
+        # Label below (drawn after the slice, which can reach it)
         label_width = draw.textlength(label, font=self.small_font)
-        draw.text((center_x - label_width // 2, y + size - 30), label, font=self.small_font, fill="#94A3B8")
+        self.text(draw, (center_x - label_width // 2, y + size - 30), label, font=self.small_font, fill="#94A3B8")
@@ -0,0 +1,224 @@
+import logging
+import struct
+from datetime import datetime
+from PIL import Image, ImageDraw
+from src.config import SNAPSHOT_MAX_AGE, DIGEST_WATCHLIST
+from src.pipeline import iter_watchlist
+from src.renderer.encoders import encode_image
+from src.renderer.generator import InfographicGenerator, REPORT_WIDTH
+from src.renderer.pool import get_render_pool, RenderError
+
+logger = logging.getLogger(__name__)
+
+# Pages are sized as if the 1400 px canvas were printed at 150 dpi (672 pt, a little wider than A4)
+POINTS_PER_PIXEL = 72 / 150
+
+# Index page: A4 proportions at the report width
+INDEX_HEIGHT = REPORT_WIDTH * 297 // 210
+INDEX_TOP = 230
+INDEX_ROW_H = 38
+INDEX_ROWS = (INDEX_HEIGHT - INDEX_TOP - 80) // INDEX_ROW_H
+INDEX_FIELDS = ['total_score', 'fundamental_score', 'technical_score', 'news_score', 'swing_verdict', 'long_term_verdict']
+
+class PdfError(ValueError):
+    """Image data the PDF writer cannot embed."""
+
+def _png_chunks(data):
+    if data[:8] != b'\x89PNG\r\n\x1a\n':
+        raise PdfError("Page images must be PNG encoded")
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+def png_image_object(data):
+    """
+    PDF image XObject (dict, stream) for PNG bytes, without decoding: the IDAT stream is already
+    zlib data with PNG row filters, which PDF reads directly with /Predictor 15.
+    """
+    idat, palette, header = [], None, None
+    for kind, chunk in _png_chunks(data):
+        if kind == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif kind == b'PLTE':
+            palette = chunk
+        elif kind == b'IDAT':
+            idat.append(chunk)
+    width, height, depth, color_type, _, _, interlace = header
+    if interlace:
+        raise PdfError("Interlaced PNG pages are not supported")
+    if color_type == 3:
+        colors, space = 1, f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+    elif color_type == 2:
+        colors, space = 3, "/DeviceRGB"
+    elif color_type == 0:
+        colors, space = 1, "/DeviceGray"
+    else:
+        raise PdfError(f"PNG colour type {color_type} (alpha) is not supported")
+    stream = b"".join(idat)
+    head = (f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace {space} "
+            f"/BitsPerComponent {depth} /Filter /FlateDecode /DecodeParms << /Predictor 15 /Colors {colors} "
+            f"/BitsPerComponent {depth} /Columns {width} >> /Length {len(stream)} >>")
+    return head, stream, width, height
+
+class StreamingPdfWriter:
+    """
+    Writes a PDF one page at a time: every page's objects go to the file as soon as it is added,
+    so memory holds one page. The page tree and catalog are written by close(), which can also
+    put pages added last (an index) in front of the others.
+    """
+
+    PAGES_REF = 1
+    CATALOG_REF = 2
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.offsets = {}
+        self.next_ref = 3
+        self.pages = []
+        self.pos = 0
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.fp.write(data)
+        self.pos += len(data)
+
+    def reserve(self):
+        ref = self.next_ref
+        self.next_ref += 1
+        return ref
+
+    def write_object(self, ref, head, stream=None):
+        self.offsets[ref] = self.pos
+        self._write(f"{ref} 0 obj\n{head}\n".encode('latin-1'))
+        if stream is not None:
+            self._write(b"stream\n" + stream + b"\nendstream\n")
+        self._write(b"endobj\n")
+
+    def add_png_page(self, png_bytes, page_ref=None, links=()):
+        """
+        Add a page showing one PNG. links: [(x0, y0, x1, y1, target_page_ref)] in image pixels.
+        Returns the page's object number (reserve() one up front to link to a page not written yet).
+        """
+        head, stream, width, height = png_image_object(png_bytes)
+        image_ref, content_ref = self.reserve(), self.reserve()
+        page_ref = page_ref or self.reserve()
+        self.write_object(image_ref, head, stream)
+
+        w, h = width * POINTS_PER_PIXEL, height * POINTS_PER_PIXEL
+        content = f"q {w:.2f} 0 0 {h:.2f} 0 0 cm /Im0 Do Q".encode('latin-1')
+        self.write_object(content_ref, f"<< /Length {len(content)} >>", content)
+
+        annots = []
+        for x0, y0, x1, y1, target in links:
+            rect = (f"{x0 * POINTS_PER_PIXEL:.2f} {h - y1 * POINTS_PER_PIXEL:.2f} "
+                    f"{x1 * POINTS_PER_PIXEL:.2f} {h - y0 * POINTS_PER_PIXEL:.2f}")
+            annots.append(f"<< /Type /Annot /Subtype /Link /Rect [{rect}] /Border [0 0 0] /Dest [{target} 0 R /Fit] >>")
+        annots = f" /Annots [{' '.join(annots)}]" if annots else ""
+        self.write_object(page_ref, f"<< /Type /Page /Parent {self.PAGES_REF} 0 R /MediaBox [0 0 {w:.2f} {h:.2f}] "
+                                    f"/Resources << /XObject << /Im0 {image_ref} 0 R >> >> /Contents {content_ref} 0 R{annots} >>")
+        self.pages.append(page_ref)
+        return page_ref
+
+    def close(self, first_pages=()):
+        """Write the page tree (first_pages in front), catalog, xref and trailer."""
+        order = list(first_pages) + [p for p in self.pages if p not in first_pages]
+        kids = " ".join(f"{ref} 0 R" for ref in order)
+        self.write_object(self.PAGES_REF, f"<< /Type /Pages /Kids [{kids}] /Count {len(order)} >>")
+        self.write_object(self.CATALOG_REF, f"<< /Type /Catalog /Pages {self.PAGES_REF} 0 R >>")
+
+        xref_pos = self.pos
+        size = self.next_ref
+        lines = ["xref", f"0 {size}", "0000000000 65535 f "]
+        for ref in range(1, size):
+            lines.append(f"{self.offsets.get(ref, 0):010d} 00000 n " if ref in self.offsets else "0000000000 65535 f ")
+        self._write(("\n".join(lines) + "\n").encode('latin-1'))
+        self._write(f"trailer\n<< /Size {size} /Root {self.CATALOG_REF} 0 R >>\nstartxref\n{xref_pos}\n%%EOF\n"
+                    .encode('latin-1'))
+
+def render_index_pages(entries, generated_at=None):
+    """
+    Score index: one row per symbol, best score first. entries: [(symbol, result, page_ref)].
+    Yields (PIL image, links) per index page; each row links to the symbol's report page
+    (page_ref None: the page could not be rendered, the row is drawn dimmed and not linked).
+    """
+    gen = InfographicGenerator()
+    ranked = sorted(entries, key=lambda e: e[1].get('total_score', 0), reverse=True)
+    pages = max(1, -(-len(ranked) // INDEX_ROWS))
+    columns = [("#", 60), ("Symbol", 120), ("Score", 400), ("Fund.", 520), ("Tech.", 630), ("News", 730),
+               ("Swing", 840), ("Long Term", 1060)]
+    for page in range(pages):
+        img = Image.new('RGB', (REPORT_WIDTH, INDEX_HEIGHT), color=gen.bg_color)
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([0, 0, REPORT_WIDTH, 160], fill="#1A2332")
+        gen.text(draw, (60, 40), "📑 WATCHLIST REPORT", font=gen.header_font, fill=gen.yellow)
+        stamp = (generated_at or datetime.now()).strftime('%d %b %Y %H:%M')
+        missing = sum(1 for _, _, page_ref in ranked if page_ref is None)
+        note = f" · {missing} report(s) missing" if missing else ""
+        gen.text(draw, (60, 105), f"{len(ranked)} stocks · {stamp} · page {page + 1}/{pages} of index{note}",
+                 font=gen.small_font, fill="#94A3B8")
+        for label, x in columns:
+            gen.text(draw, (x, INDEX_TOP - 40), label, font=gen.small_font, fill=gen.yellow)
+
+        links = []
+        rows = ranked[page * INDEX_ROWS:(page + 1) * INDEX_ROWS]
+        for i, (symbol, result, page_ref) in enumerate(rows):
+            y = INDEX_TOP + i * INDEX_ROW_H
+            if i % 2 == 0:
+                draw.rectangle([40, y - 6, REPORT_WIDTH - 40, y + INDEX_ROW_H - 6], fill=gen.card_bg)
+            score = result.get('total_score', 0)
+            score_color = gen.green if score > 25 else (gen.yellow if score > 15 else gen.red)
+            values = [(f"{page * INDEX_ROWS + i + 1}", "#64748B"), (symbol, gen.text_color),
+                      (f"{score:.1f}/37", score_color),
+                      (f"{result.get('fundamental_score', 0):.1f}", gen.blue),
+                      (f"{result.get('technical_score', 0):.1f}", gen.yellow),
+                      (f"{result.get('news_score', 0):.1f}", gen.green),
+                      (result.get('swing_verdict', 'N/A'), "#E2E8F0"), (result.get('long_term_verdict', 'N/A'), "#E2E8F0")]
+            if page_ref is None:
+                values = [(value, "#64748B") for value, _ in values]
+                values[1] = (f"{symbol} (missing)", "#64748B")
+            for (_, x), (value, color) in zip(columns, values):
+                gen.text(draw, (x, y), str(value)[:22], font=gen.small_font, fill=color)
+            if page_ref is not None:
+                links.append((40, y - 6, REPORT_WIDTH - 40, y + INDEX_ROW_H - 6, page_ref))
+        yield img, links
+
+def export_watchlist_pdf(symbols, fp, max_workers=4, max_age=SNAPSHOT_MAX_AGE):
+    """
+    Analyze a watchlist and write a PDF to fp (binary file object): a report page per symbol,
+    written as soon as that symbol's analysis completes, then a score index placed first.
+    A symbol whose render fails is listed on the index as missing. The PDF is closed (page tree,
+    xref, trailer) even if the export stops early, so fp always holds a readable file.
+    Returns the number of report pages.
+    """
+    writer = StreamingPdfWriter(fp)
+    pool = get_render_pool()
+    # Only scores and verdicts are kept per symbol for the index; page images are written and dropped
+    entries = []
+    index_refs = []
+    pages = 0
+    try:
+        for symbol, result in iter_watchlist(symbols, max_workers=max_workers, max_age=max_age):
+            try:
+                photo = pool.render(symbol, result, 'png-palette')
+            except RenderError as e:
+                logger.error(f"[{symbol}] Could not render PDF page: {e}")
+                page_ref = None
+            else:
+                page_ref = writer.add_png_page(photo.data)
+                pages += 1
+                logger.info(f"[{symbol}] PDF page {pages} written")
+            entries.append((symbol, {k: result[k] for k in INDEX_FIELDS if k in result}, page_ref))
+
+        for img, links in render_index_pages(entries):
+            index_refs.append(writer.add_png_page(encode_image(img, 'png-palette').data, links=links))
+    finally:
+        writer.close(first_pages=index_refs)
+    return pages
+
+def export_watchlist_pdf_file(path, symbols=None, **kwargs):
+    with open(path, 'wb') as f:
+        pages = export_watchlist_pdf(symbols or DIGEST_WATCHLIST, f, **kwargs)
+    logger.info(f"Wrote {pages} report page(s) to {path}")
+    return pages
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from src.config import REPORT_IMAGE_FORMAT, RENDER_WORKERS, RENDER_MAX_PENDING, RENDER_TIMEOUT
+from src.renderer.cache import content_hash, get_render_cache, rendition_key
+from src.renderer.generator import InfographicGenerator, REPORT_WIDTH
+
+logger = logging.getLogger(__name__)
+
+class RenderError(RuntimeError):
+    """Rendering could not be scheduled or did not finish in time."""
+
+class RenderBusyError(RenderError):
+    """All render slots stayed taken for the whole timeout (backpressure)."""
+
+class RenderTimeoutError(RenderError):
+    """The render was accepted but did not finish within the timeout."""
+
+# ========== WORKER PROCESS ==========
+_worker_generator = None
+
+def _init_worker():
+    """Runs once per worker process: load fonts and colours up front instead of on every report."""
+    global _worker_generator
+    _worker_generator = InfographicGenerator()
+
+def _render_in_worker(stock_name, data, fmt, sizes):
+    # The parent process owns the render cache, workers only draw and encode
+    return _worker_generator.render_set(stock_name, data, fmt, sizes, use_cache=False)
+
+# ========== POOL ==========
+class RenderPool:
+    """
+    Renders reports in separate processes so Pillow drawing / encoding (CPU bound, holds the GIL)
+    does not stall the asyncio loop or the threads fetching data.
+
+    At most max_pending renders are queued or running; callers beyond that wait up to `timeout`
+    seconds for a slot and then get RenderBusyError. workers=0 renders inline in the caller.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS, max_pending=RENDER_MAX_PENDING, timeout=RENDER_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inline = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the bot and gunicorn processes already run threads
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker)
+                logger.info(f"Render pool started with {self.workers} worker process(es)")
+            return self._executor
+
+    def _reset_executor(self, executor):
+        if executor is None:
+            return
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, stock_name, data, fmt=None, sizes=('full',)):
+        """Queue one render and return a concurrent.futures.Future of {size: EncodedImage}."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RenderBusyError(f"Render queue full, gave up on {stock_name} after {self.timeout}s")
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(_render_in_worker, stock_name, data, fmt or REPORT_IMAGE_FORMAT, sizes)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM killed): start a fresh pool and retry once
+                logger.warning("Render pool broken, restarting workers")
+                self._reset_executor(executor)
+                future = self._get_executor().submit(_render_in_worker, stock_name, data, fmt or REPORT_IMAGE_FORMAT,
+                                                     sizes)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _render_inline(self, stock_name, data, fmt, sizes):
+        if self._inline is None:
+            self._inline = InfographicGenerator()
+        return self._inline.render_set(stock_name, data, fmt, sizes, use_cache=False)
+
+    def _finish(self, stock_name, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # A running render cannot be interrupted; it finishes in the background and frees its slot then
+            future.cancel()
+            raise RenderTimeoutError(f"Rendering {stock_name} took longer than {self.timeout}s")
+        except BrokenProcessPool as e:
+            self._reset_executor(self._executor)
+            raise RenderError(f"Render worker crashed while rendering {stock_name}") from e
+
+    def render_set(self, stock_name, data, fmt=None, sizes=('full',)):
+        """
+        Blocking render of one or more sizes (web request threads): {size: EncodedImage}.
+        Cache hits never touch the pool; missing sizes come from a single render in a worker.
+        """
+        fmt = fmt or REPORT_IMAGE_FORMAT
+        cache = get_render_cache()
+        key = content_hash(stock_name, data, fmt, REPORT_WIDTH)
+        encoded = {size: cache.get(rendition_key(key, size)) for size in sizes}
+        missing = tuple(size for size, hit in encoded.items() if hit is None)
+        if not missing:
+            return encoded
+        if self.workers <= 0:
+            rendered = self._render_inline(stock_name, data, fmt, missing)
+        else:
+            rendered = self._finish(stock_name, self.submit(stock_name, data, fmt, missing))
+        for size, image in rendered.items():
+            cache.put(rendition_key(key, size), image)
+        encoded.update(rendered)
+        return encoded
+
+    def render(self, stock_name, data, fmt=None, size='full'):
+        """Blocking render of a single size. Returns an EncodedImage."""
+        return self.render_set(stock_name, data, fmt, (size,))[size]
+
+    async def render_async(self, stock_name, data, fmt=None, size='full'):
+        """Same as render() for the bot: waiting for a slot and for the worker happens off the event loop."""
+        return await asyncio.to_thread(self.render, stock_name, data, fmt, size)
+
+    async def render_set_async(self, stock_name, data, fmt=None, sizes=('full',)):
+        return await asyncio.to_thread(self.render_set, stock_name, data, fmt, sizes)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_render_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RenderPool()
+    return _pool
@@ -0,0 +1,93 @@
+import math
+from xml.sax.saxutils import escape, quoteattr
+
+def _num(value):
+    """Compact coordinate: integers without a decimal point, everything else to 2 places."""
+    value = round(float(value), 2)
+    return str(int(value)) if value == int(value) else f"{value:g}"
+
+def _paint(attr, color):
+    """SVG paint attributes for a Pillow colour, '#RRGGBBAA' becoming colour + opacity."""
+    if color is None:
+        return f' {attr}="none"'
+    if isinstance(color, str) and color.startswith('#') and len(color) == 9:
+        return f' {attr}="{color[:7]}" {attr}-opacity="{_num(int(color[7:], 16) / 255)}"'
+    return f' {attr}="{color}"'
+
+class SvgDraw:
+    """
+    Records the subset of the ImageDraw API the infographic uses (rectangles, rounded rectangles,
+    ellipses, arcs and text) as SVG elements, with Pillow's geometry: outlines are drawn inside
+    the box and text is positioned by the top of its ascender.
+    """
+
+    # Viewers can draw emoji and symbols themselves, so text is passed through unchanged
+    native_glyph_fallback = True
+
+    def __init__(self, width, height, background, font_family=None):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.font_family = font_family
+        self.elements = []
+
+    def _box(self, xy, width):
+        """Box inset by half the stroke, so the stroke stays inside xy like Pillow's outline."""
+        x0, y0, x1, y1 = xy
+        inset = width / 2 if width else 0
+        return x0 + inset, y0 + inset, x1 - inset, y1 - inset
+
+    def _stroke(self, outline, width):
+        if outline is None or not width:
+            return ''
+        return _paint('stroke', outline) + f' stroke-width="{_num(width)}"'
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        self.rounded_rectangle(xy, 0, fill, outline, width)
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = self._box(xy, width if outline else 0)
+        corner = f' rx="{_num(radius)}"' if radius else ''
+        self.elements.append(f'<rect x="{_num(x0)}" y="{_num(y0)}" width="{_num(x1 - x0)}" height="{_num(y1 - y0)}"'
+                             f'{corner}{_paint("fill", fill)}{self._stroke(outline, width)}/>')
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = self._box(xy, width if outline else 0)
+        self.elements.append(f'<ellipse cx="{_num((x0 + x1) / 2)}" cy="{_num((y0 + y1) / 2)}" '
+                             f'rx="{_num((x1 - x0) / 2)}" ry="{_num((y1 - y0) / 2)}"'
+                             f'{_paint("fill", fill)}{self._stroke(outline, width)}/>')
+
+    def arc(self, xy, start, end, fill=None, width=1):
+        """Arc from start to end degrees, clockwise from 3 o'clock (Pillow's convention)."""
+        x0, y0, x1, y1 = self._box(xy, width)
+        cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2, (y1 - y0) / 2
+        stroke = _paint('stroke', fill) + f' stroke-width="{_num(width)}" fill="none"'
+        if end - start >= 360:
+            self.elements.append(f'<ellipse cx="{_num(cx)}" cy="{_num(cy)}" rx="{_num(rx)}" ry="{_num(ry)}"{stroke}/>')
+            return
+        a0, a1 = math.radians(start), math.radians(end)
+        large = 1 if end - start > 180 else 0
+        self.elements.append(f'<path d="M{_num(cx + rx * math.cos(a0))} {_num(cy + ry * math.sin(a0))} '
+                             f'A{_num(rx)} {_num(ry)} 0 {large} 1 {_num(cx + rx * math.cos(a1))} '
+                             f'{_num(cy + ry * math.sin(a1))}"{stroke}/>')
+
+    def text(self, xy, text, font=None, fill=None, spacing=4):
+        x, y = xy
+        size = getattr(font, 'size', 10)
+        ascent = font.getmetrics()[0] if hasattr(font, 'getmetrics') else size
+        line_h = font.getbbox("A")[3] + spacing if hasattr(font, 'getbbox') else size + spacing
+        for i, line in enumerate(text.split("\n")):
+            if line:
+                self.elements.append(f'<text x="{_num(x)}" y="{_num(y + ascent + i * line_h)}" font-size="{size}"'
+                                     f'{_paint("fill", fill)}>{escape(line)}</text>')
+
+    def textlength(self, text, font=None):
+        return font.getlength(text)
+
+    def tostring(self):
+        family = ', '.join(f"'{f}'" for f in [self.font_family] if f) + (', ' if self.font_family else '')
+        style = f"text{{font-family:{family}Arial, sans-serif;white-space:pre}}"
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+                f'viewBox="0 0 {self.width} {self.height}"><style>{escape(style)}</style>'
+                f'<rect width="100%" height="100%" fill={quoteattr(self.background)}/>'
+                + ''.join(self.elements) + '</svg>')
@@ -0,0 +1,95 @@
+import html
+import re
+
+# Telegram rejects messages longer than this (characters after entity parsing)
+MAX_MESSAGE_LENGTH = 4096
+
+TEXT_FORMATS = ['html', 'markdown']
+
+_MD_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+
+def escape_markdown(text):
+    """Escape text for Telegram MarkdownV2."""
+    return _MD_SPECIAL.sub(r'\\\1', str(text))
+
+class _Html:
+    parse_mode = 'HTML'
+    escape = staticmethod(lambda text: html.escape(str(text), quote=False))
+    bold = staticmethod(lambda text: f"<b>{text}</b>")
+    italic = staticmethod(lambda text: f"<i>{text}</i>")
+    pre = staticmethod(lambda text: f"<pre>{html.escape(text, quote=False)}</pre>")
+
+class _Markdown:
+    parse_mode = 'MarkdownV2'
+    escape = staticmethod(escape_markdown)
+    bold = staticmethod(lambda text: f"*{text}*")
+    italic = staticmethod(lambda text: f"_{text}_")
+    # Inside pre blocks only ` and \ need escaping
+    pre = staticmethod(lambda text: "```\n" + text.replace('\\', '\\\\').replace('`', '\\`') + "\n```")
+
+_STYLES = {'html': _Html, 'markdown': _Markdown}
+
+def _bar(value, max_value, width=10):
+    filled = round(width * min(max(value / max_value, 0), 1)) if max_value else 0
+    return "█" * filled + "░" * (width - filled)
+
+def _top_reasons(details, limit=3):
+    """Strongest and weakest scored parameters as (name, value, status)."""
+    scored = [(name, d) for name, d in (details or {}).items() if isinstance(d, dict) and 'score' in d]
+    strengths = [(n, d.get('value'), d.get('status', '')) for n, d in scored if d['score'] >= 1][:limit]
+    weaknesses = [(n, d.get('value'), d.get('status', '')) for n, d in scored if d['score'] <= 0][:limit]
+    return strengths, weaknesses
+
+def render_text(symbol, result, fmt='html'):
+    """
+    Compact text report (Telegram HTML or MarkdownV2) built straight from an analysis result:
+    score table, verdicts and top reasons. Returns (text, parse_mode).
+    """
+    if fmt not in _STYLES:
+        raise ValueError(f"Unknown text format '{fmt}'. Use one of: {', '.join(TEXT_FORMATS)}")
+    s = _STYLES[fmt]
+    e = s.escape
+
+    total = result.get('total_score', 0)
+    fund, tech, news = (result.get('fundamental_score', 0), result.get('technical_score', 0),
+                        result.get('news_score', 0))
+    lines = [s.bold(e(f"📊 {symbol}")) + e(f" · ₹{result.get('cmp') or 0:.2f}")]
+    if result.get('stale'):
+        lines.append(s.italic(e(f"⚠️ Live data unavailable, snapshot from {result.get('captured_at', '')[:16]} UTC")))
+    lines.append(e(f"Risk: {result.get('health_label', 'N/A')}"))
+
+    table = "\n".join([
+        f"Total        {total:5.1f}/37 {_bar(total, 37)}",
+        f"Fundamental  {fund:5.1f}/24 {_bar(fund, 24)}",
+        f"Technical    {tech:5.1f}/5  {_bar(tech, 5)}",
+        f"News         {news:5.1f}/8  {_bar(news, 8)}",
+    ])
+    lines.append(s.pre(table))
+
+    swing = [s.bold(e(f"⚡ Swing: {result.get('swing_verdict', 'N/A')}"))]
+    if result.get('swing_reason'):
+        swing.append(e(result['swing_reason']))
+    if result.get('swing_action'):
+        swing.append(e(f"💡 {result['swing_action']}"))
+    lines.append("\n".join(swing))
+    long_term = [s.bold(e(f"📅 Long Term: {result.get('long_term_verdict', 'N/A')}"))]
+    if result.get('long_term_reason'):
+        long_term.append(e(result['long_term_reason']))
+    lines.append("\n".join(long_term))
+
+    strengths, weaknesses = _top_reasons(result.get('details'))
+    if strengths:
+        lines.append(s.bold(e("✅ Strengths")) + "\n" + "\n".join(e(f"• {n}: {v} ({st})") for n, v, st in strengths))
+    if weaknesses:
+        lines.append(s.bold(e("⚠️ Weaknesses")) + "\n" + "\n".join(e(f"• {n}: {v} ({st})") for n, v, st in weaknesses))
+
+    if result.get('final_action'):
+        lines.append(s.bold(e("🎯 Action:")) + " " + e(result['final_action']))
+
+    text = "\n\n".join(lines)
+    if len(text) > MAX_MESSAGE_LENGTH:
+        # Drop whole sections from the end rather than cutting through an entity
+        while len(lines) > 1 and len("\n\n".join(lines)) > MAX_MESSAGE_LENGTH - 20:
+            lines.pop()
+        text = "\n\n".join(lines + [e("…")])
+    return text, s.parse_mode
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, Response, stream_with_context
 import logging
 import sys
 import os
@@ -6,21 +6,26 @@ import os
 # Ensure src is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.fetchers.fundamentals import FundamentalFetcher
-from src.fetchers.technicals import TechnicalFetcher
-from src.fetchers.news import NewsFetcher
-from src.analysis.engine import AnalysisEngine
+from src.pipeline import analyze_symbol
+from src.analysis.screener import run_screen, ScreenError
+from src.exporter import stream_export, ExportError, EXPORT_FORMATS
+from datetime import date
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from src.renderer.generator import InfographicGenerator
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID
-import requests
+from src.renderer.pool import get_render_pool, RenderBusyError, RenderTimeoutError
+from src.renderer.generator import InfographicGenerator, RENDITIONS
+from src.renderer.encoders import ENCODINGS, encoding_for_extension
+from src.config import TELEGRAM_CHANNEL_ID, SNAPSHOT_MAX_AGE, REPORT_IMAGE_FORMAT, BOT_MODE, WEBHOOK_SECRET
+from src.bot.photos import send_report_photo
 import json
 
+from src.bot.webhook import get_webhook_bot, WebhookError, WEBHOOK_PATH, SECRET_HEADER
+from src.bot.scheduler import get_scheduler
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -33,25 +38,12 @@ def analyze():
     
     logger.info(f"Analyzing {symbol} via Web App...")
     
-    # 1. Fetch
-    ff = FundamentalFetcher()
-    fund_data = ff.get_data(symbol)
-    
-    tf = TechnicalFetcher()
-    tech_data = tf.get_data(symbol)
-    
-    nf = NewsFetcher()
-    news_data = nf.fetch_latest_news(symbol)
+    # 1. Fetch + Analyze (snapshot is persisted for history and re-use)
+    result = analyze_symbol(symbol, comprehensive_news=False)
     
-    if not fund_data and not tech_data:
+    if not result:
         return render_template('index.html', error=f"Could not fetch data for {symbol}. Try another.")
     
-    # 2. Analyze
-    engine = AnalysisEngine()
-    result = engine.evaluate_stock(fund_data, tech_data, news_data)
-    result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-    result['symbol'] = symbol
-    
     # Map for Template
     # We need to construct the 'sections' and 'summary' objects the template expects
     # For now, pass 'result' and 'details' and handle logic in Jinja or pre-process here.
@@ -66,35 +58,15 @@ def share_telegram():
     if not symbol:
         return {"status": "error", "message": "No symbol provided"}
     
-    # Re-run analysis to get fresh data for the image
-    # (In a prod app, we might cache this)
+    # Re-use the snapshot stored by /analyze when it is recent, otherwise re-run the analysis
     try:
-        ff = FundamentalFetcher()
-        fund_data = ff.get_data(symbol)
-        tf = TechnicalFetcher()
-        tech_data = tf.get_data(symbol)
-        nf = NewsFetcher()
-        news_data = nf.fetch_latest_news(symbol)
-        
-        engine = AnalysisEngine()
-        result = engine.evaluate_stock(fund_data, tech_data, news_data)
-        result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-        
-        # Generate Image
-        gen = InfographicGenerator()
-        filename = f"{symbol}_telegram.png"
-        gen.generate_report(symbol, result, filename)
+        result = analyze_symbol(symbol, comprehensive_news=False, max_age=SNAPSHOT_MAX_AGE)
+        if not result:
+            return {"status": "error", "message": f"Could not fetch data for {symbol}"}
         
-        # Send via Telegram API (Sync)
+        # Send via Telegram API (Sync): rendered in a worker process, or by file_id if already uploaded
         caption = f"📊 *Stock Analysis: {symbol}*\nscore: {result['total_score']:.1f}/37\nVerdict: {result.get('health_label')}"
-        
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-        with open(filename, 'rb') as f:
-            resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'}, files={'photo': f})
-        
-        # Cleanup
-        if os.path.exists(filename):
-            os.remove(filename)
+        resp = send_report_photo(TELEGRAM_CHANNEL_ID, symbol, result, caption=caption)
             
         if resp.status_code == 200:
             return {"status": "success", "message": "Sent to Telegram!"}
@@ -106,6 +78,126 @@ def share_telegram():
         logger.error(f"Share Error: {e}")
         return {"status": "error", "message": str(e)}
 
+@app.route('/report/<symbol>.<ext>', methods=['GET'])
+def report_image(symbol, ext):
+    """
+    The infographic for a symbol, rendered in memory (stored snapshot re-used when recent).
+    /report/TCS.png|webp|jpg, optionally ?format=<encoding> (see src/renderer/encoders.py)
+    and ?size=full|medium|thumb (each size is cached under the report's content hash).
+    /report/TCS.svg is the vector version: same layout, no rasterising or encoding.
+    """
+    symbol = symbol.upper().strip()
+    if ext.lower() == 'svg':
+        result = analyze_symbol(symbol, comprehensive_news=False, max_age=SNAPSHOT_MAX_AGE)
+        if not result:
+            return {"status": "error", "message": f"Could not fetch data for {symbol}"}, 404
+        return Response(InfographicGenerator().render_svg(symbol, result), mimetype='image/svg+xml',
+                        headers={'Content-Disposition': f'inline; filename={symbol}.svg'})
+    fmt = request.args.get('format') or encoding_for_extension(ext.lower(), REPORT_IMAGE_FORMAT)
+    if fmt not in ENCODINGS and fmt != 'auto':
+        return {"status": "error", "message": f"Unsupported image type '{ext}'"}, 400
+    size = request.args.get('size', 'full')
+    if size not in RENDITIONS:
+        return {"status": "error", "message": f"Unknown size '{size}'. Use one of: {', '.join(RENDITIONS)}"}, 400
+    
+    result = analyze_symbol(symbol, comprehensive_news=False, max_age=SNAPSHOT_MAX_AGE)
+    if not result:
+        return {"status": "error", "message": f"Could not fetch data for {symbol}"}, 404
+    
+    try:
+        # Full-size requests (Telegram, downloads) encode only the full image. A medium or thumb request
+        # encodes both small sizes from one render: they cost a fraction of the full encode, and galleries
+        # usually ask for both
+        sizes = (size,) if size == 'full' else tuple(s for s in RENDITIONS if s != 'full')
+        photo = get_render_pool().render_set(symbol, result, fmt, sizes)[size]
+    except RenderBusyError as e:
+        return {"status": "error", "message": str(e)}, 503
+    except RenderTimeoutError as e:
+        return {"status": "error", "message": str(e)}, 504
+    filename = f"{symbol}.{photo.ext}" if size == 'full' else f"{symbol}_{size}.{photo.ext}"
+    return Response(photo.data, mimetype=photo.mimetype,
+                    headers={'Content-Disposition': f'inline; filename={filename}'})
+
+@app.route('/api/screen', methods=['GET'])
+def screen():
+    """
+    Screen the latest stored snapshots:
+    /api/screen?q=ROCE > 20 and Stock P/E < 15&sort=total_score&order=desc&page=1&per_page=25
+    """
+    expression = request.args.get('q', '').strip()
+    if not expression:
+        return {"status": "error", "message": "No screen expression provided (q=...)"}, 400
+    
+    try:
+        result = run_screen(
+            expression,
+            sort=request.args.get('sort', 'total_score'),
+            descending=request.args.get('order', 'desc').lower() != 'asc',
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 25, type=int)
+        )
+    except ScreenError as e:
+        return {"status": "error", "message": str(e)}, 400
+    
+    result['status'] = "success"
+    return result
+
+@app.route('/api/export', methods=['GET'])
+def export():
+    """
+    Stream stored evaluations: /api/export?format=parquet|arrow|csv|ndjson&history=1&since=YYYY-MM-DD&symbols=TCS,INFY
+    Default is the latest snapshot per stock as CSV.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    symbols = request.args.get('symbols')
+    try:
+        since = date.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = date.fromisoformat(request.args['until']) if request.args.get('until') else None
+        chunks = stream_export(
+            fmt,
+            latest_only=request.args.get('history', '0') not in ('1', 'true', 'yes'),
+            since=since,
+            until=until,
+            symbols=[s.strip() for s in symbols.split(',')] if symbols else None
+        )
+    except (ExportError, ValueError) as e:
+        return {"status": "error", "message": str(e)}, 400
+    
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=evaluations.{ext}'})
+
+@app.route(WEBHOOK_PATH, methods=['POST'])
+def telegram_webhook():
+    """
+    Telegram updates in webhook mode, handed to the bot's event loop (answered once queued).
+    The first update starts the bot in this worker; the webhook is registered by start.sh.
+    """
+    if BOT_MODE != 'webhook':
+        return {"status": "error", "message": "Webhook mode is disabled (BOT_MODE=polling)"}, 404
+    if request.headers.get(SECRET_HEADER) != WEBHOOK_SECRET:
+        return {"status": "error", "message": "Invalid secret token"}, 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'update_id' not in data:
+        return {"status": "error", "message": "Body must be a Telegram update"}, 400
+    try:
+        get_webhook_bot().process(data)
+    except WebhookError as e:
+        # Telegram retries the update later
+        logger.error(str(e))
+        return {"status": "error", "message": "Bot is not available"}, 503
+    return {"status": "ok"}
+
+@app.route('/bot/metrics', methods=['GET'])
+def bot_metrics():
+    """
+    Bot analysis queue metrics (webhook mode only: in polling mode the bot runs in another process).
+    Each gunicorn worker has its own scheduler, so these are the answering worker's (see pid).
+    """
+    if BOT_MODE != 'webhook':
+        return {"status": "error", "message": "The bot runs in a separate process (BOT_MODE=polling), use /stats"}, 404
+    return {"status": "success", "pid": os.getpid(), "metrics": get_scheduler().metrics()}
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     # Host must be 0.0.0.0 to be accessible outside container
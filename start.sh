@@ -1,6 +1,13 @@
 #!/bin/bash
-# Start the Telegram Bot in the background
-python -m src.bot.telegram_bot &
+# Start the Telegram Bot in the background (polling mode; with BOT_MODE=webhook the web app
+# receives the updates itself, see src/bot/webhook.py)
+if [ "${BOT_MODE:-polling}" != "webhook" ]; then
+    python -m src.bot.telegram_bot &
+else
+    # Register the webhook once per deploy (not in every gunicorn worker). If Telegram is unreachable
+    # the web app still starts; the registration from the previous deploy normally still applies.
+    python -m src.bot.webhook register || echo "Webhook registration failed, continuing"
+fi
 
 # Start the Flask Web App (Foreground)
 # Gunicorn will bind to $PORT provided by Render
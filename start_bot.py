@@ -19,7 +19,6 @@ logger = logging.getLogger(__name__)
 
 try:
     from src.bot.telegram_bot import *
-    from telegram.ext import ApplicationBuilder
     
     logger.info("="*80)
     logger.info("Starting Telegram Bot...")
@@ -28,20 +27,12 @@ try:
     if not TELEGRAM_BOT_TOKEN:
         logger.error("ERROR: TELEGRAM_BOT_TOKEN not found in config/env.")
         sys.exit(1)
+    if BOT_MODE == 'webhook':
+        # run_polling() would delete the registered webhook and silently stop webhook delivery
+        logger.error("BOT_MODE=webhook: updates are received by the web app (gunicorn src.web.app:app), not polled.")
+        sys.exit(1)
     
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
-    
-    start_handler = CommandHandler('start', start)
-    analyze_handler = CommandHandler('analyze', analyze_command)
-    stock_handler = CommandHandler('stock', analyze_command)
-    
-    # Text handler for direct symbols
-    text_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
-    
-    application.add_handler(start_handler)
-    application.add_handler(analyze_handler)
-    application.add_handler(stock_handler)
-    application.add_handler(text_handler)
+    application = build_application()
     
     logger.info("Bot is polling... Press Ctrl+C to stop")
     logger.info("Check bot.log for detailed logs")
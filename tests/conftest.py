@@ -0,0 +1,48 @@
+import pytest
+import src.database as db
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """src.database on an empty SQLite file; daily maintenance is skipped."""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'stocks.db'))
+    monkeypatch.setattr(db, '_engine', None)
+    monkeypatch.setattr(db, '_schema_ready', False)
+    monkeypatch.setattr(db, '_maybe_maintain', lambda: None)
+    yield db
+    if db._engine is not None:
+        db._engine.dispose()
+
+@pytest.fixture
+def live_result():
+    """Shaped like evaluate_stock(): int scores, a numeric cmp and news items in the payload."""
+    return {
+        'total_score': 24, 'fundamental_score': 15, 'technical_score': 6, 'news_score': 3,
+        'health_label': 'Moderate', 'cmp': 3512.4, 'swing_verdict': 'WAIT', 'long_term_verdict': 'BUY',
+        'fundamental_summary': 'Strong return ratios', 'retail_conclusion': 'Accumulate on dips',
+        'details': {
+            'ROCE': {'value': '45.2%', 'score': 1, 'status': 'Positive'},
+            'P/E Ratio': {'value': '28.1 (Ind: 30.0)', 'score': 0, 'status': 'Neutral'},
+            'RSI': {'value': '61.4', 'score': 0.5, 'status': 'Neutral'},
+        },
+        'news_items': [{'title': 'Order win', 'source': 'ET', 'category': 'Orders', 'sentiment': 'Positive'}],
+    }
+
+SYMBOL_LIST = """SYMBOL,NAME OF COMPANY, SERIES, DATE OF LISTING, PAID UP VALUE, MARKET LOT, ISIN NUMBER, FACE VALUE
+RELIANCE,Reliance Industries Limited,EQ,29-NOV-1995,10,1,INE002A01018,10
+TATAMOTORS,Tata Motors Limited,EQ,22-JUL-1998,2,1,INE155A01022,2
+TATASTEEL,Tata Steel Limited,EQ,08-NOV-1995,1,1,INE081A01020,1
+TCS,Tata Consultancy Services Limited,EQ,25-AUG-2004,1,1,INE467B01029,1
+INFY,Infosys Limited,EQ,08-FEB-1995,5,1,INE009A01021,5
+HDFCBANK,HDFC Bank Limited,EQ,08-NOV-1995,1,1,INE040A01034,1
+LT,Larsen & Toubro Limited,EQ,23-JUN-2004,2,1,INE018A01030,2
+"""
+
+@pytest.fixture
+def symbol_master(tmp_path):
+    """A SymbolMaster over a small local NSE list (fresh, so no download is started)."""
+    from src.fetchers.symbols import SymbolMaster, NSE_FILE
+    (tmp_path / NSE_FILE).write_text(SYMBOL_LIST)
+    master = SymbolMaster(directory=str(tmp_path), refresh_hours=24)
+    master.load()
+    master._checked_at = float('inf')
+    return master
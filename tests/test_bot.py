@@ -0,0 +1,50 @@
+import pytest
+from src.bot import telegram_bot
+from src.bot.telegram_bot import parse_symbols
+
+@pytest.fixture(autouse=True)
+def _master(symbol_master, monkeypatch):
+    monkeypatch.setattr(telegram_bot, 'get_symbol_master', lambda: symbol_master)
+
+@pytest.mark.parametrize('text', ['TATA MOTORS', 'HDFC BANK', 'Tata Steel', 'LARSEN & TOUBRO', 'TCS', 'RELIANCE'])
+def test_company_names_are_not_ticker_lists(text):
+    assert parse_symbols(text) == []
+
+def test_space_separated_known_tickers():
+    assert parse_symbols('TCS INFY') == ['TCS', 'INFY']
+    assert parse_symbols('tcs infosys hdfcbank') == ['TCS', 'INFY', 'HDFCBANK']
+
+def test_space_separated_unknown_word_is_not_a_list():
+    assert parse_symbols('TCS FOOBAR') == []
+
+def test_comma_separated_lists():
+    assert parse_symbols('TCS, INFY, FOOBAR') == ['TCS', 'INFY', 'FOOBAR']
+    assert parse_symbols('Tata Motors, L&T, 500325') == ['TATAMOTORS', 'LT', '500325']
+    assert parse_symbols('TCS, tcs') == []  # one stock
+    assert parse_symbols('TCS, what is this?') == []
+
+def _quick(args, monkeypatch):
+    """Run /quick with args; returns the (symbol, with_image) analyses and the messages sent."""
+    import asyncio
+    from types import SimpleNamespace
+    calls, messages = [], []
+
+    async def analyze_stock(update, context, symbol, with_image=True):
+        calls.append((symbol, with_image))
+
+    async def send_message(chat_id, text, **kwargs):
+        messages.append(text)
+
+    monkeypatch.setattr(telegram_bot, 'analyze_stock', analyze_stock)
+    context = SimpleNamespace(args=args, bot=SimpleNamespace(send_message=send_message))
+    asyncio.run(telegram_bot.quick_command(SimpleNamespace(effective_chat=SimpleNamespace(id=1)), context))
+    return calls, messages
+
+@pytest.mark.parametrize('args, symbol', [(['tata', 'motors'], 'TATAMOTORS'), (['RIL'], 'RELIANCE'), (['infy'], 'INFY')])
+def test_quick_resolves_names_and_aliases(args, symbol, monkeypatch):
+    assert _quick(args, monkeypatch) == ([(symbol, False)], [])
+
+def test_quick_suggests_other_matches(monkeypatch):
+    calls, messages = _quick(['tata'], monkeypatch)
+    assert calls == [('TATASTEEL', False)]
+    assert 'Other possibilities' in messages[0] and '`TCS`' in messages[0]
@@ -0,0 +1,18 @@
+from src.renderer.cache import content_hash
+from src.renderer.generator import report_key
+
+def test_hash_ignores_int_float_and_numpy_differences(live_result):
+    import numpy as np
+    live = live_result
+    loaded = {**live, 'total_score': 24.0, 'cmp': np.float64(3512.4),
+              'details': {k: {**v, 'score': float(v['score'])} for k, v in live['details'].items()}}
+    loaded['details']['ROCE']['score'] = np.int64(1)
+    assert content_hash('TCS', live, 'png', 1400) == content_hash('TCS', loaded, 'png', 1400)
+    assert content_hash('TCS', live, 'png', 1400) != content_hash('TCS', {**live, 'total_score': 25}, 'png', 1400)
+
+def test_report_key_survives_a_database_round_trip(temp_db, live_result):
+    temp_db.save_evaluations([('TCS', live_result)])
+    stored = temp_db.load_latest_evaluation('TCS')
+    assert stored['details']['ROCE']['score'] == 1.0
+    assert report_key('TCS', stored) == report_key('TCS', live_result)
+    assert report_key('TCS', stored, size='thumb') == report_key('TCS', live_result, size='thumb')
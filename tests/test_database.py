@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+def _result(total, roce='20%'):
+    return {'total_score': total, 'fundamental_score': total, 'technical_score': 0, 'news_score': 0,
+            'health_label': 'Moderate', 'cmp': 100, 'details': {'ROCE': {'value': roce, 'score': 1, 'status': 'Positive'}}}
+
+def test_score_movers_orders_by_captured_at(temp_db):
+    now = datetime.utcnow()
+    # Today's evaluation is saved first, an older one is backfilled afterwards (higher id)
+    temp_db.save_evaluations([('TCS', _result(30))], captured_at=now)
+    temp_db.save_evaluations([('TCS', _result(20))], captured_at=now - timedelta(days=2))
+
+    movers = temp_db.score_movers(min_change=5, days=7)
+    assert [(m['symbol'], m['from_score'], m['to_score'], m['change']) for m in movers] == [('TCS', 20, 30, 10)]
+    assert temp_db.score_movers(min_change=-5, days=7) == []
+
+def test_load_latest_evaluation_ignores_backfill(temp_db):
+    now = datetime.utcnow()
+    temp_db.save_evaluations([('TCS', _result(30))], captured_at=now)
+    temp_db.save_evaluations([('TCS', _result(20))], captured_at=now - timedelta(hours=3))
+    assert temp_db.load_latest_evaluation('TCS')['total_score'] == 30
+
+def test_compaction_keeps_last_evaluation_of_the_day(temp_db):
+    day = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=30)
+    temp_db.save_evaluations([('TCS', _result(25, '25%'))], captured_at=day + timedelta(hours=4))
+    temp_db.save_evaluations([('TCS', _result(15, '15%'))], captured_at=day)  # backfilled, earlier in the day
+
+    assert temp_db.compact_snapshots(intraday_days=7) == 2  # one Score row + one ROCE row
+    history = temp_db.param_history('TCS', 'ROCE', days=60)
+    assert [h['value'] for h in history] == [25]
+    assert temp_db.load_latest_evaluation('TCS')['total_score'] == 25
@@ -0,0 +1,32 @@
+import re
+from types import SimpleNamespace
+import manual_telegram_push
+from src.renderer.digest import DigestRenderer
+from src.renderer.encoders import EncodedImage
+
+def test_rank_offset_numbers_cards_after_earlier_sheets():
+    renderer = DigestRenderer()
+    drawn, text = [], renderer.gen.text
+
+    def spy(draw, xy, value, **kwargs):
+        if re.fullmatch(r'#\d+', value):
+            drawn.append(value)
+        return text(draw, xy, value, **kwargs)
+
+    renderer.gen.text = spy
+    renderer.render_image([('TCS', {'total_score': 20}), ('INFY', {'total_score': 18})], rank_offset=60)
+    assert drawn == ['#61', '#62']
+
+def test_digest_is_ranked_once_across_sheets(monkeypatch):
+    results = [(f"S{i}", {'total_score': i}) for i in range(7)]
+    sheets, captions = [], []
+    monkeypatch.setattr(manual_telegram_push, 'analyze_watchlist', lambda symbols, max_age=None: results)
+    monkeypatch.setattr(manual_telegram_push, 'DIGEST_MAX_CARDS', 3)
+    monkeypatch.setattr(DigestRenderer, 'render_encoded', lambda self, sheet, rank_offset=0: (
+        sheets.append(([s for s, _ in sheet], rank_offset)), EncodedImage(b'', 'png', 'image/png', 'png'))[1])
+    monkeypatch.setattr(manual_telegram_push.requests, 'post', lambda url, data=None, files=None: (
+        captions.append(data['caption']), SimpleNamespace(status_code=200, text=''))[1])
+
+    manual_telegram_push.send_digest(['S0'])
+    assert sheets == [(['S6', 'S5', 'S4'], 0), (['S3', 'S2', 'S1'], 3), (['S0'], 6)]
+    assert captions[0].startswith("📊 *Daily Digest* — 7 stocks") and captions[1:] == [None, None]
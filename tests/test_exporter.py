@@ -0,0 +1,62 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from src import exporter
+from src.exporter import ExportError, export_to_file, stream_export
+
+def _result(total):
+    return {'total_score': total, 'fundamental_score': total, 'technical_score': 0, 'news_score': 0,
+            'health_label': 'Moderate', 'cmp': 100, 'details': {}}
+
+def _export(**kwargs):
+    data = b"".join(stream_export('ndjson', **kwargs)).decode('utf-8')
+    return [json.loads(line) for line in data.splitlines()]
+
+def test_latest_only_export_ignores_backfill(temp_db):
+    now = datetime.utcnow()
+    temp_db.save_evaluations([('TCS', _result(30))], captured_at=now)
+    temp_db.save_evaluations([('TCS', _result(20))], captured_at=now - timedelta(days=1))
+
+    assert [(row['symbol'], row['total_score']) for row in _export()] == [('TCS', 30)]
+    assert len(_export(latest_only=False)) == 2
+
+def test_export_chunks_cover_every_snapshot(temp_db):
+    now = datetime.utcnow()
+    for i in range(5):
+        temp_db.save_evaluations([(f"S{i}", _result(i))], captured_at=now)
+    assert sorted(row['symbol'] for row in _export(chunk_size=2)) == ['S0', 'S1', 'S2', 'S3', 'S4']
+
+def test_rejected_format_creates_no_file(tmp_path, monkeypatch):
+    with pytest.raises(ExportError):
+        export_to_file(tmp_path / 'out.xlsx', 'xlsx')
+    monkeypatch.setattr(exporter, 'pa', None)
+    with pytest.raises(ExportError):
+        export_to_file(tmp_path / 'out.parquet', 'parquet')
+    assert list(tmp_path.iterdir()) == []
+
+def test_failed_export_removes_partial_file(temp_db, tmp_path, monkeypatch):
+    temp_db.save_evaluations([('TCS', _result(30))])
+
+    def chunks(**kwargs):
+        yield from temp_db.iter_snapshot_chunks(**kwargs)
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(exporter, 'iter_snapshot_chunks', chunks)
+    with pytest.raises(RuntimeError):
+        export_to_file(tmp_path / 'out.csv', 'csv')
+    assert not (tmp_path / 'out.csv').exists()
+
+def test_latest_only_ranks_snapshots_once(temp_db):
+    from sqlalchemy import event
+    now = datetime.utcnow()
+    for i in range(5):
+        temp_db.save_evaluations([(f"S{i}", _result(i))], captured_at=now - timedelta(days=1))
+        temp_db.save_evaluations([(f"S{i}", _result(i + 10))], captured_at=now)
+
+    statements = []
+    event.listen(temp_db.get_engine(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    assert [row['total_score'] for row in _export(chunk_size=2)] == [10, 11, 12, 13, 14]
+    assert sum('row_number' in s for s in statements) == 1
+    # Batches whose latest snapshots are all filtered out do not end the export early
+    assert [row['symbol'] for row in _export(chunk_size=1, symbols=['S3'])] == ['S3']
@@ -0,0 +1,24 @@
+from src.analysis.engine import ALL_PARAMS
+from src.renderer import generator
+from src.renderer.generator import InfographicGenerator
+
+def _result(words):
+    text = " ".join(["steady margins and a healthy order book"] * words)
+    return {'cmp': 100, 'total_score': 20, 'fundamental_score': 12, 'technical_score': 3, 'news_score': 5,
+            'health_label': 'Moderate', 'fundamental_summary': text, 'swing_reason': text,
+            'retail_conclusion': text, 'swing_verdict': 'WAIT', 'long_term_verdict': 'HOLD',
+            'details': {p: {'value': '10', 'score': 1, 'status': 'Positive'} for p in ALL_PARAMS},
+            'news_items': [{'title': 'Headline', 'sentiment': 'Positive'}] * words}
+
+def test_static_layer_is_shared_by_reports_of_any_length():
+    gen = InfographicGenerator()
+    short, long = gen.compute_layout(_result(1)), gen.compute_layout(_result(8))
+    assert long['height'] > short['height']
+    assert short['key'] == long['key']
+
+def test_cached_static_layer_renders_the_same_image():
+    gen = InfographicGenerator()
+    generator.clear_template_cache()
+    cold = gen.render_image('TCS', _result(3))
+    warm = gen.render_image('TCS', _result(3))
+    assert cold.size == warm.size and cold.tobytes() == warm.tobytes()
@@ -0,0 +1,23 @@
+import asyncio
+from types import SimpleNamespace
+from src.bot import inline
+from src.renderer.generator import report_key
+
+class _Query:
+    def __init__(self, text):
+        self.query = text
+        self.from_user = SimpleNamespace(id=1)
+        self.answers = []
+
+    async def answer(self, results, cache_time=None):
+        self.answers.append([r.id for r in results])
+
+def test_stored_snapshot_offers_the_uploaded_photo(temp_db, live_result, symbol_master, monkeypatch):
+    monkeypatch.setattr(inline, 'get_symbol_master', lambda: symbol_master)
+    # Uploads are keyed by the live result; inline queries look them up with the stored snapshot
+    temp_db.save_evaluations([('TCS', live_result)])
+    temp_db.save_telegram_file_id(report_key('TCS', live_result), 'AgAD-1')
+
+    query = _Query('tcs')
+    asyncio.run(inline.inline_query(SimpleNamespace(inline_query=query), SimpleNamespace(application=None)))
+    assert query.answers == [['TCS-photo', 'TCS-text']]
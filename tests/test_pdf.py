@@ -0,0 +1,97 @@
+import io
+import re
+import zlib
+import pytest
+from PIL import Image
+from src.renderer import pdf
+from src.renderer.encoders import encode_image
+from src.renderer.pdf import StreamingPdfWriter, PdfError, png_image_object, export_watchlist_pdf
+from src.renderer.pool import RenderBusyError
+
+def _page(color, size=(40, 30), fmt='png-palette'):
+    return encode_image(Image.new('RGB', size, color=color), fmt).data
+
+def test_xref_offsets_point_at_objects():
+    buf = io.BytesIO()
+    writer = StreamingPdfWriter(buf)
+    writer.add_png_page(_page('red'))
+    writer.add_png_page(_page('blue', fmt='png'))
+    writer.close()
+    data = buf.getvalue()
+    assert data.startswith(b'%PDF-1.7') and data.endswith(b'%%EOF\n')
+
+    xref_pos = int(re.search(rb'startxref\n(\d+)\n', data).group(1))
+    assert data[xref_pos:].startswith(b'xref\n')
+    entries = re.findall(rb'(\d{10}) 00000 n ', data[xref_pos:])
+    assert len(entries) == writer.next_ref - 1
+    for ref, offset in enumerate(entries, start=1):
+        assert data[int(offset):].startswith(f"{ref} 0 obj\n".encode())
+
+def test_first_pages_go_in_front():
+    buf = io.BytesIO()
+    writer = StreamingPdfWriter(buf)
+    reports = [writer.add_png_page(_page(c)) for c in ('red', 'green')]
+    index = writer.add_png_page(_page('white'), links=[(0, 0, 40, 10, reports[1])])
+    writer.close(first_pages=[index])
+    data = buf.getvalue()
+
+    kids = re.search(rb'/Kids \[([^\]]*)\] /Count 3', data).group(1).decode()
+    assert kids == " ".join(f"{ref} 0 R" for ref in [index] + reports)
+    assert f"/Dest [{reports[1]} 0 R /Fit]".encode() in data
+
+def test_image_stream_is_png_data():
+    png = _page('red', size=(7, 3), fmt='png')
+    head, stream, width, height = png_image_object(png)
+    assert (width, height) == (7, 3)
+    assert '/DeviceRGB' in head and f'/Length {len(stream)}' in head
+    # One filter byte plus 3 bytes per pixel on every row
+    assert len(zlib.decompress(stream)) == height * (1 + width * 3)
+
+def test_palette_image_is_indexed():
+    head, _, _, _ = png_image_object(_page('red'))
+    assert '/Indexed /DeviceRGB' in head
+
+@pytest.mark.parametrize('data', [
+    _page('red', fmt='jpeg'),
+    encode_image(Image.new('RGBA', (4, 4)), 'png').data,
+])
+def test_unsupported_images(data):
+    with pytest.raises(PdfError):
+        png_image_object(data)
+
+class _Pool:
+    def __init__(self, fail=()):
+        self.fail = fail
+
+    def render(self, symbol, result, fmt):
+        if symbol in self.fail:
+            raise RenderBusyError("All render slots busy")
+        return encode_image(Image.new('RGB', (40, 30), color='red'), fmt)
+
+def _watchlist(monkeypatch, items, pool):
+    monkeypatch.setattr(pdf, 'iter_watchlist', lambda symbols, **kwargs: iter(items))
+    monkeypatch.setattr(pdf, 'get_render_pool', lambda: pool)
+
+def _page_count(data):
+    assert data.endswith(b'%%EOF\n')
+    return int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', data).group(1))
+
+def test_failed_render_is_skipped(monkeypatch):
+    items = [(s, {'total_score': t}) for s, t in (('TCS', 30), ('INFY', 25), ('SBIN', 20))]
+    _watchlist(monkeypatch, items, _Pool(fail={'INFY'}))
+    buf = io.BytesIO()
+    assert export_watchlist_pdf(['TCS', 'INFY', 'SBIN'], buf) == 2
+    # Two report pages and one index page; the index links only the rendered reports
+    assert _page_count(buf.getvalue()) == 3
+    assert buf.getvalue().count(b'/Subtype /Link') == 2
+
+def test_pdf_is_closed_when_the_export_stops(monkeypatch):
+    def items():
+        yield 'TCS', {'total_score': 30}
+        raise RuntimeError("watchlist aborted")
+
+    _watchlist(monkeypatch, items(), _Pool())
+    buf = io.BytesIO()
+    with pytest.raises(RuntimeError):
+        export_watchlist_pdf(['TCS', 'INFY'], buf)
+    assert _page_count(buf.getvalue()) == 1
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+from src.bot import photos
+from src.config import SNAPSHOT_MAX_AGE
+from src.pipeline import analyze_symbol
+from src.renderer.encoders import EncodedImage
+
+def test_snapshot_resend_reuses_the_uploaded_file_id(temp_db, live_result, monkeypatch):
+    posts = []
+
+    def post(url, data=None, files=None):
+        posts.append((data, files))
+        return SimpleNamespace(status_code=200, text='', json=lambda: {'result': {'photo': [{'file_id': 'AgAD-1'}]}})
+
+    monkeypatch.setattr(photos.requests, 'post', post)
+    render = lambda symbol, result, fmt: EncodedImage(b'png', 'png', 'image/png', 'png')
+
+    # The bot's /analyze uploads the live result, which the pipeline has also stored
+    temp_db.save_evaluations([('TCS', live_result)])
+    photos.send_report_photo(1, 'TCS', live_result, render=render)
+    assert posts[-1][1] is not None
+
+    # /share_telegram then sends the stored snapshot: same content hash, so no second upload
+    snapshot = analyze_symbol('TCS', comprehensive_news=False, max_age=SNAPSHOT_MAX_AGE)
+    assert 'captured_at' in snapshot
+    photos.send_report_photo(1, 'TCS', snapshot, render=lambda *a: None)
+    data, files = posts[-1]
+    assert files is None and data['photo'] == 'AgAD-1'
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import pytest
+from src.bot.scheduler import FairScheduler, RateLimitedError, QueueFullError
+
+def _run(coro):
+    return asyncio.run(coro)
+
+def test_rate_limit_per_chat():
+    async def main():
+        scheduler = FairScheduler(workers=4, burst=2, rate_per_minute=1)
+        jobs = [scheduler.submit(1, lambda: 'ok'), scheduler.submit(1, lambda: 'ok')]
+        with pytest.raises(RateLimitedError) as e:
+            scheduler.submit(1, lambda: 'ok')
+        assert 0 < e.value.retry_after <= 60
+        # Other chats have their own budget; cached jobs use none
+        jobs.append(scheduler.submit(2, lambda: 'ok'))
+        jobs.append(scheduler.submit(1, lambda: 'cached', cached=True))
+        assert await asyncio.gather(*jobs) == ['ok', 'ok', 'ok', 'cached']
+        assert scheduler.metrics()['rate_limited'] == 1
+    _run(main())
+
+def test_queue_full_does_not_use_rate_budget():
+    async def main():
+        release = threading.Event()
+        scheduler = FairScheduler(workers=1, max_queue=1, burst=3, rate_per_minute=0)
+        running = scheduler.submit(1, lambda: release.wait(5))
+        queued = scheduler.submit(1, lambda: 'queued')
+        assert queued.position == 1
+        with pytest.raises(QueueFullError):
+            scheduler.submit(1, lambda: 'rejected')
+        release.set()
+        await running
+        assert await queued == 'queued'
+        # The rejected submit left the third token in the bucket
+        assert await scheduler.submit(1, lambda: 'third') == 'third'
+        with pytest.raises(RateLimitedError):
+            scheduler.submit(1, lambda: 'fourth')
+    _run(main())
+
+def test_chats_take_turns_and_cached_jobs_go_first():
+    async def main():
+        release = threading.Event()
+        order = []
+        scheduler = FairScheduler(workers=1, burst=10)
+        blocker = scheduler.submit(0, lambda: release.wait(5))
+        jobs = [scheduler.submit(1, order.append, f"1{c}") for c in 'abc']
+        jobs.append(scheduler.submit(2, order.append, '2a'))
+        jobs.append(scheduler.submit(3, order.append, '3a'))
+        jobs.append(scheduler.submit(1, order.append, '1cached', cached=True))
+        assert jobs[-1].position == 1
+        release.set()
+        await asyncio.gather(blocker, *jobs)
+        # The cache hit used chat 1's turn, so chats 2 and 3 go next
+        assert order == ['1cached', '2a', '3a', '1a', '1b', '1c']
+    _run(main())
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+import pytest
+from src.analysis import screener
+from src.analysis.screener import ScreenCache, ScreenError, parse_expression, run_screen
+
+def _result(total, roce=None):
+    details = {'ROCE': {'value': f"{roce}%", 'score': 1, 'status': 'Positive'}} if roce is not None else {}
+    return {'total_score': total, 'fundamental_score': total, 'technical_score': 0, 'news_score': 0,
+            'health_label': 'Moderate', 'cmp': 100, 'details': details}
+
+def test_parse_precedence_and_aliases():
+    assert parse_expression('ROCE > 20 or total < 5 and not (Stock P/E >= 15)') == (
+        'or', ('cmp', 'ROCE', '>', 20.0),
+        ('and', ('cmp', 'total_score', '<', 5.0), ('not', ('cmp', 'P/E Ratio', '>=', 15.0))))
+    assert parse_expression('ROCE.score = 1') == ('cmp', 'ROCE.score', '=', 1.0)
+
+@pytest.mark.parametrize('expression', ['', 'ROCE >', 'ROCE > 20 and', 'Nonsense > 1', '(ROCE > 1', 'ROCE > 1 ;'])
+def test_parse_errors(expression):
+    with pytest.raises(ScreenError):
+        parse_expression(expression)
+
+def test_run_screen_filters_and_sorts(temp_db, monkeypatch):
+    monkeypatch.setattr(screener, '_cache', ScreenCache())
+    temp_db.save_evaluations([('TCS', _result(30, 40)), ('INFY', _result(25, 30)), ('SBIN', _result(20, 12)),
+                              ('NEWCO', _result(35))])
+    result = run_screen('ROCE > 20', sort='ROCE', descending=False)
+    assert result['total'] == 2
+    assert [row['symbol'] for row in result['results']] == ['INFY', 'TCS']
+    # Missing values never match, even negated comparisons on other fields
+    assert [row['symbol'] for row in run_screen('not ROCE > 20')['results']] == ['NEWCO', 'SBIN']
+
+def test_latest_snapshot_rows_ignore_backfill(temp_db):
+    now = datetime.utcnow()
+    temp_db.save_evaluations([('TCS', _result(30)), ('INFY', _result(10))], captured_at=now)
+    version = temp_db.snapshot_version()
+    temp_db.save_evaluations([('TCS', _result(20))], captured_at=now - timedelta(days=1))
+
+    score_rows, _ = temp_db.latest_snapshot_rows()
+    assert sorted((row[1], row[3]) for row in score_rows) == [('INFY', 10), ('TCS', 30)]
+    # Incremental refresh: only TCS has new rows, and its latest evaluation is still today's
+    score_rows, _ = temp_db.latest_snapshot_rows(since_id=version)
+    assert [(row[1], row[3]) for row in score_rows] == [('TCS', 30)]
+
+def test_screen_cache_uses_latest_evaluation(temp_db):
+    now = datetime.utcnow()
+    temp_db.save_evaluations([('TCS', _result(30))], captured_at=now)
+    cache = ScreenCache()
+    cache.refresh()
+    temp_db.save_evaluations([('TCS', _result(20))], captured_at=now - timedelta(days=1))
+    cache.refresh()
+    assert cache.columns['total_score'].tolist() == [30]